@@ -0,0 +1 @@
+"""Benchmark suite - see run.py (`python -m benchmarks.run --help`)."""
@@ -0,0 +1,189 @@
+"""
+Reproducible synthetic artefacts for the benchmark suite.
+
+• Content comes from a seeded random.Random and every gzip/tar header uses
+  a fixed mtime, so the same spec + scale yields byte-identical files on
+  every machine (and therefore comparable runs).
+• Files are cached in the work directory under a name derived from their
+  spec; a change to a spec (or FIXTURE_VERSION) regenerates them.
+• `build_pulse()` lays the artefacts out as a real pulse directory with a
+  Manifest, for the end-to-end VerifierService benchmark.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import io
+import json
+import random
+import shutil
+import tarfile
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+FIXTURE_VERSION = 2
+SEED = 20240601
+_MTIME = 1_700_000_000  # fixed timestamp for tar members
+
+_WORDS = (
+    b"server backup pulse verify manifest archive chunk stream digest config "
+    b"nginx php mysql table index insert select update value cache session user"
+).split()
+
+# name → spec; sizes are MiB at scale 1.0
+SPECS: Dict[str, Dict] = {
+    "blob": {"kind": "blob", "mib": 256},
+    # many small text members: count scales, average member ~4 KiB
+    "tar_small_members": {"kind": "tar", "layout": "small", "members": 20000, "member_kib": 4},
+    # few huge half-compressible members: member size scales
+    "tar_huge_members": {"kind": "tar", "layout": "huge", "members": 3, "member_kib": 48 * 1024},
+    "dump_4m": {"kind": "dump", "mib": 4},
+    "dump_64m": {"kind": "dump", "mib": 64},
+    "dump_256m": {"kind": "dump", "mib": 256},
+}
+
+
+def fixture_path(
+    workdir: Path, name: str, scale: float, log: Optional[Callable[[str], None]] = None
+) -> Path:
+    """Build (once) and return the artefact `name` at `scale`."""
+    spec = SPECS[name]
+    tag = hashlib.sha256(
+        json.dumps([FIXTURE_VERSION, SEED, name, spec, scale], sort_keys=True).encode()
+    ).hexdigest()[:10]
+    suffix = {"blob": ".bin", "tar": ".tar.gz", "dump": ".sql.gz"}[spec["kind"]]
+    path = workdir / "fixtures" / f"{name}-{tag}{suffix}"
+    if path.exists():
+        return path
+    if log is not None:
+        log(f"  building fixture {path.name} …")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    part = path.with_name(path.name + ".part")
+    rng = random.Random(f"{SEED}:{name}")
+    builder = {"blob": _build_blob, "tar": _build_tar, "dump": _build_dump}[spec["kind"]]
+    with part.open("wb") as fh:
+        builder(fh, spec, scale, rng)
+    part.replace(path)
+    return path
+
+
+def build_pulse(workdir: Path, scale: float) -> Path:
+    """Pulse dir with tar + dump artefacts and a manifest (hard links, no copies)."""
+    from watchdog.core.verify.checksum import multi_digest
+    from watchdog.core.verify.manifest import Manifest
+
+    pulse = workdir / "pulse" / f"{FIXTURE_VERSION}-{scale}" / "2024-06-01_22-30-00"
+    if (pulse / "bench.json").exists():
+        return pulse
+    shutil.rmtree(pulse, ignore_errors=True)
+    server_dir = pulse / "bench"
+    server_dir.mkdir(parents=True)
+    manifest = Manifest(server="bench", pulse=pulse.name)
+    for name, art_type in (
+        ("tar_small_members", "tar"),
+        ("tar_huge_members", "tar"),
+        ("dump_4m", "mysql"),
+        ("dump_64m", "mysql"),
+    ):
+        src = fixture_path(workdir, name, scale, log=print)
+        dest = server_dir / src.name
+        try:
+            dest.hardlink_to(src)
+        except OSError:
+            shutil.copyfile(src, dest)
+        d = multi_digest(dest)
+        manifest.add_artifact(
+            path=dest, sha256=d.sha256, size=d.size, art_type=art_type, xxh3=d.xxh3, codec="gzip"
+        )
+    manifest.save(pulse)
+    return pulse
+
+
+# ---------------------------------------------------------------------- #
+# Builders
+
+
+def _text(rng: random.Random, size: int) -> bytes:
+    """Word soup - compresses roughly like config/source files."""
+    pool = _text_pool()
+    out = bytearray()
+    while len(out) < size:
+        start = rng.randrange(len(pool) - 4096)
+        out += pool[start:start + min(4096, size - len(out))]
+    return bytes(out)
+
+
+def _text_pool(_cache: Dict[str, bytes] = {}) -> bytes:  # noqa: B006 - memo
+    """4 MiB of seeded word soup; slicing it is ~100x faster than joining words."""
+    if "pool" not in _cache:
+        rng = random.Random(f"{SEED}:words")
+        lines = [b" ".join(rng.choices(_WORDS, k=12)) for _ in range(64000)]
+        _cache["pool"] = b"\n".join(lines)[: 4 << 20]
+    return _cache["pool"]
+
+
+def _mixed(rng: random.Random, size: int) -> bytes:
+    """Half incompressible, half text, in 64 KiB runs."""
+    out = bytearray()
+    run = 64 << 10
+    while len(out) < size:
+        out += rng.randbytes(run) if rng.random() < 0.5 else _text(rng, run)
+    return bytes(out[:size])
+
+
+def _build_blob(fh, spec: Dict, scale: float, rng: random.Random) -> None:
+    remaining = int(spec["mib"] * scale * (1 << 20))
+    while remaining > 0:
+        piece = min(remaining, 4 << 20)
+        fh.write(rng.randbytes(piece))
+        remaining -= piece
+
+
+def _build_tar(fh, spec: Dict, scale: float, rng: random.Random) -> None:
+    small = spec["layout"] == "small"
+    members = max(1, int(spec["members"] * scale)) if small else spec["members"]
+    member_size = int(spec["member_kib"] * 1024 * (1 if small else scale))
+    with gzip.GzipFile(fileobj=fh, mode="wb", mtime=0) as gz:
+        with tarfile.open(fileobj=gz, mode="w|", format=tarfile.GNU_FORMAT) as tar:
+            for i in range(members):
+                if small:
+                    data = _text(rng, rng.randint(0, member_size * 2))
+                    name = f"var/www/site{i % 40}/dir{i % 311}/file_{i:06d}.php"
+                else:
+                    data = _mixed(rng, member_size)
+                    name = f"srv/data/huge_{i}.bin"
+                info = tarfile.TarInfo(name)
+                info.size, info.mtime, info.mode = len(data), _MTIME, 0o644
+                tar.addfile(info, io.BytesIO(data))
+
+
+def _build_dump(fh, spec: Dict, scale: float, rng: random.Random) -> None:
+    target = int(spec["mib"] * scale * (1 << 20))
+    written = 0
+    with gzip.GzipFile(fileobj=fh, mode="wb", mtime=0) as gz:
+
+        def emit(data: bytes) -> None:
+            nonlocal written
+            gz.write(data)
+            written += len(data)
+
+        emit(b"-- MySQL dump 10.13  Distrib 8.0.36, for Linux (x86_64)\n--\n")
+        db = 0
+        while written < target:
+            emit(f"\n--\n-- Current Database: `shop{db}`\n--\n\nUSE `shop{db}`;\n".encode())
+            for table in ("orders", "customers", "products", "sessions"):
+                emit(
+                    f"DROP TABLE IF EXISTS `{table}`;\nCREATE TABLE `{table}` (\n"
+                    f"  `id` int NOT NULL,\n  `data` text\n) ENGINE=InnoDB;\n".encode()
+                )
+                for _ in range(50):
+                    rows = b",".join(
+                        b"(%d,'%s')" % (rng.randrange(1 << 30), _text(rng, 60).rstrip(b"\n"))
+                        for _ in range(200)
+                    )
+                    emit(b"INSERT INTO `" + table.encode() + b"` VALUES " + rows + b";\n")
+                    if written >= target:
+                        break
+            db += 1
+        emit(b"-- Dump completed on 2024-06-01 22:30:00\n")
@@ -0,0 +1,345 @@
+"""
+Benchmark suite for the checksum helpers, the inspectors and VerifierService.
+
+    python -m benchmarks.run                          # all cases, print table
+    python -m benchmarks.run --only 'tar_*' --repeat 5
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline results.json --threshold 0.10
+
+• Every case runs in a fresh (spawned) interpreter, so its peak RSS is its
+  own: `rss_peak_mb` is the child's high-water mark, `rss_delta_mb` how far
+  the case pushed it above the post-setup baseline. Pool workers of
+  `verify_pulse[process]` are separate processes and not included.
+• Inputs are the reproducible fixtures of fixtures.py, read once before
+  timing so the page cache is warm - the numbers are CPU/memory throughput,
+  not disk speed. `mb_s` is on-disk (compressed) input bytes per second of
+  the best repeat.
+• With `--baseline` every shared case is compared; a throughput drop or
+  RSS growth beyond `--threshold` is a regression and the exit code is 1.
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from queue import Empty
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks import fixtures
+
+RESULT_VERSION = 1
+DEFAULT_WORKDIR = Path("/tmp/watchdog-bench")
+_RSS_SLACK_MB = 16  # RSS growth below this is noise, never a regression
+
+
+class Skip(Exception):
+    """Raised by a case whose optional dependency is missing."""
+
+
+def _algorithms() -> Tuple[str, ...]:
+    """What VerifierService would use: xxh3 when available, else SHA-256."""
+    from watchdog.core.verify.checksum import HAS_XXH3
+
+    return ("xxh3",) if HAS_XXH3 else ("sha256",)
+
+
+# ---------------------------------------------------------------------- #
+# Cases - each returns the number of input bytes it processed
+
+
+def _checksum(algorithms: Tuple[str, ...]) -> Callable[[Dict[str, Path]], int]:
+    def run(paths: Dict[str, Path]) -> int:
+        from watchdog.core.verify.checksum import HAS_XXH3, multi_digest
+
+        if "xxh3" in algorithms and not HAS_XXH3:
+            raise Skip("xxhash not installed")
+        return multi_digest(paths["blob"], algorithms).size
+    return run
+
+
+def _sha256_stream(paths: Dict[str, Path]) -> int:
+    from watchdog.core.verify.checksum import sha256_stream
+
+    sha256_stream(paths["blob"])
+    return paths["blob"].stat().st_size
+
+
+def _xxh3_stream(paths: Dict[str, Path]) -> int:
+    from watchdog.core.verify.checksum import xxh3_stream
+
+    if xxh3_stream(paths["blob"]) is None:
+        raise Skip("xxhash not installed")
+    return paths["blob"].stat().st_size
+
+
+def _inspector(func: str, fixture: str) -> Callable[[Dict[str, Path]], int]:
+    def run(paths: Dict[str, Path]) -> int:
+        from watchdog.core.verify import sql_inspector, tar_inspector
+
+        module = tar_inspector if hasattr(tar_inspector, func) else sql_inspector
+        ok, msg = getattr(module, func)(paths[fixture])
+        if not ok:
+            raise RuntimeError(f"{func} rejected {paths[fixture].name}: {msg}")
+        return paths[fixture].stat().st_size
+    return run
+
+
+def _tar_stream(fixture: str) -> Callable[[Dict[str, Path]], int]:
+    def run(paths: Dict[str, Path]) -> int:
+        from watchdog.core.verify.tar_inspector import verify_tar_stream
+
+        report = verify_tar_stream(paths[fixture], _algorithms(), codec="gzip")
+        if not report.ok:
+            raise RuntimeError(report.message)
+        return report.digests.size
+    return run
+
+
+def _scan_dump(fixture: str) -> Callable[[Dict[str, Path]], int]:
+    def run(paths: Dict[str, Path]) -> int:
+        from watchdog.core.verify.sql_inspector import scan_dump
+
+        report = scan_dump(paths[fixture], "gzip", _algorithms(), build_index=True)
+        if not report.ok:
+            raise RuntimeError(report.message)
+        return report.digests.size
+    return run
+
+
+def _verify_pulse(executor: str) -> Callable[[Dict[str, Path]], int]:
+    def run(paths: Dict[str, Path]) -> int:
+        from watchdog.core.verify.verifier_service import VerifierService
+
+        workers = min(4, os.cpu_count() or 1)
+        result = VerifierService(workers=workers, executor=executor, sql_index=False).verify_pulse(paths["pulse"])
+        if result["overall"] != "PASSED":
+            raise RuntimeError(f"verification failed: {result['errors']}")
+        return sum(p.stat().st_size for p in paths["pulse"].glob("*/*.gz"))
+    return run
+
+
+# name → (fixtures, runner)
+CASES: Dict[str, Tuple[Tuple[str, ...], Callable[[Dict[str, Path]], int]]] = {
+    "checksum.multi_digest[sha256+xxh3]": (("blob",), _checksum(("sha256", "xxh3"))),
+    "checksum.multi_digest[sha256]": (("blob",), _checksum(("sha256",))),
+    "checksum.multi_digest[xxh3]": (("blob",), _checksum(("xxh3",))),
+    "checksum.sha256_stream": (("blob",), _sha256_stream),
+    "checksum.xxh3_stream": (("blob",), _xxh3_stream),
+    **{
+        f"tar_inspector.{func}[{fx}]": ((fx,), _inspector(func, fx))
+        for func in ("gzip_valid", "tar_structure_valid")
+        for fx in ("tar_small_members", "tar_huge_members")
+    },
+    **{
+        f"tar_inspector.verify_tar_stream[{fx}]": ((fx,), _tar_stream(fx))
+        for fx in ("tar_small_members", "tar_huge_members")
+    },
+    **{
+        f"sql_inspector.dump_header_footer_ok[{fx}]": ((fx,), _inspector("dump_header_footer_ok", fx))
+        for fx in ("dump_4m", "dump_64m", "dump_256m")
+    },
+    "sql_inspector.scan_dump+index[dump_64m]": (("dump_64m",), _scan_dump("dump_64m")),
+    "verifier.verify_pulse[process]": (("pulse",), _verify_pulse("process")),
+    "verifier.verify_pulse[thread]": (("pulse",), _verify_pulse("thread")),
+}
+
+
+# ---------------------------------------------------------------------- #
+# Measurement (child process)
+
+
+def _max_rss_mb() -> float:
+    """
+    This process's RSS high-water mark. Linux carries ru_maxrss across
+    exec (a spawned child starts at its parent's peak), so VmHWM is used
+    there; macOS reports ru_maxrss in bytes.
+    """
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024
+
+
+def _warm(path: Path) -> None:
+    files = [path] if path.is_file() else [p for p in path.rglob("*") if p.is_file()]
+    for f in files:
+        with f.open("rb") as fh:
+            while fh.read(1 << 20):
+                pass
+
+
+def _child(name: str, paths: Dict[str, str], repeat: int, queue) -> None:
+    try:
+        resolved = {k: Path(v) for k, v in paths.items()}
+        for p in resolved.values():
+            _warm(p)
+        _, runner = CASES[name]
+        baseline = _max_rss_mb()
+        times: List[float] = []
+        nbytes = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            nbytes = runner(resolved)
+            times.append(time.perf_counter() - start)
+        peak = _max_rss_mb()
+        queue.put({
+            "bytes": nbytes,
+            "seconds_best": round(min(times), 4),
+            "seconds_median": round(statistics.median(times), 4),
+            "mb_s": round(nbytes / min(times) / (1 << 20), 1),
+            "rss_peak_mb": round(peak, 1),
+            "rss_delta_mb": round(peak - baseline, 1),
+        })
+    except Skip as exc:
+        queue.put({"skipped": str(exc)})
+    except Exception as exc:  # noqa: BLE001 - reported as a failed case
+        queue.put({"error": f"{type(exc).__name__}: {exc}"})
+
+
+def run_case(name: str, paths: Dict[str, Path], repeat: int, timeout: float) -> Dict[str, Any]:
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(name, {k: str(v) for k, v in paths.items()}, repeat, queue))
+    proc.start()
+    deadline = time.monotonic() + timeout
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1.0)
+        except Empty:
+            if not proc.is_alive():
+                # OOM kill / segfault: nothing will ever arrive (drain a late put first)
+                try:
+                    result = queue.get(timeout=1.0)
+                except Empty:
+                    result = {"error": f"child exited with code {proc.exitcode} without a result"}
+            elif time.monotonic() > deadline:
+                proc.kill()
+                result = {"error": f"timed out after {timeout:.0f}s"}
+    proc.join()
+    return result
+
+
+# ---------------------------------------------------------------------- #
+# Suite / comparison
+
+
+def run_suite(workdir: Path, scale: float, repeat: int, only: List[str], timeout: float) -> Dict[str, Any]:
+    selected = [n for n in CASES if not only or any(fnmatch.fnmatch(n, pat) for pat in only)]
+    results: Dict[str, Any] = {}
+    for name in selected:
+        needed, _ = CASES[name]
+        paths = {}
+        for fx in needed:
+            if fx == "pulse":
+                paths[fx] = fixtures.build_pulse(workdir, scale)
+            else:
+                paths[fx] = fixtures.fixture_path(workdir, fx, scale, log=print)
+        results[name] = run_case(name, paths, repeat, timeout)
+        print(_row(name, results[name]))
+    return {
+        "version": RESULT_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "scale": scale,
+        "repeat": repeat,
+        "fixture_version": fixtures.FIXTURE_VERSION,
+        "host": _host_info(),
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Regression lines (empty = none) for cases present in both runs."""
+    problems = []
+    if current["scale"] != baseline.get("scale") or current["fixture_version"] != baseline.get("fixture_version"):
+        print("  [warn] baseline used a different scale/fixture version - numbers may not be comparable")
+    print(f"\n{'case':<52} {'MB/s':>9} {'base':>9} {'Δ':>7} {'ΔRSS MB':>9}")
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or "error" in base or "skipped" in base or "skipped" in cur:
+            continue
+        if "error" in cur:
+            problems.append(f"{name}: failed ({cur['error']})")
+            continue
+        change = cur["mb_s"] / base["mb_s"] - 1 if base["mb_s"] else 0.0
+        rss_growth = cur["rss_delta_mb"] - base["rss_delta_mb"]
+        flag = ""
+        if change < -threshold:
+            flag = " ← slower"
+            problems.append(f"{name}: {cur['mb_s']} MB/s vs {base['mb_s']} ({change:+.0%})")
+        if rss_growth > max(_RSS_SLACK_MB, threshold * base["rss_delta_mb"]):
+            flag += " ← memory"
+            problems.append(f"{name}: RSS +{rss_growth:.0f} MB over baseline")
+        print(f"{name:<52} {cur['mb_s']:>9} {base['mb_s']:>9} {change:>+7.0%} {rss_growth:>+9.1f}{flag}")
+    return problems
+
+
+def _row(name: str, r: Dict[str, Any]) -> str:
+    if "error" in r:
+        return f"{name:<52} ERROR {r['error']}"
+    if "skipped" in r:
+        return f"{name:<52} skipped ({r['skipped']})"
+    return (
+        f"{name:<52} {r['mb_s']:>8.1f} MB/s  best {r['seconds_best']:>7.3f}s  "
+        f"peak {r['rss_peak_mb']:>6.1f} MB (+{r['rss_delta_mb']:.1f})"
+    )
+
+
+def _host_info() -> Dict[str, Any]:
+    from watchdog.core.verify.checksum import HAS_XXH3
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "xxhash": HAS_XXH3,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--only", action="append", default=[], help="glob on case names (repeatable)")
+    parser.add_argument("--list", action="store_true", help="list cases and exit")
+    parser.add_argument("--scale", type=float, default=1.0, help="fixture size multiplier (default 1.0)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case; best is reported")
+    parser.add_argument("--timeout", type=float, default=1800, help="seconds per case (default 1800)")
+    parser.add_argument("--workdir", type=Path, default=DEFAULT_WORKDIR, help="fixture cache directory")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown (default 0.10)")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(CASES))
+        return 0
+    current = run_suite(args.workdir, args.scale, max(1, args.repeat), args.only, args.timeout)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(current, indent=2))
+        print(f"\nResults written to {args.output}")
+    if args.baseline:
+        problems = compare(current, json.loads(args.baseline.read_text()), args.threshold)
+        if problems:
+            print("\nRegressions:\n  " + "\n  ".join(problems))
+            return 1
+        print("\nNo regressions.")
+    return 1 if any("error" in r for r in current["results"].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
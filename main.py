@@ -3,9 +3,12 @@
 WatchDog CLI entrypoint.
 
 Usage:
-    watchdog [backup|status|notify|all]
+    watchdog [backup|pulse|resume [timestamp]|prune [--dry-run]|catalog ...|status|notify [--check]|all]
+    watchdog catalog [rebuild | history <server> [days] | last-ok <server> <pattern>]
+    watchdog restore <pulse|latest> <server> [--target T] [--path P]... [--dest DIR] [--host NAME]
 """
 
+import argparse
 import sys
 import platform
 import shutil
@@ -15,9 +18,14 @@ from pathlib import Path
 import psutil
 from dotenv import load_dotenv
 from watchdog.core.notify import DiscordNotifier
+from watchdog.core.notify.sender import self_check
 from watchdog.core.pulse import PulseService
 from watchdog.core.backup.backup_service import BackupService
 from watchdog.core.backup.config_loader import BackupConfig
+from watchdog.core.backup.retention import RetentionEngine, RetentionPolicy
+from watchdog.core.catalog import Catalog
+from watchdog.core.restore import RestoreError, RestoreService
+from watchdog.core.status.latency_history import LatencyHistory, format_summary
 
 # Load environment variables from .env file if it exists
 ENV_PATH = Path(__file__).parent / ".env"
@@ -54,18 +62,112 @@ def generate_status_report() -> str:
         f"**RAM**: {human_bytes(mem.used)} / {human_bytes(mem.total)} ({mem.percent}%)\n"
         f"**Disk** (/): {human_bytes(disk.used)} / {human_bytes(disk.total)} "
         f"({disk.used / disk.total * 100:.1f}%)"
-    )
+    ) + latency_report()
+
+
+def latency_report() -> str:
+    """Per-target probe latency from the StatusChecker history file."""
+    summary = LatencyHistory.load().summary()
+    sections = []
+    for window in ("1h", "24h", "7d"):
+        lines = format_summary(summary, window)
+        if lines:
+            sections.append(f"**Latency ({window})**\n" + "\n".join(f"- {l}" for l in lines))
+    return "\n\n" + "\n\n".join(sections) if sections else ""
 
 
 def run_pulse() -> None:
     PulseService().run()
 
+def run_resume() -> None:
+    """Continue an interrupted pulse: `watchdog resume [timestamp]`."""
+    timestamp = sys.argv[2] if len(sys.argv) > 2 else None
+    if not PulseService().resume(timestamp):
+        print("[ERROR] Nothing to resume (see pulse.log).")
+
+def run_prune() -> None:
+    """Apply the GFS retention policy now: `watchdog prune [--dry-run]`."""
+    config = BackupConfig(Path(__file__).parent / "watchdog/config/backup_config.json")
+    settings = config.get_retention_settings()
+    if not settings["enabled"]:
+        print("[ERROR] No `retention` block in backup_config.json.")
+        return
+    engine = RetentionEngine(PulseService.BACKUP_ROOT, RetentionPolicy.from_config(settings))
+    plan = engine.plan()
+    print("\n".join(plan.lines()))
+    if "--dry-run" in sys.argv or settings["dry_run"]:
+        print("[DRY-RUN] Nothing deleted.")
+        return
+    engine.apply(plan, background=False)
+    print(f"[OK] Pruned {len(plan.delete)} pulse(s).")
+
+def run_catalog() -> None:
+    """Catalog maintenance and queries: rebuild | history | last-ok."""
+    args = sys.argv[2:]
+    catalog = Catalog.for_backup_root(PulseService.BACKUP_ROOT)
+    if args[:1] == ["rebuild"]:
+        count = catalog.rebuild(PulseService.BACKUP_ROOT)
+        print(f"[OK] Catalog rebuilt from {count} manifest(s).")
+    elif args[:1] == ["history"] and len(args) >= 2:
+        days = int(args[2]) if len(args) > 2 else 90
+        for row in catalog.server_history(args[1], days):
+            print(f"{row['pulse']}  {human_bytes(row['bytes']):>12}  "
+                  f"({human_bytes(row['new_bytes'])} new, {row['files']} files)")
+    elif args[:1] == ["last-ok"] and len(args) == 3:
+        row = catalog.last_passing(args[1], args[2])
+        if row:
+            print(f"{row['path']} last verified OK in pulse {row['pulse']}")
+        else:
+            print("No passing verification found.")
+    else:
+        print("Usage: watchdog catalog [rebuild | history <server> [days] | last-ok <server> <pattern>]")
+
+def run_restore() -> None:
+    """Restore artefacts of one pulse, locally or back onto a configured host."""
+    parser = argparse.ArgumentParser(prog="watchdog restore")
+    parser.add_argument("pulse", help="pulse timestamp or `latest`")
+    parser.add_argument("server")
+    parser.add_argument("--target", help="artefact name filter (substring or glob)")
+    parser.add_argument("--path", action="append", default=[], help="member path/glob inside archives")
+    parser.add_argument("--dest", help="destination directory (required with --host)")
+    parser.add_argument("--host", help="configured server to stream the files back to over SSH")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(sys.argv[2:])
+
+    service = RestoreService(PulseService.BACKUP_ROOT, args.workers, on_progress=lambda line: print(f"  {line}"))
+    pulse = service.latest_pulse() if args.pulse == "latest" else args.pulse
+    host = None
+    if args.host:
+        config = BackupConfig(Path(__file__).parent / "watchdog/config/backup_config.json")
+        host = next((s for s in config.get_servers() if s["name"] == args.host), None)
+        if host is None or not args.dest:
+            print(f"[ERROR] --host needs a configured server and --dest (got {args.host!r}).")
+            return
+    dest = args.dest or str(Path("/mnt/ssd/restore") / str(pulse) / args.server)
+    try:
+        report = service.restore(pulse, args.server, Path(dest), args.target, args.path, host)
+    except RestoreError as exc:
+        print(f"[ERROR] {exc}")
+        return
+    for r in report.results:
+        if r.ok:
+            print(f"[OK] {r.artifact} → {r.dest} ({human_bytes(r.bytes)}, {r.seconds}s) {r.message}".rstrip())
+        else:
+            print(f"[ERROR] {r.artifact}: {r.message}")
+    print(f"{human_bytes(report.bytes)} in {report.seconds:.1f}s ({report.mb_per_sec:.1f} MB/s)")
+
 def run_backup() -> None:
     try:
         config = BackupConfig(Path(__file__).parent / "watchdog/config/backup_config.json")
         backup_service = BackupService(config)
-        backup_service.backup_all()
-        print("[OK] Backup completed successfully.")
+        results = backup_service.backup_all()
+        for name, r in results.items():
+            if r["ok"]:
+                print(f"[OK] {name} backed up in {r['seconds']}s.")
+            else:
+                print(f"[ERROR] {name} failed: {r['error']}")
+        if all(r["ok"] for r in results.values()):
+            print("[OK] Backup completed successfully.")
     except Exception as e:
         print(f"[ERROR] Backup failed: {e}")
 
@@ -76,31 +178,52 @@ def run_status() -> None:
     print(report)
 
     try:
-        DiscordNotifier().send(content=report)
-        print("Status report successfully sent to Discord.")
+        notifier = DiscordNotifier()
+        notifier.send(content=report)
+        if notifier.flush():
+            print("Status report successfully sent to Discord.")
+        else:
+            print("[WARN] Status report queued; it will be re-sent from the spool.")
     except Exception as exc:
         print(f"[ERROR] Failed to send to Discord: {exc}")
 
 
 def run_notify() -> None:
-    """Send a test notification to Discord."""
+    """Send a test notification to Discord (`--check`: local delivery self-check)."""
+    if "--check" in sys.argv:
+        try:
+            self_check()
+        except AssertionError as exc:
+            print(f"[ERROR] Sender self-check failed: {exc}")
+            sys.exit(1)
+        print("Sender self-check passed.")
+        return
     try:
-        DiscordNotifier().send(content="Test message: WatchDog notify test successful.")
-        print("Test notification sent.")
+        notifier = DiscordNotifier()
+        notifier.send(content="Test message: WatchDog notify test successful.")
+        if notifier.flush():
+            print("Test notification sent.")
+        else:
+            print("[WARN] Test notification queued; it will be re-sent from the spool.")
     except Exception as exc:
         print(f"[ERROR] Failed to send to Discord: {exc}")
 
 
 def show_help() -> None:
     """Show usage instructions."""
-    print("Usage: watchdog [backup|status|notify|all]")
+    print("Usage: watchdog [backup|pulse|resume [timestamp]|prune [--dry-run]|catalog ...|restore ...|status|notify [--check]|all]")
 
 
 def main() -> None:
     """Main CLI dispatcher."""
     commands = {
         "backup": run_backup,
+        "status": run_status,
         "pulse": run_pulse,
+        "resume": run_resume,
+        "prune": run_prune,
+        "catalog": run_catalog,
+        "restore": run_restore,
         "notify": run_notify,
         "all": lambda: [run_backup(), run_pulse()],
     }
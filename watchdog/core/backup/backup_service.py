@@ -1,48 +1,134 @@
-from watchdog.core.backup.ssh_handler import SSHHandler
+from watchdog.core.backup.ssh_pool import SSH_POOL
 from watchdog.core.backup.rsync_handler import RsyncHandler
 from watchdog.core.backup.mysql_dumper import MySQLDumper
+from watchdog.core.backup import snapshot
+from watchdog.core.backup.compression import GZIP, CodecResolver
+from watchdog.core.backup import seekable
+from watchdog.core.verify.decompress import CodecUnavailable, make_decoder
+from watchdog.core.backup.journal import PulseJournal
+from watchdog.core.backup.budget import BudgetGovernor, ResourceBudget
 from watchdog.utils.logger import WatchdogLogger
 from watchdog.core.verify.manifest import Manifest
-from watchdog.core.verify.checksum import sha256_stream, xxh3_stream
+from watchdog.core.verify.checksum import multi_digest
+from watchdog.core.dedup import ChunkStore, TarChunker
+from watchdog.core.dedup.chunk_store import write_index
+from watchdog.core.metrics import METRICS
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
+from typing import Any, Dict
+import json
+import time
 
 class BackupService:
-    def __init__(self, config):
+    BACKUP_ROOT = Path("/mnt/ssd/backups")
+
+    def __init__(self, config, workers: int | None = None):
         self.config = config
         self.logger = WatchdogLogger("backup")
+        self.workers = max(1, workers or config.get_workers())
+        self.ssh_settings = config.get_ssh_settings()
+        SSH_POOL.idle_sec = self.ssh_settings["idle_sec"]
 
-    def backup_all(self):
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        servers = self.config.get_servers()
+    def backup_all(
+        self, timestamp: str | None = None, resume: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Back up every configured server, `self.workers` at a time.
 
-        for server in servers:
-            self.logger.info(f"Start backup process {server['name']}")
-            manifest = Manifest(server=server["name"], pulse=timestamp)
+        Servers with a higher `priority` are started first. A failing server
+        never aborts the others; the result maps each server name to
+        `{"ok": bool, "error": str, "seconds": float}`.
 
-            ssh_cfg = server["ssh"]
-            ssh = SSHHandler(
-                host=server["ip"],
-                username=ssh_cfg["user"],
-                password=ssh_cfg["password"],
-                port=ssh_cfg.get("port", 22)
-            )
-            ssh.connect()
-            self.logger.info(f"Connected to {server['name']} via SSH")
-            
-            rsync = RsyncHandler(server["ip"], user=ssh_cfg["user"], port=ssh_cfg.get("port", 22))
+        Progress is journaled per artefact (see journal.py). With `resume`
+        an existing pulse is continued: finished servers and artefacts are
+        skipped and interrupted rsync transfers pick up their partial files.
+        """
+        timestamp = timestamp or datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        journal = PulseJournal(self.BACKUP_ROOT / timestamp)
+        if resume:
+            self.logger.info(f"Resuming pulse {timestamp}")
+        servers = sorted(
+            self.config.get_servers(),
+            key=lambda s: s.get("priority", 0),
+            reverse=True,
+        )
+        self.logger.info(
+            f"Pulse {timestamp}: {len(servers)} server(s), {self.workers} worker(s)"
+        )
+
+        results: Dict[str, Dict[str, Any]] = {}
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="backup"
+        ) as pool:
+            # the executor queue is FIFO, so submission order == start order
+            futures = {
+                pool.submit(self._timed_backup, server, timestamp, journal, resume): server["name"]
+                for server in servers
+            }
+            for fut in as_completed(futures):
+                name = futures[fut]
+                results[name] = fut.result()
+
+        failed = [n for n, r in results.items() if not r["ok"]]
+        if failed:
+            self.logger.error(f"Backup failed for: {', '.join(failed)}")
+        return {s["name"]: results[s["name"]] for s in servers}
+
+    def _timed_backup(
+        self, server: Dict[str, Any], timestamp: str, journal: PulseJournal, resume: bool
+    ) -> Dict[str, Any]:
+        """Run one server and turn any exception into a result entry."""
+        if journal.server_done(server["name"]) and (
+            self.BACKUP_ROOT / timestamp / f"{server['name']}.json"
+        ).exists():
+            self.logger.info(f"{server['name']} already completed in pulse {timestamp}, skipping")
+            return {"ok": True, "error": "", "seconds": 0.0, "skipped": True}
+        start = time.monotonic()
+        try:
+            with METRICS.span("server_total", server["name"]):
+                self._backup_server(server, timestamp, journal, resume)
+            return {"ok": True, "error": "", "seconds": round(time.monotonic() - start, 1)}
+        except Exception as exc:  # noqa: BLE001
+            WatchdogLogger("backup", prefix=server["name"]).error(f"Backup failed: {exc}")
+            return {"ok": False, "error": str(exc), "seconds": round(time.monotonic() - start, 1)}
+
+    def _backup_server(
+        self, server: Dict[str, Any], timestamp: str, journal: PulseJournal, resume: bool = False
+    ) -> None:
+        log = WatchdogLogger("backup", prefix=server["name"])
+        name = server["name"]
+        log.info(f"Start backup process {server['name']}")
+        manifest = Manifest(server=server["name"], pulse=timestamp)
+
+        # shared transport: reused across targets, dumps and later pulses
+        with METRICS.span("ssh_connect", name):
+            ssh = SSH_POOL.acquire(server)
+        log.info(f"Connected to {server['name']} via SSH")
+
+        try:
+            rsync = RsyncHandler.from_server(server, self.ssh_settings)
+            if resume:
+                rsync.partial = True  # keep what an interrupted run already pulled
+            # nice/ionice, bandwidth cap, windows and load back-off for this host
+            budget = BudgetGovernor(ResourceBudget.from_config(self.config.get_budget(server)), ssh, log)
+            rsync.budget = budget
 
             # Create local backup directory
-            local_base = Path(f"/mnt/ssd/backups/{timestamp}/{server['name'].lower()}/")
+            local_base = self.BACKUP_ROOT / timestamp / server["name"].lower()
             local_base.mkdir(parents=True, exist_ok=True)
-            self.logger.info(f"Local backup directory created: {local_base}")
-            
+            log.info(f"Local backup directory created: {local_base}")
+
             # Collect exclude patterns
             exclude_flags = " ".join(
                 f"--exclude='{pattern}'" for pattern in server.get("excludes", [])
             )
-            self.logger.info(f"Excluding patterns: {exclude_flags}")
-            
+            log.info(f"Excluding patterns: {exclude_flags}")
+
+            # "rsync" stages the archive in remote /tmp, "stream" pipes it over SSH
+            transfer = server.get("transfer", "rsync")
+            codecs = CodecResolver(ssh, log)
+
             # MySQL backup
             if mysql_cfg := server.get("mysql"):
                 MySQLDumper(
@@ -52,31 +138,273 @@ class BackupService:
                     server_name=server["name"],
                     local_base=local_base,
                     manifest=manifest,
+                    transfer=mysql_cfg.get("transfer", transfer),
+                    codec=codecs.resolve(mysql_cfg.get("codec", server.get("codec"))),
+                    journal=journal,
+                    budget=budget,
                 ).dump()
 
             for target in server["targets"]:
-                self.logger.info(f"Backing up {target['path']} from {server['name']}")
-                remote_tmp = f"/tmp/backup_{Path(target['path']).name}.tar.gz"
-                
-                ssh.exec_sudo(
-                    f"tar -czf {remote_tmp} {exclude_flags} {target['path']}"
-                )
-                
-                rsync.download(remote_tmp, str(local_base))
-                
+                mode = target.get("mode", "tar")
+                key = f"{mode}:{target['path']}"
+                if journal.restore(name, key, manifest, local_base):
+                    log.info(f"{target['path']} already backed up in this pulse, skipping")
+                    continue
+                budget.checkpoint(target["path"])
+                log.info(f"Backing up {target['path']} from {server['name']}")
+                if mode == "dedup":
+                    self._dedup_target(ssh, target, exclude_flags, local_base, manifest, log, budget)
+                    journal.record(name, key, "manifested", entry=manifest.artifacts[-1])
+                    continue
+                if mode == "snapshot":
+                    self._snapshot_target(
+                        rsync, server, target, timestamp, local_base, manifest, log, journal
+                    )
+                    continue
+                codec = codecs.resolve(target.get("codec", server.get("codec")))
+                if target.get("seekable"):
+                    self._seekable_target(
+                        ssh, target, codec, exclude_flags, local_base, manifest, log, budget
+                    )
+                    journal.record(name, key, "manifested", entry=manifest.artifacts[-1])
+                    continue
+                if target.get("transfer", transfer) == "stream":
+                    self._stream_target(
+                        ssh, target, codec, exclude_flags, local_base, manifest, log, budget
+                    )
+                    journal.record(name, key, "manifested", entry=manifest.artifacts[-1])
+                    continue
+
+                remote_tmp = f"/tmp/backup_{Path(target['path']).name}.tar{codec.suffix}"
                 local_file = local_base / Path(remote_tmp).name
-                sha = sha256_stream(local_file)
-                xxh = xxh3_stream(local_file)
-                manifest.add_artifact(
+                done = journal.data(name, key)
+                hashed = (
+                    done.get("state") == "hashed"
+                    and local_file.exists()
+                    and local_file.stat().st_size == done["size"]
+                )
+                if done.get("remote") not in (None, remote_tmp) or (
+                    done and not hashed and not ssh.remote_exists(remote_tmp, sudo=True)
+                ):
+                    journal.forget(name, key)  # staged archive gone or codec changed
+                    done = {}
+
+                if not done:
+                    with METRICS.span("remote_compress", name, local_file.name):
+                        ssh.exec_sudo(budget.wrap(
+                            f"tar {codec.tar_flags()} -f {remote_tmp} {exclude_flags} {target['path']}"
+                        ))
+                    journal.record(name, key, "dumped", remote=remote_tmp)
+                elif not hashed:
+                    log.info(f"Reusing staged {remote_tmp} from the interrupted run")
+
+                if hashed:
+                    sha256, xxh3, size = done["sha256"], done["xxh3"], done["size"]
+                else:
+                    expected = ssh.remote_sha256(remote_tmp, sudo=True) if rsync.remote_digest else None
+                    digests = rsync.download_verified(remote_tmp, local_base, expected)
+                    log.info(f"Hashed {local_file.name} at {digests.mb_per_sec:.1f} MB/s")
+                    sha256, xxh3, size = digests.sha256, digests.xxh3, digests.size
+                    journal.record(name, key, "hashed", sha256=sha256, xxh3=xxh3, size=size)
+
+                entry = manifest.add_artifact(
                     path=local_file,
-                    sha256=sha,
-                    size=local_file.stat().st_size,
+                    sha256=sha256,
+                    size=size,
                     art_type="tar",
-                    xxh3=xxh,
+                    xxh3=xxh3,
+                    codec=codec.name,
                 )
-                
+                journal.record(name, key, "manifested", entry=entry)
+
                 ssh.exec_sudo(f"rm {remote_tmp}")
 
-            manifest.save(dest_dir=Path(f"/mnt/ssd/backups/{timestamp}"))
-            ssh.close()
-            self.logger.info(f"Backup {server['name']} done and manifest written")
\ No newline at end of file
+            manifest.save(dest_dir=self.BACKUP_ROOT / timestamp)
+            journal.mark_server_done(name)
+            if budget.backoff_sec:
+                log.info(f"Budget: waited {budget.backoff_sec:.0f}s for windows / host load")
+        finally:
+            SSH_POOL.release(ssh)
+        log.info(f"Backup {server['name']} done and manifest written")
+
+    def _stream_target(self, ssh, target, codec, exclude_flags, local_base, manifest, log, budget) -> None:
+        """Pipe `tar -c… -f -` over the SSH channel straight into the local artefact."""
+        local_file = local_base / f"backup_{Path(target['path']).name}.tar{codec.suffix}"
+        # tar exits 1 when files changed while being read - archive is still usable
+        with METRICS.span("stream", manifest.server, local_file.name) as span:
+            writer, err, code = ssh.stream_to_file(
+                budget.wrap(f"tar {codec.tar_flags()} -f - {exclude_flags} {target['path']}"),
+                local_file,
+                sudo=True,
+                ok_codes=(0, 1),
+                pace=budget.pace,
+            )
+            span.bytes = writer.size
+        if code not in (0, 1):
+            raise RuntimeError(f"tar stream of {target['path']} failed (exit {code}): {err.strip()}")
+        if err.strip():
+            log.warning(f"tar stderr for {target['path']}: {err.strip()}")
+
+        digests = writer.digests()
+        manifest.add_artifact(
+            path=local_file,
+            sha256=digests.sha256,
+            size=digests.size,
+            art_type="tar",
+            xxh3=digests.xxh3,
+            codec=codec.name,
+        )
+        log.info(
+            f"Streamed {target['path']} → {local_file} "
+            f"({digests.size} bytes, {digests.mb_per_sec:.1f} MB/s)"
+        )
+
+    def _seekable_target(self, ssh, target, codec, exclude_flags, local_base, manifest, log, budget) -> None:
+        """
+        Stream the tar over SSH (compressed with `codec` on the wire), then
+        re-pack it locally as block-gzip with a member index so single
+        files can be restored without inflating the whole archive.
+        """
+        try:
+            decoder = make_decoder(codec.name)
+        except CodecUnavailable:
+            codec, decoder = GZIP, make_decoder("gzip")
+        local_file = local_base / f"backup_{Path(target['path']).name}.tar.gz"
+        part = local_file.with_name(local_file.name + ".part")
+        block_size = int(target.get("seekable_block_mb", 4)) << 20
+        try:
+            with part.open("wb") as fh, METRICS.span("stream", manifest.server, local_file.name) as span:
+                writer = seekable.BlockGzipWriter(fh, block_size=block_size)
+
+                def sink(data: bytes) -> None:
+                    for piece in decoder.stream(data):
+                        writer.write(piece)
+
+                err, code = ssh.exec_stream(
+                    budget.wrap(f"tar {codec.tar_flags()} -f - {exclude_flags} {target['path']}"),
+                    sink,
+                    sudo=True,
+                    pace=budget.pace,
+                )
+                if code not in (0, 1):
+                    raise RuntimeError(
+                        f"tar stream of {target['path']} failed (exit {code}): {err.strip()}"
+                    )
+                writer.write(decoder.finish())
+                digests = writer.close()
+                span.bytes = digests.size
+        except BaseException:
+            part.unlink(missing_ok=True)
+            raise
+        if err.strip():
+            log.warning(f"tar stderr for {target['path']}: {err.strip()}")
+        part.replace(local_file)
+
+        index = writer.index()
+        index_file = seekable.index_path_for(local_file)
+        seekable.write_index(index_file, index)
+        manifest.add_artifact(
+            path=local_file,
+            sha256=digests.sha256,
+            size=digests.size,
+            art_type="tar",
+            xxh3=digests.xxh3,
+            codec="gzip",
+            index=index_file.name,
+            blocks=len(index["blocks"]),
+            members=len(index["members"]),
+        )
+        log.info(
+            f"Seekable {target['path']} → {local_file}: {len(index['members'])} members in "
+            f"{len(index['blocks'])} blocks ({digests.size} bytes)"
+        )
+
+    def _dedup_target(self, ssh, target, exclude_flags, local_base, manifest, log, budget) -> None:
+        """
+        Stream an uncompressed tar over SSH through the chunker: only chunks
+        the store has never seen are written, the pulse keeps a JSON index.
+        """
+        store = ChunkStore.for_backup_root(self.BACKUP_ROOT)
+        chunker = TarChunker(store.put)
+        artifact = f"backup_{Path(target['path']).name}.idx.json"
+        with METRICS.span("stream", manifest.server, artifact) as span:
+            err, code = ssh.exec_stream(
+                budget.wrap(f"tar -cf - {exclude_flags} {target['path']}"),
+                chunker.feed,
+                sudo=True,
+                pace=budget.pace,
+            )
+            span.bytes = chunker.size
+        if code not in (0, 1):
+            raise RuntimeError(f"tar stream of {target['path']} failed (exit {code}): {err.strip()}")
+        if err.strip():
+            log.warning(f"tar stderr for {target['path']}: {err.strip()}")
+        stream_sha = chunker.close()
+
+        index_file = local_base / artifact
+        info = {
+            "source": target["path"],
+            "stream_size": chunker.size,
+            "stream_sha256": stream_sha,
+            "members": chunker.members,
+        }
+        write_index(index_file, chunker.chunks, info)
+        digests = multi_digest(index_file)
+        manifest.add_artifact(
+            path=index_file,
+            sha256=digests.sha256,
+            size=digests.size,
+            art_type="dedup",
+            xxh3=digests.xxh3,
+            stream_size=chunker.size,
+            stream_sha256=stream_sha,
+            chunks=len(chunker.chunks),
+        )
+        log.info(
+            f"Dedup {target['path']}: {chunker.size} bytes in {len(chunker.chunks)} chunks, "
+            f"{store.new_bytes} bytes new"
+        )
+
+    def _snapshot_target(
+        self, rsync, server, target, timestamp, local_base, manifest, log, journal
+    ) -> None:
+        """rsync the tree with --link-dest on the previous pulse + per-file digest list."""
+        tree = Path(target["path"]).name
+        dest = local_base / tree
+        dest.mkdir(parents=True, exist_ok=True)
+        previous = snapshot.find_previous(
+            self.BACKUP_ROOT, timestamp, local_base.name, tree
+        )
+        log.info(f"Snapshot {target['path']} → {dest} (link-dest: {previous or 'none'})")
+        rsync.sync_tree(
+            target["path"],
+            str(dest),
+            link_dest=str(previous) if previous else None,
+            excludes=server.get("excludes", []),
+            sudo=target.get("sudo", False),
+        )
+        key = f"snapshot:{target['path']}"
+        journal.record(server["name"], key, "transferred", tree=tree)
+
+        with METRICS.span("hash", server["name"], snapshot.list_name(tree)) as span:
+            file_list = snapshot.build_file_list(dest, previous)
+            span.bytes = file_list["new_bytes"]
+        list_file = local_base / snapshot.list_name(tree)
+        list_file.write_text(json.dumps(file_list, separators=(",", ":")))
+        digests = multi_digest(list_file)
+        entry = manifest.add_artifact(
+            path=list_file,
+            sha256=digests.sha256,
+            size=digests.size,
+            art_type="snapshot",
+            xxh3=digests.xxh3,
+            tree=tree,
+            files=len(file_list["files"]),
+            new_bytes=file_list["new_bytes"],
+            shared_bytes=file_list["shared_bytes"],
+        )
+        journal.record(server["name"], key, "manifested", entry=entry)
+        log.info(
+            f"Snapshot {target['path']}: {len(file_list['files'])} files, "
+            f"{file_list['new_bytes']} bytes new, {file_list['shared_bytes']} bytes shared"
+        )
@@ -0,0 +1,236 @@
+"""
+Resource budgets - keep backups from hurting production hosts.
+
+Config (top-level `budget` = defaults, a server's `budget` overrides keys):
+    "budget": {
+        "nice": 10,                 # remote CPU priority of tar/mysqldump (0 = unchanged)
+        "ionice_class": 3,          # 1 realtime, 2 best-effort, 3 idle (0 = unchanged)
+        "ionice_level": 7,          # 0-7 within best-effort
+        "bwlimit_kbps": 20000,      # transfer cap in KiB/s (0 = unlimited)
+        "windows": ["22:00-06:30"], # allowed start times, local clock; empty = always
+        "window_wait_min": 60,      # wait this long for a window, else stop the server
+        "max_load": 1.5,            # 1-min loadavg per core that counts as busy (0 = off)
+        "load_check_sec": 30,       # how often the load is re-sampled while streaming
+        "max_backoff_sec": 600      # longest single pause while the host is busy
+    }
+
+• Every remote producer (tar, mysqldump + compressor) runs under
+  `nice`/`ionice`; tools missing on the host are skipped.
+• `checkpoint()` runs before each artefact: outside the windows it waits
+  (or raises BudgetError - the journal lets `watchdog resume` continue
+  later); while the host is busy it backs off exponentially.
+• The bandwidth cap adapts: it is halved while the host is busy (down to
+  1/8) and doubled back towards the configured cap once it is quiet. rsync
+  picks up the current cap per transfer; streamed transfers are paced
+  chunk by chunk, which back-pressures the remote tar through the SSH window.
+  Each cap change starts a fresh pacing window.
+"""
+
+from __future__ import annotations
+
+import shlex
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from watchdog.utils.logger import WatchdogLogger
+
+_MIN_BW_FACTOR = 8      # adaptive cap never drops below bwlimit / 8
+_LOAD_WAIT_MAX = 1800   # after 30 min of back-off the artefact runs anyway
+
+
+class BudgetError(Exception):
+    """Raised when a server may not continue (outside its backup window)."""
+
+
+@dataclass(frozen=True)
+class ResourceBudget:
+    nice: int = 0
+    ionice_class: int = 0
+    ionice_level: int = 7
+    bwlimit_kbps: int = 0
+    windows: Tuple[Tuple[int, int], ...] = ()  # (start, end) minutes since midnight
+    window_wait_min: float = 60
+    max_load: float = 0.0
+    load_check_sec: float = 30
+    max_backoff_sec: float = 600
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict[str, Any]]) -> "ResourceBudget":
+        cfg = cfg or {}
+        return cls(
+            nice=int(cfg.get("nice", 0)),
+            ionice_class=int(cfg.get("ionice_class", 0)),
+            ionice_level=int(cfg.get("ionice_level", 7)),
+            bwlimit_kbps=int(cfg.get("bwlimit_kbps", 0) or 0),
+            windows=tuple(parse_window(w) for w in cfg.get("windows", [])),
+            window_wait_min=float(cfg.get("window_wait_min", 60)),
+            max_load=float(cfg.get("max_load", 0) or 0),
+            load_check_sec=float(cfg.get("load_check_sec", 30)),
+            max_backoff_sec=float(cfg.get("max_backoff_sec", 600)),
+        )
+
+    def in_window(self, now: datetime) -> bool:
+        if not self.windows:
+            return True
+        minute = now.hour * 60 + now.minute
+        return any(_covers(w, minute) for w in self.windows)
+
+    def until_window(self, now: datetime) -> float:
+        """Seconds until the next window opens (0 inside one)."""
+        if self.in_window(now):
+            return 0.0
+        minute = now.hour * 60 + now.minute
+        waits = [(start - minute) % 1440 for start, _ in self.windows]
+        return min(waits) * 60 - now.second
+
+
+def parse_window(spec: str) -> Tuple[int, int]:
+    """`"22:00-06:30"` → (1320, 390); a window may wrap past midnight."""
+    try:
+        start, end = spec.split("-")
+        return _minutes(start), _minutes(end)
+    except ValueError as exc:
+        raise ValueError(f"invalid budget window {spec!r} (expected HH:MM-HH:MM)") from exc
+
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.strip().split(":")
+    if not (0 <= int(hours) < 24 and 0 <= int(minutes) < 60):
+        raise ValueError(hhmm)
+    return int(hours) * 60 + int(minutes)
+
+
+def _covers(window: Tuple[int, int], minute: int) -> bool:
+    start, end = window
+    if start <= end:
+        return start <= minute < end
+    return minute >= start or minute < end
+
+
+class BudgetGovernor:
+    """Applies one server's ResourceBudget over its SSH connection (thread-safe)."""
+
+    def __init__(self, budget: ResourceBudget, ssh, logger: WatchdogLogger, clock=datetime.now) -> None:
+        self.budget = budget
+        self.ssh = ssh
+        self.logger = logger
+        self.clock = clock
+        self.bwlimit_kbps = budget.bwlimit_kbps  # current (adaptive) cap
+        self.backoff_sec = 0.0                   # total time spent waiting
+        self._prefix: Optional[str] = None
+        self._cores: Optional[int] = None
+        self._lock = threading.Lock()
+        self._last_sample = 0.0
+        self._pace_start = time.monotonic()
+        self._pace_bytes = 0
+
+    # ------------------------------------------------------------------ #
+    # Remote priority
+
+    def prefix(self) -> str:
+        """`nice -n N ionice -c C -n L ` (probed once; '' when nothing applies)."""
+        if self._prefix is None:
+            parts = []
+            b = self.budget
+            if b.nice or b.ionice_class:
+                out, _, _ = self.ssh.exec("command -v nice ionice")
+                found = {line.rsplit("/", 1)[-1] for line in out.split()}
+                if b.nice and "nice" in found:
+                    parts.append(f"nice -n {b.nice}")
+                if b.ionice_class and "ionice" in found:
+                    level = f" -n {b.ionice_level}" if b.ionice_class == 2 else ""
+                    parts.append(f"ionice -c {b.ionice_class}{level}")
+                if len(parts) < bool(b.nice) + bool(b.ionice_class):
+                    self.logger.warning(f"nice/ionice not fully available on host (found: {sorted(found)})")
+            self._prefix = " ".join(parts) + " " if parts else ""
+        return self._prefix
+
+    def wrap(self, command: str) -> str:
+        """Run `command` (pipelines and redirects included) under the budget's priority."""
+        prefix = self.prefix()
+        return f"{prefix}sh -c {shlex.quote(command)}" if prefix else command
+
+    # ------------------------------------------------------------------ #
+    # Scheduling
+
+    def checkpoint(self, label: str) -> None:
+        """Call before each artefact: honour windows, back off while the host is busy."""
+        self._wait_for_window(label)
+        if self.budget.max_load <= 0:
+            return
+        started = time.monotonic()
+        pause = min(30.0, self.budget.max_backoff_sec)
+        while self._sample_load():
+            if time.monotonic() - started > _LOAD_WAIT_MAX:
+                self.logger.warning(f"Host still busy after {_LOAD_WAIT_MAX // 60} min, starting {label} anyway")
+                return
+            self.logger.info(f"Host busy, pausing {label} for {pause:.0f}s (cap {self._cap_text()})")
+            self._sleep(pause)
+            pause = min(pause * 2, self.budget.max_backoff_sec)
+
+    def pace(self, nbytes: int) -> None:
+        """Streaming sink hook: re-sample the load now and then, sleep to hold the cap."""
+        if self.budget.max_load > 0 and time.monotonic() - self._last_sample >= self.budget.load_check_sec:
+            self._sample_load()
+        if not self.bwlimit_kbps:
+            return
+        with self._lock:
+            self._pace_bytes += nbytes
+            ahead = self._pace_bytes / (self.bwlimit_kbps * 1024) - (time.monotonic() - self._pace_start)
+        if ahead > 0:
+            time.sleep(ahead)
+        elif ahead < -1.0:  # idle gap - don't let unused budget turn into a burst
+            with self._lock:
+                self._pace_start, self._pace_bytes = time.monotonic(), 0
+
+    def _wait_for_window(self, label: str) -> None:
+        now = self.clock()
+        wait = self.budget.until_window(now)
+        if wait <= 0:
+            return
+        if wait > self.budget.window_wait_min * 60:
+            raise BudgetError(
+                f"outside backup window at {now:%H:%M} (next opens in {wait / 60:.0f} min); "
+                f"continue later with `watchdog resume`"
+            )
+        opens = now + timedelta(seconds=wait)
+        self.logger.info(f"Outside backup window, {label} waits until {opens:%H:%M}")
+        self._sleep(wait)
+
+    def _sample_load(self) -> bool:
+        """Read loadavg over SSH, adapt the bandwidth cap; returns True while busy."""
+        self._last_sample = time.monotonic()
+        out, _, code = self.ssh.exec("nproc; cat /proc/loadavg")
+        try:
+            lines = out.split("\n")
+            cores = self._cores = self._cores or max(1, int(lines[0]))
+            load = float(lines[1].split()[0]) / cores
+        except (ValueError, IndexError):
+            self.logger.warning(f"Could not read load average (exit {code}), not backing off")
+            return False
+        busy = load > self.budget.max_load
+        quiet = load < self.budget.max_load / 2
+        cap = self.budget.bwlimit_kbps
+        with self._lock:
+            new_cap = self.bwlimit_kbps
+            if cap and busy:
+                new_cap = max(cap // _MIN_BW_FACTOR, self.bwlimit_kbps // 2)
+            elif cap and quiet:
+                new_cap = min(cap, self.bwlimit_kbps * 2)
+            if new_cap != self.bwlimit_kbps:
+                # bytes paced at the old cap must not be re-priced at the new one
+                self.bwlimit_kbps = new_cap
+                self._pace_start, self._pace_bytes = time.monotonic(), 0
+        if busy:
+            self.logger.info(f"Host load {load:.2f}/core > {self.budget.max_load}, cap {self._cap_text()}")
+        return busy
+
+    def _cap_text(self) -> str:
+        return f"{self.bwlimit_kbps} KiB/s" if self.bwlimit_kbps else "unlimited"
+
+    def _sleep(self, seconds: float) -> None:
+        self.backoff_sec += seconds
+        time.sleep(seconds)
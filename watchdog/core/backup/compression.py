@@ -0,0 +1,91 @@
+"""
+Remote compression codecs for tar and MySQL artefacts.
+
+Config (server, target or `mysql` block - most specific wins):
+    "codec": "gzip"                                   # default
+    "codec": {"name": "zstd", "threads": 8, "level": 3}
+    "codec": {"name": "pigz", "threads": 8}
+    "codec": "none"
+
+The binary is probed on the remote host once per server; a missing
+pigz/zstd falls back to gzip, and the codec actually used is what ends
+up in the Manifest.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Union
+
+from watchdog.utils.logger import WatchdogLogger
+
+CodecSpec = Union[str, Dict[str, Any], None]
+
+
+@dataclass(frozen=True)
+class Codec:
+    name: str          # gzip | pigz | zstd | none
+    threads: int = 0   # 0 = all cores (pigz/zstd)
+    level: int = 0     # 0 = tool default
+
+    @property
+    def suffix(self) -> str:
+        return {"gzip": ".gz", "pigz": ".gz", "zstd": ".zst"}.get(self.name, "")
+
+    def filter_cmd(self) -> str:
+        """Shell filter compressing stdin → stdout ('' for none)."""
+        level = f" -{self.level}" if self.level else ""
+        if self.name == "pigz":
+            threads = f" -p {self.threads}" if self.threads else ""
+            return f"pigz{threads}{level}"
+        if self.name == "zstd":
+            return f"zstd -q -T{self.threads}{level}"
+        if self.name == "gzip":
+            return f"gzip{level}"
+        return ""
+
+    def tar_flags(self) -> str:
+        """`tar -c…` flags; -I keeps tar's own exit code (unlike a shell pipe)."""
+        if self.name == "gzip" and not self.level:
+            return "-cz"
+        if self.name == "none":
+            return "-c"
+        return f"-c -I '{self.filter_cmd()}'"
+
+    def pipe(self) -> str:
+        """Suffix for `cmd` pipelines, e.g. ' | zstd -q -T0'."""
+        cmd = self.filter_cmd()
+        return f" | {cmd}" if cmd else ""
+
+
+GZIP = Codec("gzip")
+
+
+def parse_codec(spec: CodecSpec) -> Codec:
+    if not spec:
+        return GZIP
+    if isinstance(spec, str):
+        spec = {"name": spec}
+    name = spec.get("name", "gzip")
+    if name not in ("gzip", "pigz", "zstd", "none"):
+        raise ValueError(f"Unknown codec: {name}")
+    return Codec(name, int(spec.get("threads", 0)), int(spec.get("level", 0)))
+
+
+class CodecResolver:
+    """Probe codec binaries on one remote host (cached) with gzip fallback."""
+
+    def __init__(self, ssh, logger: WatchdogLogger) -> None:
+        self.ssh = ssh
+        self.logger = logger
+        self._available: Dict[str, bool] = {"gzip": True, "none": True}
+
+    def resolve(self, spec: CodecSpec) -> Codec:
+        codec = parse_codec(spec)
+        if codec.name not in self._available:
+            _, _, code = self.ssh.exec(f"command -v {codec.name}")
+            self._available[codec.name] = code == 0
+        if not self._available[codec.name]:
+            self.logger.warning(f"{codec.name} not found on remote host - falling back to gzip")
+            return GZIP
+        return codec
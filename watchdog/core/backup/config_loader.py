@@ -3,6 +3,8 @@ import os
 from pathlib import Path
 
 class BackupConfig:
+    DEFAULT_WORKERS = 1
+
     def __init__(self, config_path: Path):
         with open(config_path) as f:
             self.config = json.load(f)
@@ -19,4 +21,62 @@ class BackupConfig:
                     env_var = mysql["password"].split("env:")[1]
                     mysql["password"] = os.getenv(env_var)
                     
-        return servers
\ No newline at end of file
+        return servers
+
+    def get_workers(self) -> int:
+        """Number of servers backed up concurrently (`concurrency.workers`)."""
+        workers = self.config.get("concurrency", {}).get("workers", self.DEFAULT_WORKERS)
+        return max(1, int(workers))
+
+    def get_verify_settings(self) -> dict:
+        """`verify` block: pool settings and verification cache options."""
+        verify = self.config.get("verify", {})
+        return {
+            "workers": max(1, int(verify.get("workers", 1))),
+            "executor": verify.get("executor", "process"),
+            "cache": verify.get("cache", True),
+            "recheck_days": verify.get("recheck_days", 30),
+            "sql_index": verify.get("sql_index", True),
+        }
+
+    def get_ssh_settings(self) -> dict:
+        """`ssh` block: connection reuse (idle expiry, ControlMaster socket dir)."""
+        ssh = self.config.get("ssh", {})
+        return {
+            "idle_sec": max(0, int(ssh.get("idle_sec", 600))),
+            "control_dir": ssh.get("control_dir", "/opt/watchdog/state/ssh"),
+        }
+
+    def get_metrics_settings(self) -> dict:
+        """`metrics` block: Prometheus textfile path (None/"" disables it)."""
+        metrics = self.config.get("metrics", {})
+        return {
+            "textfile": metrics.get(
+                "textfile", "/var/lib/node_exporter/textfile_collector/watchdog.prom"
+            ),
+        }
+
+    def get_budget(self, server: dict) -> dict:
+        """
+        Resource budget for one server: top-level `budget` defaults, overridden
+        by the server's own `budget` block. `rsync.bwlimit_kbps` still works as
+        the bandwidth cap when the budget doesn't set one.
+        """
+        budget = {**self.config.get("budget", {}), **server.get("budget", {})}
+        if not budget.get("bwlimit_kbps") and server.get("rsync", {}).get("bwlimit_kbps"):
+            budget["bwlimit_kbps"] = server["rsync"]["bwlimit_kbps"]
+        return budget
+
+    def get_retention_settings(self) -> dict:
+        """`retention` block (GFS counts); pruning is off unless the block exists."""
+        retention = self.config.get("retention")
+        if not retention:
+            return {"enabled": False}
+        return {
+            "enabled": retention.get("enabled", True),
+            "dry_run": retention.get("dry_run", False),
+            "daily": retention.get("daily", 7),
+            "weekly": retention.get("weekly", 4),
+            "monthly": retention.get("monthly", 6),
+            "min_keep": retention.get("min_keep", 3),
+        }
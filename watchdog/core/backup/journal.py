@@ -0,0 +1,127 @@
+"""
+PulseJournal - per-pulse progress log that makes pulses resumable.
+
+• Append-only JSON lines in `<pulse dir>/.journal.jsonl`, one record per
+  artefact state change: dumped → transferred → hashed → manifested
+  (steps that happen in one go, e.g. stream + hash, skip states).
+• Each record carries what a resume needs: remote/local paths, digests
+  and finally the manifest entry itself.
+• A server whose manifest was written is marked `done` and skipped as
+  a whole by `watchdog resume`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from watchdog.core.verify.manifest import Manifest
+
+STATES = ("dumped", "transferred", "hashed", "manifested")
+JOURNAL_NAME = ".journal.jsonl"
+
+
+class PulseJournal:
+    def __init__(self, pulse_dir: Path) -> None:
+        self.path = Path(pulse_dir) / JOURNAL_NAME
+        self._lock = threading.Lock()
+        # (server, artifact) -> merged data of every record, incl. "state"
+        self._artifacts: Dict[tuple, Dict[str, Any]] = {}
+        self._done: set = set()
+        self._load()
+
+    # Queries
+
+    def state(self, server: str, artifact: str) -> Optional[str]:
+        return self._artifacts.get((server, artifact), {}).get("state")
+
+    def data(self, server: str, artifact: str) -> Dict[str, Any]:
+        return dict(self._artifacts.get((server, artifact), {}))
+
+    def reached(self, server: str, artifact: str, state: str) -> bool:
+        current = self.state(server, artifact)
+        return current is not None and STATES.index(current) >= STATES.index(state)
+
+    def restore(self, server: str, artifact: str, manifest: "Manifest", local_dir: Path) -> bool:
+        """
+        Re-add a manifested artefact to `manifest` if its file is still on
+        disk. True means the caller can skip the artefact entirely.
+        """
+        data = self._artifacts.get((server, artifact), {})
+        entry = data.get("entry")
+        if data.get("state") != "manifested" or not entry:
+            return False
+        if not (Path(local_dir) / entry["path"]).exists():
+            return False
+        manifest.artifacts.append(entry)
+        return True
+
+    def server_done(self, server: str) -> bool:
+        return server in self._done
+
+    @property
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    # Updates
+
+    def record(self, server: str, artifact: str, state: str, **data: Any) -> None:
+        if state not in STATES:
+            raise ValueError(f"unknown journal state {state!r}")
+        self._append({"server": server, "artifact": artifact, "state": state, **data})
+
+    def mark_server_done(self, server: str) -> None:
+        self._append({"server": server, "done": True})
+
+    def forget(self, server: str, artifact: str) -> None:
+        """Start an artefact over (e.g. its staged remote file vanished)."""
+        self._append({"server": server, "artifact": artifact, "reset": True})
+
+    # Internals
+
+    def _append(self, rec: Dict[str, Any]) -> None:
+        rec["at"] = round(time.time(), 3)
+        line = json.dumps(rec, separators=(",", ":")) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a") as fh:
+                fh.write(line)
+                fh.flush()
+                os.fsync(fh.fileno())
+            self._apply(rec)
+
+    def _apply(self, rec: Dict[str, Any]) -> None:
+        if rec.get("done"):
+            self._done.add(rec["server"])
+            return
+        key = (rec["server"], rec["artifact"])
+        if rec.get("reset"):
+            self._artifacts.pop(key, None)
+            return
+        merged = self._artifacts.setdefault(key, {})
+        merged.update({k: v for k, v in rec.items() if k not in ("server", "artifact", "at")})
+
+    def _load(self) -> None:
+        try:
+            lines = self.path.read_text().splitlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, KeyError):
+                continue  # torn last line after a crash
+
+
+def latest_journal(backup_root: Path) -> Optional[Path]:
+    """Newest pulse directory that has a journal."""
+    pulses: List[Path] = sorted(
+        (p for p in Path(backup_root).iterdir() if (p / JOURNAL_NAME).exists()),
+        key=lambda p: p.name,
+    ) if Path(backup_root).is_dir() else []
+    return pulses[-1] if pulses else None
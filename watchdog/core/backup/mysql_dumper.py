@@ -1,20 +1,37 @@
 """
-    MySQL dump helper - creates a gz-compressed dump on the remote host
-    and downloads it via rsync.
+    MySQL dump helper - creates a compressed dump (gzip, pigz, zstd or
+    none - see compression.py) on the remote host
+    and downloads it via rsync, or (transfer="stream") pipes the dump
+    over the SSH channel straight into the local file.
+
+    With `per_database` every database becomes its own artefact, dumped
+    by up to `parallel_workers` concurrent mysqldump sessions.
+
+    With a `journal` every dump is journaled, so a resumed pulse skips
+    finished databases and re-fetches staged dumps instead of re-dumping.
+
+    With a `budget` (BudgetGovernor) each dump waits for its window/quiet
+    host and runs under nice/ionice; streamed dumps are rate-capped.
 """
 
 from __future__ import annotations
 
 from watchdog.core.verify.manifest import Manifest
-from watchdog.core.verify.checksum import sha256_stream, xxh3_stream
 
+import hashlib
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
-from typing import Dict
+from typing import Dict, List, Optional, Tuple
 
 from watchdog.utils.logger import WatchdogLogger
 from .ssh_handler import SSHHandler
 from .rsync_handler import RsyncHandler
+from .compression import GZIP, Codec
+from .journal import PulseJournal
+from .budget import BudgetGovernor
+from watchdog.core.metrics import METRICS
 
 
 class MySQLDumper:
@@ -26,6 +43,10 @@ class MySQLDumper:
         server_name: str,
         local_base: Path,
         manifest: Manifest,
+        transfer: str = "rsync",
+        codec: Codec = GZIP,
+        journal: Optional[PulseJournal] = None,
+        budget: Optional[BudgetGovernor] = None,
     ) -> None:
         self.ssh = ssh
         self.rsync = rsync
@@ -33,53 +54,207 @@ class MySQLDumper:
         self.server_name = server_name
         self.local_base = local_base
         self.manifest = manifest
-        self.logger = WatchdogLogger("backup")
+        self.transfer = transfer
+        self.codec = codec
+        self.journal = journal
+        self.budget = budget
+        self.logger = WatchdogLogger("backup", prefix=server_name)
 
     def dump(self) -> None:
         if not self.cfg.get("enabled", True):
             self.logger.info(f"MySQL dump disabled for {self.server_name}")
             return
 
+        if self.cfg.get("per_database"):
+            self._dump_parallel()
+            return
+
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        remote_tmp = f"/tmp/mysql_{ts}.sql.gz"
-        local_file = self.local_base / f"mysql_{ts}.sql.gz"
+        extra = self.cfg.get("dump_options", "")
+
+        self.logger.info(f"Dumping MySQL on {self.server_name} …")
+        self._dump_artifact(
+            f"mysqldump {self._auth()} --all-databases {extra}", f"mysql_{ts}"
+        )
+
+    # ------------------------------------------------------------------ #
+    # Per-database mode
+
+    def _dump_parallel(self) -> None:
+        """
+        One artefact per database, `parallel_workers` mysqldump sessions at
+        a time over the same SSH transport. Largest databases start first;
+        a failing database doesn't stop the others but fails the dump.
+        """
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        extra = self.cfg.get("dump_options", "")
+        if "--single-transaction" not in extra:
+            extra = f"--single-transaction {extra}".strip()
+        workers = max(1, int(self.cfg.get("parallel_workers", 4)))
+
+        databases = self.list_databases()
+        self.logger.info(
+            f"Dumping {len(databases)} MySQL databases on {self.server_name} "
+            f"with {workers} parallel session(s) …"
+        )
+
+        failed: List[str] = []
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mysqldump") as pool:
+            futures = {
+                pool.submit(
+                    self._dump_artifact,
+                    f"mysqldump {self._auth()} {extra} --databases '{db}'",
+                    f"mysql_{_safe_name(db)}_{ts}",
+                    db,
+                ): db
+                for db, _size, _tables in databases
+            }
+            for fut in as_completed(futures):
+                try:
+                    fut.result()
+                except Exception as exc:  # noqa: BLE001
+                    self.logger.error(f"Dump of database {futures[fut]} failed: {exc}")
+                    failed.append(futures[fut])
+
+        if failed:
+            raise RuntimeError(f"MySQL dump failed for: {', '.join(sorted(failed))}")
+
+    def list_databases(self) -> List[Tuple[str, int, int]]:
+        """(name, bytes, tables) per user database, largest first."""
+        query = (
+            "SELECT s.schema_name, COALESCE(SUM(t.data_length + t.index_length), 0), "
+            "COUNT(t.table_name) FROM information_schema.schemata s "
+            "LEFT JOIN information_schema.tables t ON t.table_schema = s.schema_name "
+            "GROUP BY s.schema_name"
+        )
+        out, err, code = self.ssh.exec(f'mysql {self._auth()} -N -B -e "{query}"')
+        if code != 0:
+            self.logger.error(f"Listing databases failed (exit {code}): {_clean(err)}")
+            raise RuntimeError("MySQL database listing failed")
+
+        databases = []
+        for line in out.splitlines():
+            parts = line.split("\t")
+            if len(parts) != 3 or parts[0] in SYSTEM_SCHEMAS:
+                continue
+            databases.append((parts[0], int(parts[1]), int(parts[2])))
+        databases.sort(key=lambda d: d[1], reverse=True)
+        return databases
+
+    # ------------------------------------------------------------------ #
+    # Internals
 
+    def _auth(self) -> str:
         user = self.cfg["user"]
         pw   = self.cfg["password"]
         port = self.cfg.get("port", 3306)
-        extra = self.cfg.get("dump_options", "")
+        # Note: using single quotes around password to avoid issues with special chars
+        return f"-h127.0.0.1 -P{port} -u{user} -p'{pw}'"
 
-        self.logger.info(f"Dumping MySQL on {self.server_name} …")
+    def _dump_artifact(self, dump_cmd: str, basename: str, database: Optional[str] = None) -> None:
+        """Run one mysqldump command and register the result in the manifest."""
+        key = f"mysql:{database}" if database else "mysql"
+        if self.journal and self.journal.restore(self.server_name, key, self.manifest, self.local_base):
+            self.logger.info(f"{key} already dumped in this pulse, skipping")
+            return
+        done = self.journal.data(self.server_name, key) if self.journal else {}
+        basename = done.get("basename", basename)  # keep the interrupted run's file names
 
-        # Note: using single quotes around password to avoid issues with special chars
-        dump_cmd = (
-            f"mysqldump -h127.0.0.1 -P{port} -u{user} -p'{pw}' "
-            f"--all-databases {extra} | gzip > {remote_tmp}"
+        remote_tmp = f"/tmp/{basename}.sql{self.codec.suffix}"
+        local_file = self.local_base / f"{basename}.sql{self.codec.suffix}"
+        dump_cmd += self.codec.pipe()
+
+        hashed = (
+            done.get("state") == "hashed"
+            and local_file.exists()
+            and local_file.stat().st_size == done["size"]
         )
+        if done and not hashed and (
+            self.transfer == "stream" or not self.ssh.remote_exists(remote_tmp)
+        ):
+            self.journal.forget(self.server_name, key)
+            done = {}
 
-        out, err, code = self.ssh.exec(dump_cmd)
+        if hashed:
+            sha256, xxh3, size = done["sha256"], done["xxh3"], done["size"]
+        else:
+            # only real work waits for the window / host load
+            pace = None
+            if self.budget is not None:
+                self.budget.checkpoint(key)
+                pace = self.budget.pace
+            if not done:
+                if self.transfer == "stream":
+                    with METRICS.span("stream", self.server_name, local_file.name) as span:
+                        writer, err, code = self.ssh.stream_to_file(self._wrap(dump_cmd), local_file, pace=pace)
+                        span.bytes = writer.size
+                else:
+                    with METRICS.span("remote_compress", self.server_name, local_file.name):
+                        out, err, code = self.ssh.exec(self._wrap(f"{dump_cmd} > {remote_tmp}"))
 
-        # Check for insecure password usage
-        insecure_msg = "mysqldump: [Warning] Using a password on the command line interface can be insecure."
-        err_clean = err.replace(insecure_msg, "").strip()
+                err_clean = _clean(err)
+                if code != 0:
+                    self.logger.error(f"mysqldump exit {code}: {err_clean}")
+                    raise RuntimeError("MySQL dump failed")
+                if err_clean:
+                    self.logger.warning(f"mysqldump stderr: {err_clean}")
+                if self.transfer != "stream":
+                    self._record(key, "dumped", remote=remote_tmp, basename=basename)
+            else:
+                self.logger.info(f"Reusing staged {remote_tmp} from the interrupted run")
 
-        if code != 0:
-            self.logger.error(f"mysqldump exit {code}: {err_clean}")
-            raise RuntimeError("MySQL dump failed")
-        if err_clean:
-            self.logger.warning(f"mysqldump stderr: {err_clean}")
+            if self.transfer == "stream":
+                # digests were computed while the bytes arrived
+                digests = writer.digests()
+            else:
+                expected = self.ssh.remote_sha256(remote_tmp) if self.rsync.remote_digest else None
+                digests = self.rsync.download_verified(remote_tmp, self.local_base, expected)
+            self.logger.info(f"Hashed {local_file.name} at {digests.mb_per_sec:.1f} MB/s")
+            sha256, xxh3, size = digests.sha256, digests.xxh3, digests.size
+            self._record(key, "hashed", sha256=sha256, xxh3=xxh3, size=size, basename=basename)
 
-        self.rsync.download(remote_tmp, str(self.local_base))
-        self.ssh.exec_sudo(f"rm {remote_tmp}")
+        if self.transfer != "stream":
+            self.ssh.exec_sudo(f"rm -f {remote_tmp}")
 
-        sha = sha256_stream(local_file)
-        xxh = xxh3_stream(local_file)
-        self.manifest.add_artifact(
+        extra = {"database": database} if database else {}
+        entry = self.manifest.add_artifact(
             path=local_file,
-            sha256=sha,
-            size=local_file.stat().st_size,
+            sha256=sha256,
+            size=size,
             art_type="mysql",
-            xxh3=xxh,
+            xxh3=xxh3,
+            codec=self.codec.name,
+            **extra,
         )
+        self._record(key, "manifested", entry=entry)
 
         self.logger.info(f"MySQL dump saved → {local_file}")
+
+    def _wrap(self, command: str) -> str:
+        return self.budget.wrap(command) if self.budget is not None else command
+
+    def _record(self, key: str, state: str, **data) -> None:
+        if self.journal:
+            self.journal.record(self.server_name, key, state, **data)
+
+
+# ---------------------------------------------------------------------- #
+# Helpers
+
+SYSTEM_SCHEMAS = {"information_schema", "performance_schema", "sys"}
+_INSECURE_MSG = "mysqldump: [Warning] Using a password on the command line interface can be insecure."
+
+
+def _clean(err: str) -> str:
+    """Drop the insecure-password warning mysql/mysqldump always print."""
+    return err.replace(_INSECURE_MSG, "").replace(
+        _INSECURE_MSG.replace("mysqldump:", "mysql:"), ""
+    ).strip()
+
+
+def _safe_name(name: str) -> str:
+    """File-name-safe database name; a short hash keeps `a b` and `a_b` apart."""
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+    if safe != name:
+        safe += "_" + hashlib.sha256(name.encode()).hexdigest()[:8]
+    return safe
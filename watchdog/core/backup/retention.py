@@ -0,0 +1,294 @@
+"""
+Retention - grandfather-father-son pruning of pulse directories.
+
+• Keeps the newest pulse of each of the last `daily` days, `weekly` ISO
+  weeks and `monthly` months, plus the newest `min_keep` pulses
+  regardless (and any pulse passed in `protect`). Verified pulses (per
+  the catalog) are preferred as a bucket's representative.
+• Freed space is predicted hard-link aware: an inode only counts when
+  every link to it lives in the pruned set (snapshot pulses share most
+  files with their neighbours).
+• Dedup chunks referenced by no surviving pulse index are collected too,
+  unless a running pulse reused them since the plan (their mtime moves).
+  So are cached SQL section indexes of dumps no surviving pulse holds.
+• Pruned pulses are renamed to `.trash-<name>` at once (so nothing else
+  sees them) and removed by `ionice -c3 nice -n19 rm -rf` - in a
+  background thread when run after a pulse.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from watchdog.core.catalog.catalog import safe_catalog
+from watchdog.core.dedup.chunk_store import CHUNK_DIR, ChunkStore
+from watchdog.core.verify.manifest import Manifest
+from watchdog.core.verify.sql_inspector import INDEX_DIR as SQL_INDEX_DIR, INDEX_SUFFIX as SQL_INDEX_SUFFIX
+from watchdog.utils.logger import WatchdogLogger
+
+PULSE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}$")
+PULSE_FMT = "%Y-%m-%d_%H-%M-%S"
+TRASH_PREFIX = ".trash-"
+
+
+@dataclass
+class RetentionPolicy:
+    daily: int = 7
+    weekly: int = 4
+    monthly: int = 6
+    min_keep: int = 3
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]) -> "RetentionPolicy":
+        return cls(
+            daily=max(0, int(cfg.get("daily", 7))),
+            weekly=max(0, int(cfg.get("weekly", 4))),
+            monthly=max(0, int(cfg.get("monthly", 6))),
+            min_keep=max(1, int(cfg.get("min_keep", 3))),
+        )
+
+
+@dataclass
+class PrunePlan:
+    keep: Dict[str, List[str]] = field(default_factory=dict)   # pulse -> reasons
+    delete: List[str] = field(default_factory=list)
+    freed_bytes: int = 0            # pulse dirs, hard-link aware
+    chunk_garbage: List[Path] = field(default_factory=list)
+    chunk_bytes: int = 0
+    index_garbage: List[Path] = field(default_factory=list)   # .sql_index entries
+    started: float = 0.0            # chunks touched after this are in use again
+
+    @property
+    def total_bytes(self) -> int:
+        return self.freed_bytes + self.chunk_bytes
+
+    def lines(self) -> List[str]:
+        out = [f"keep   {name}  ({', '.join(why)})" for name, why in sorted(self.keep.items())]
+        out += [f"delete {name}" for name in sorted(self.delete)]
+        out.append(
+            f"{len(self.delete)} pulse(s) to delete, {len(self.chunk_garbage)} orphaned chunk(s); "
+            f"predicted reclaim {_human(self.freed_bytes)} + {_human(self.chunk_bytes)} chunks"
+        )
+        return out
+
+
+def select(
+    pulses: Iterable[str],
+    policy: RetentionPolicy,
+    protect: Iterable[str] = (),
+    passing: Optional[Set[str]] = None,
+) -> Tuple[Dict[str, List[str]], List[str]]:
+    """
+    GFS selection over pulse names; returns (keep -> reasons, delete).
+    With `passing` (verified pulses) a bucket is represented by its newest
+    passing pulse, so a failed late run never displaces the good one.
+    """
+    newest_first = sorted(pulses, reverse=True)
+    keep: Dict[str, List[str]] = {}
+    for name in newest_first[: policy.min_keep]:
+        keep.setdefault(name, []).append("recent")
+    for name in protect:
+        if name in newest_first:
+            keep.setdefault(name, []).append("protected")
+
+    rules = (
+        ("daily", policy.daily, lambda d: d.date()),
+        ("weekly", policy.weekly, lambda d: d.isocalendar()[:2]),
+        ("monthly", policy.monthly, lambda d: (d.year, d.month)),
+    )
+    for label, count, bucket_of in rules:
+        buckets: Dict[Any, List[str]] = {}   # insertion order = newest bucket first
+        for name in newest_first:
+            buckets.setdefault(bucket_of(datetime.strptime(name, PULSE_FMT)), []).append(name)
+        for members in list(buckets.values())[:count]:
+            good = [n for n in members if n in passing] if passing else []
+            keep.setdefault((good or members)[0], []).append(label)
+    return keep, [n for n in newest_first if n not in keep]
+
+
+class RetentionEngine:
+    def __init__(self, backup_root: Path, policy: RetentionPolicy) -> None:
+        self.backup_root = Path(backup_root)
+        self.policy = policy
+        self.logger = WatchdogLogger("retention")
+
+    def pulses(self) -> List[str]:
+        if not self.backup_root.is_dir():
+            return []
+        return sorted(
+            p.name for p in self.backup_root.iterdir() if p.is_dir() and PULSE_RE.match(p.name)
+        )
+
+    def plan(self, protect: Iterable[str] = ()) -> PrunePlan:
+        started = time.time()
+        keep, delete = select(self.pulses(), self.policy, protect, self._passing())
+        plan = PrunePlan(keep=keep, delete=delete, started=started)
+        plan.freed_bytes = freed_bytes([self.backup_root / n for n in delete])
+        plan.chunk_garbage, plan.chunk_bytes = self._chunk_garbage(keep, started)
+        plan.index_garbage = self._index_garbage(keep, started)
+        return plan
+
+    def apply(self, plan: PrunePlan, background: bool = True) -> Optional[threading.Thread]:
+        """Hide pruned pulses at once, delete them (and orphan chunks) niced."""
+        trash: List[Path] = []
+        for name in plan.delete:
+            src = self.backup_root / name
+            dst = self.backup_root / f"{TRASH_PREFIX}{name}"
+            try:
+                src.rename(dst)
+                trash.append(dst)
+            except OSError as exc:
+                self.logger.error(f"Could not move {src} to trash: {exc}")
+        catalog = safe_catalog(self.backup_root)
+        if catalog is not None and plan.delete:
+            try:
+                catalog.mark_pruned(plan.delete)   # history rows stay queryable
+            except sqlite3.Error as exc:
+                self.logger.warning(f"Could not update catalog: {exc}")
+        # leftovers of an earlier run that was cut short
+        trash += [p for p in self.backup_root.glob(f"{TRASH_PREFIX}*") if p not in trash]
+
+        if background:
+            # not a daemon: a CLI pulse exits only once deletion and chunk/index GC are done
+            th = threading.Thread(target=self._delete, args=(trash, plan), name="retention", daemon=False)
+            th.start()
+            return th
+        self._delete(trash, plan)
+        return None
+
+    # Internals
+
+    def _delete(self, trash: List[Path], plan: PrunePlan) -> None:
+        started = time.monotonic()
+        for path in trash:
+            result = subprocess.run(_niced(["rm", "-rf", "--one-file-system", "--", str(path)]),
+                                    capture_output=True)
+            if result.returncode != 0:
+                self.logger.error(f"Deleting {path} failed: {result.stderr.decode().strip()}")
+            else:
+                self.logger.info(f"Deleted {path.name[len(TRASH_PREFIX):]}")
+        # a dedup pulse may have reused a chunk since the plan (ChunkStore.put bumps mtime)
+        garbage = [p for p in plan.chunk_garbage if _untouched_since(p, plan.started)]
+        if garbage:
+            with tempfile.NamedTemporaryFile("wb", delete=False) as fh:
+                fh.write(b"\0".join(str(p).encode() for p in garbage))
+            try:
+                with open(fh.name, "rb") as stdin:
+                    subprocess.run(_niced(["xargs", "-0", "rm", "-f", "--"]), stdin=stdin, capture_output=True)
+            finally:
+                os.unlink(fh.name)
+        for path in plan.index_garbage:
+            if _untouched_since(path, plan.started):
+                path.unlink(missing_ok=True)
+        self.logger.info(
+            f"Retention done in {time.monotonic() - started:.0f}s: {len(trash)} pulse(s), "
+            f"{len(garbage)} chunk(s), ~{_human(plan.total_bytes)} freed"
+        )
+
+    def _passing(self) -> Optional[Set[str]]:
+        catalog = safe_catalog(self.backup_root)
+        if catalog is None:
+            return None
+        try:
+            return catalog.passing_pulses()
+        except sqlite3.Error as exc:
+            self.logger.warning(f"Could not read verification history: {exc}")
+            return None
+
+    def _index_garbage(self, keep: Dict[str, List[str]], started: float) -> List[Path]:
+        """Cached SQL section indexes of dumps that no surviving manifest lists."""
+        index_dir = self.backup_root / SQL_INDEX_DIR
+        if not index_dir.is_dir():
+            return []
+        wanted: Set[str] = set()
+        for name in keep:
+            for manifest_file in (self.backup_root / name).glob("*.json"):
+                try:
+                    data = json.loads(manifest_file.read_text())
+                except (OSError, ValueError):
+                    continue
+                if Manifest.is_manifest(data):
+                    wanted.update(a.get("sha256") for a in data["artifacts"] if a.get("type") == "mysql")
+        return [
+            p for p in index_dir.glob(f"*{SQL_INDEX_SUFFIX}")
+            if p.name[: -len(SQL_INDEX_SUFFIX)] not in wanted and _untouched_since(p, started)
+        ]
+
+    def _chunk_garbage(self, keep: Dict[str, List[str]], started: float) -> Tuple[List[Path], int]:
+        """Chunks no surviving dedup index references (and not written since `started`)."""
+        chunk_root = self.backup_root / CHUNK_DIR
+        if not chunk_root.is_dir():
+            return [], 0
+        referenced: Set[str] = set()
+        for name in keep:
+            for index_file in (self.backup_root / name).glob("*/*.idx.json"):
+                try:
+                    data = json.loads(index_file.read_text())
+                except (OSError, ValueError):
+                    continue
+                referenced.update(digest for digest, _ in data.get("chunks", []))
+
+        store = ChunkStore(chunk_root)
+        garbage, size = [], 0
+        for digest in store.iter_digests():
+            if digest in referenced:
+                continue
+            path = store.path_for(digest)
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if st.st_mtime >= started:   # written by a pulse running right now
+                continue
+            garbage.append(path)
+            size += st.st_blocks * 512
+        return garbage, size
+
+
+def freed_bytes(dirs: Iterable[Path]) -> int:
+    """Allocated bytes that deleting `dirs` would really release."""
+    seen: Dict[Tuple[int, int], List[int]] = {}   # inode -> [links found, nlink, bytes]
+    for root in dirs:
+        for dirpath, dirnames, filenames in os.walk(root):
+            for fname in filenames:
+                try:
+                    st = os.lstat(os.path.join(dirpath, fname))
+                except OSError:
+                    continue
+                entry = seen.setdefault((st.st_dev, st.st_ino), [0, st.st_nlink, st.st_blocks * 512])
+                entry[0] += 1
+    return sum(size for found, nlink, size in seen.values() if found >= nlink)
+
+
+def _untouched_since(path: Path, started: float) -> bool:
+    try:
+        return path.stat().st_mtime < started
+    except OSError:
+        return False
+
+
+def _niced(cmd: List[str]) -> List[str]:
+    prefix = ["nice", "-n", "19"]
+    if shutil.which("ionice"):
+        prefix = ["ionice", "-c", "3", *prefix]
+    return prefix + cmd
+
+
+def _human(num: float) -> str:
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if num < 1024:
+            return f"{num:.1f} {unit}"
+        num /= 1024
+    return f"{num:.1f} PB"
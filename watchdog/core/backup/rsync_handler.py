@@ -1,15 +1,123 @@
+import os
 import subprocess
+from pathlib import Path
+from typing import Optional
+
+from watchdog.core.verify.checksum import Digests, multi_digest
+from watchdog.core.metrics import METRICS
+
+# payloads that zlib (-z) cannot shrink any further
+COMPRESSED_SUFFIXES = (".gz", ".tgz", ".zst", ".xz", ".bz2", ".lz4", ".zip")
+CONTROL_DIR = "/opt/watchdog/state/ssh"
+
 
 class RsyncHandler:
-    def __init__(self, host, user="root", port=22):
+    def __init__(
+        self,
+        host,
+        user="root",
+        port=22,
+        partial=False,
+        inplace=False,
+        bwlimit_kbps=None,
+        remote_digest=False,
+        retries=2,
+        key_file=None,
+        multiplex=True,
+        control_dir=CONTROL_DIR,
+        control_persist=600,
+    ):
         self.host = host
         self.user = user
         self.port = port
+        self.partial = partial
+        self.inplace = inplace
+        self.bwlimit_kbps = bwlimit_kbps
+        self.remote_digest = remote_digest  # callers compare against SSHHandler.remote_sha256
+        self.retries = retries
+        self.key_file = key_file
+        self.multiplex = multiplex
+        self.control_dir = control_dir
+        self.control_persist = control_persist
+        self.budget = None  # BudgetGovernor: adaptive bwlimit + nice/ionice for the remote rsync
+        self.label = host   # server name in metrics spans
+
+    @classmethod
+    def from_server(cls, server, ssh_settings=None):
+        """
+        Build from a server config entry (`ssh` + optional `rsync` block);
+        `ssh_settings` is BackupConfig.get_ssh_settings().
+        """
+        ssh_cfg = server["ssh"]
+        opts = server.get("rsync", {})
+        ssh_settings = ssh_settings or {}
+        handler = cls(
+            server["ip"],
+            user=ssh_cfg["user"],
+            port=ssh_cfg.get("port", 22),
+            partial=opts.get("partial", False),
+            inplace=opts.get("inplace", False),
+            bwlimit_kbps=opts.get("bwlimit_kbps"),
+            remote_digest=opts.get("remote_digest", False),
+            retries=opts.get("retries", 2),
+            key_file=ssh_cfg.get("key_file"),
+            multiplex=ssh_cfg.get("multiplex", True),
+            control_dir=ssh_settings.get("control_dir", CONTROL_DIR),
+            control_persist=ssh_settings.get("idle_sec", 600),
+        )
+        handler.label = server["name"]
+        return handler
+
+    def ssh_command(self):
+        """
+        Remote shell for `rsync -e`. With `multiplex` every rsync rides one
+        OpenSSH ControlMaster connection per host: only the first transfer
+        pays for the handshake, and the master lingers `control_persist`
+        seconds so later pulses can reuse it.
+        """
+        parts = ["ssh", "-p", str(self.port)]
+        if self.key_file:
+            parts += ["-i", self.key_file]
+        if self.multiplex:
+            os.makedirs(self.control_dir, mode=0o700, exist_ok=True)
+            parts += [
+                "-o", "ControlMaster=auto",
+                # %C = hash of host/port/user: short enough for the socket path limit
+                "-o", f"ControlPath={self.control_dir}/%C",
+                # 0 must not become OpenSSH's "persist forever"
+                "-o", "ControlPersist="
+                + (f"{int(self.control_persist)}s" if self.control_persist > 0 else "no"),
+            ]
+        return " ".join(parts)
+
+    def options(self, remote_path, compress=None):
+        """rsync flags for one artefact; `-z` only for payloads that can shrink."""
+        if compress is None:
+            compress = not str(remote_path).endswith(COMPRESSED_SUFFIXES)
+        opts = ["-avz" if compress else "-av"]
+        if self.partial:
+            opts.append("--partial")
+        if self.inplace:
+            opts.append("--inplace")
+        opts += self._budget_options()
+        return opts
 
-    def download(self, remote_path, local_path):
+    def _budget_options(self, sudo=False):
+        """--bwlimit (current adaptive cap) and a niced --rsync-path."""
+        opts = []
+        bwlimit = self.budget.bwlimit_kbps if self.budget else self.bwlimit_kbps
+        if bwlimit:
+            opts.append(f"--bwlimit={bwlimit}")
+        prefix = self.budget.prefix() if self.budget else ""
+        if sudo or prefix:
+            # needs NOPASSWD for rsync when sudo is used
+            opts.append(f"--rsync-path={'sudo -n ' if sudo else ''}{prefix}rsync")
+        return opts
+
+    def download(self, remote_path, local_path, compress=None):
         cmd = [
-            "rsync", "-avz",
-            "-e", f"ssh -p {self.port}",
+            "rsync", *self.options(remote_path, compress),
+            "-e", self.ssh_command(),
             f"{self.user}@{self.host}:{remote_path}",
             local_path
         ]
@@ -17,3 +125,42 @@ class RsyncHandler:
         if result.returncode != 0:
             raise Exception(f"Rsync failed: {result.stderr.decode()}")
         return result.stdout.decode()
+
+    def download_verified(self, remote_path, local_dir, expected_sha256: Optional[str] = None) -> Digests:
+        """
+        Download and hash in one go. With `expected_sha256` (remote-side
+        digest) a mismatch is re-fetched up to `self.retries` times instead
+        of surfacing later in verification.
+        """
+        local_file = Path(local_dir) / Path(remote_path).name
+        for attempt in range(self.retries + 1):
+            with METRICS.span("transfer", self.label, local_file.name) as span:
+                self.download(remote_path, str(local_dir))
+                span.bytes = local_file.stat().st_size
+            digests = multi_digest(local_file)
+            METRICS.add_digests("hash", self.label, digests, local_file.name)
+            if expected_sha256 is None or digests.sha256 == expected_sha256:
+                return digests
+            # drop the bad copy - rsync's size/mtime quick check would keep it
+            local_file.unlink(missing_ok=True)
+        raise Exception(
+            f"Digest mismatch for {remote_path} after {self.retries + 1} attempts"
+        )
+
+    def sync_tree(self, remote_dir, local_dir, link_dest=None, excludes=(), sudo=False):
+        """
+        Mirror `remote_dir` into `local_dir`. With `link_dest` (previous
+        snapshot) unchanged files become hard links and never cross the wire.
+        """
+        cmd = ["rsync", "-a", "--delete", "--numeric-ids", "-e", self.ssh_command()]
+        cmd += self._budget_options(sudo)
+        if link_dest:
+            cmd.append(f"--link-dest={link_dest}")
+        cmd += [f"--exclude={pattern}" for pattern in excludes]
+        cmd += [f"{self.user}@{self.host}:{remote_dir.rstrip('/')}/", f"{local_dir}/"]
+        with METRICS.span("transfer", self.label, Path(remote_dir).name):
+            result = subprocess.run(cmd, capture_output=True)
+        # 24 = some source files vanished during transfer - snapshot is still usable
+        if result.returncode not in (0, 24):
+            raise Exception(f"Rsync failed: {result.stderr.decode()}")
+        return result.stdout.decode()
@@ -0,0 +1,190 @@
+"""
+Seekable tar archives - block-gzip output plus a member index.
+
+• The tar stream is cut into `block_size` raw blocks, each compressed
+  as an independent gzip member: the file is still a normal `.tar.gz`
+  (`tar -xzf`, gzip -t, verify_tar_stream all work) but every block
+  boundary is a restart point.
+• `<archive>.members.json.gz` maps every member path to its offset and
+  size in the uncompressed stream, next to the block table
+  (compressed offset/length ↔ raw offset/length).
+• SeekableArchive.lookup/extract inflate only the blocks a member
+  spans - seconds for one file out of a multi-GB archive.
+"""
+
+from __future__ import annotations
+
+import bisect
+import gzip
+import json
+import os
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import IO, Any, Deque, Dict, Iterator, List, Optional
+
+from watchdog.core.verify.checksum import Digests, HashingWriter
+from watchdog.core.verify.tar_inspector import TarHeaderWalker
+
+INDEX_VERSION = 1
+BLOCK_SIZE = 4 << 20
+INDEX_SUFFIX = ".members.json.gz"
+
+
+def index_path_for(archive: Path) -> Path:
+    return archive.with_name(archive.name + INDEX_SUFFIX)
+
+
+class BlockGzipWriter:
+    """
+    File-like sink for a raw tar stream: writes block-gzip to `fh` and
+    records blocks + members. Blocks are compressed on `workers` threads
+    (zlib releases the GIL) and written in order.
+    """
+
+    def __init__(self, fh: IO[bytes], block_size: int = BLOCK_SIZE, level: int = 6, workers: int = 2) -> None:
+        self.out = HashingWriter(fh)
+        self.block_size = block_size
+        self.level = level
+        self.blocks: List[List[int]] = []     # [comp_offset, comp_len, raw_offset, raw_len]
+        self.members: List[List[Any]] = []    # [name, typeflag, data_offset, size]
+        self.walker = TarHeaderWalker(on_member=self._on_member)
+        self._buf = bytearray()
+        self._raw_offset = 0
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="bgzip")
+        self._pending: Deque[tuple] = deque()
+        self._max_pending = max(1, workers) * 2
+
+    def write(self, data: bytes) -> None:
+        self.walker.feed(data)
+        self._buf += data
+        while len(self._buf) >= self.block_size:
+            self._submit(bytes(self._buf[: self.block_size]))
+            del self._buf[: self.block_size]
+
+    def close(self) -> Digests:
+        """Flush the last block; returns digests of the compressed file."""
+        if self._buf:
+            self._submit(bytes(self._buf))
+            self._buf.clear()
+        while self._pending:
+            self._write_next()
+        self._pool.shutdown()
+        self.walker.finish()
+        return self.out.digests()
+
+    def index(self) -> Dict[str, Any]:
+        return {
+            "version": INDEX_VERSION,
+            "block_size": self.block_size,
+            "archive_size": self.out.size,
+            "raw_size": self._raw_offset,
+            "blocks": self.blocks,
+            "members": self.members,
+        }
+
+    # Internals
+
+    def _on_member(self, name: str, typeflag: bytes, data_offset: int, size: int) -> None:
+        self.members.append([name, typeflag.decode("latin-1") or "0", data_offset, size])
+
+    def _submit(self, raw: bytes) -> None:
+        self._pending.append((self._pool.submit(_gzip_block, raw, self.level), len(raw)))
+        while len(self._pending) > self._max_pending:
+            self._write_next()
+
+    def _write_next(self) -> None:
+        fut, raw_len = self._pending.popleft()
+        data = fut.result()
+        self.blocks.append([self.out.size, len(data), self._raw_offset, raw_len])
+        self.out.write(data)
+        self._raw_offset += raw_len
+
+
+def _gzip_block(raw: bytes, level: int) -> bytes:
+    comp = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return comp.compress(raw) + comp.flush()
+
+
+def write_index(path: Path, index: Dict[str, Any]) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp, "wt", compresslevel=6) as fh:
+        json.dump(index, fh, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def load_index(path: Path) -> Dict[str, Any]:
+    with gzip.open(path, "rt") as fh:
+        data = json.load(fh)
+    if data.get("version") != INDEX_VERSION:
+        raise ValueError(f"unsupported member index version {data.get('version')}")
+    return data
+
+
+def _normalize(name: str) -> str:
+    return name.lstrip("/").removeprefix("./").rstrip("/")
+
+
+class SeekableArchive:
+    """Random access into a block-gzip tar via its member index."""
+
+    def __init__(self, archive: Path, index: Optional[Dict[str, Any]] = None) -> None:
+        self.archive = Path(archive)
+        self.index = index or load_index(index_path_for(self.archive))
+        self._raw_starts = [b[2] for b in self.index["blocks"]]
+        self._by_name = {_normalize(m[0]): m for m in self.index["members"]}
+
+    def names(self) -> List[str]:
+        return [m[0] for m in self.index["members"]]
+
+    def lookup(self, name: str) -> Optional[Dict[str, Any]]:
+        m = self._by_name.get(_normalize(name))
+        if m is None:
+            return None
+        return {"name": m[0], "type": m[1], "offset": m[2], "size": m[3]}
+
+    def iter_range(self, offset: int, length: int) -> Iterator[bytes]:
+        """Yield `length` uncompressed bytes from `offset`, inflating only covering blocks."""
+        if length <= 0:
+            return
+        i = bisect.bisect_right(self._raw_starts, offset) - 1
+        end = offset + length
+        with self.archive.open("rb") as fh:
+            while offset < end and 0 <= i < len(self.index["blocks"]):
+                comp_off, comp_len, raw_off, raw_len = self.index["blocks"][i]
+                fh.seek(comp_off)
+                raw = zlib.decompress(fh.read(comp_len), 31)
+                if len(raw) != raw_len:
+                    raise ValueError(f"block {i} inflates to {len(raw)} bytes, index says {raw_len}")
+                piece = raw[offset - raw_off: min(end, raw_off + raw_len) - raw_off]
+                yield piece
+                offset += len(piece)
+                i += 1
+        if offset < end:
+            raise ValueError("member extends past the end of the archive")
+
+    def read(self, name: str) -> bytes:
+        member = self._require(name)
+        return b"".join(self.iter_range(member["offset"], member["size"]))
+
+    def extract(self, name: str, dest_dir: Path) -> Path:
+        """Write one regular file to `dest_dir/<member path>`; returns the path."""
+        member = self._require(name)
+        if member["type"] not in ("0", "7", "\x00"):
+            raise ValueError(f"{name} is not a regular file (type {member['type']!r})")
+        dest_root = Path(dest_dir).resolve()
+        target = (dest_root / _normalize(member["name"])).resolve()
+        if dest_root not in target.parents:
+            raise ValueError(f"refusing to extract outside {dest_root}: {member['name']}")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with target.open("wb") as fh:
+            for piece in self.iter_range(member["offset"], member["size"]):
+                fh.write(piece)
+        return target
+
+    def _require(self, name: str) -> Dict[str, Any]:
+        member = self.lookup(name)
+        if member is None:
+            raise KeyError(f"{name} not found in {self.archive.name}")
+        return member
@@ -0,0 +1,91 @@
+"""
+Snapshot helpers for `mode: snapshot` targets.
+
+• The tree is rsynced to `<pulse>/<server>/<target>/` with --link-dest
+  pointing at the previous pulse, so unchanged files are hard links.
+• A per-file digest list (`snapshot_<target>.files.json`) is written next
+  to it. Files that are hard links into the previous snapshot reuse the
+  previous digest - only new/changed files are hashed.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import stat
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from watchdog.core.verify.checksum import multi_digest
+
+LIST_VERSION = 1
+
+
+def find_previous(backup_root: Path, timestamp: str, server: str, tree: str) -> Optional[Path]:
+    """Newest earlier pulse that holds a snapshot of the same tree."""
+    for pulse in sorted(backup_root.iterdir(), reverse=True):
+        if pulse.name >= timestamp or not pulse.is_dir():
+            continue
+        candidate = pulse / server / tree
+        if candidate.is_dir() and (pulse / server / list_name(tree)).exists():
+            return candidate
+    return None
+
+
+def list_name(tree: str) -> str:
+    return f"snapshot_{tree}.files.json"
+
+
+def build_file_list(root: Path, previous: Optional[Path]) -> Dict[str, Any]:
+    """Walk `root` and describe every regular file: size, digests, shared flag."""
+    prev_files: Dict[str, Any] = {}
+    if previous is not None:
+        prev_files = load_file_list(previous.parent / list_name(previous.name))["files"]
+
+    files: Dict[str, Any] = {}
+    new_bytes = shared_bytes = 0
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            full = Path(dirpath) / name
+            st = full.lstat()
+            if not stat.S_ISREG(st.st_mode):
+                continue
+            rel = full.relative_to(root).as_posix()
+            prev = prev_files.get(rel)
+            shared = (
+                prev is not None
+                and previous is not None
+                and _same_inode(previous / rel, st)
+            )
+            if shared:
+                sha, xxh = prev["sha256"], prev["xxh3"]
+                shared_bytes += st.st_size
+            else:
+                d = multi_digest(full)
+                sha, xxh = d.sha256, d.xxh3
+                new_bytes += st.st_size
+            files[rel] = {"size": st.st_size, "sha256": sha, "xxh3": xxh, "shared": shared}
+
+    return {
+        "version": LIST_VERSION,
+        "tree": root.name,
+        "previous": str(previous) if previous else None,
+        "new_bytes": new_bytes,
+        "shared_bytes": shared_bytes,
+        "files": files,
+    }
+
+
+def load_file_list(path: Path) -> Dict[str, Any]:
+    data = json.loads(path.read_text())
+    if data.get("version") != LIST_VERSION:
+        raise ValueError(f"unsupported snapshot list version {data.get('version')}")
+    return data
+
+
+def _same_inode(path: Path, st: os.stat_result) -> bool:
+    try:
+        other = path.lstat()
+    except OSError:
+        return False
+    return (other.st_dev, other.st_ino) == (st.st_dev, st.st_ino)
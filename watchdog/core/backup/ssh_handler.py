@@ -1,14 +1,36 @@
+import socket
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Tuple
+
 import paramiko
 from watchdog.utils.logger import WatchdogLogger
+from watchdog.core.verify.checksum import HashingWriter
+
+_STREAM_CHUNK = 1 << 20  # 1 MiB
+
 
 class SSHHandler:
-    def __init__(self, host, username, password, port=22):
+    def __init__(self, host, username, password=None, port=22, key_file=None):
         self.host = host
         self.username = username
         self.password = password
         self.port = port
+        self.key_file = key_file
         self.client = None
-        self.logger = WatchdogLogger("backup")
+        self._nopasswd: Optional[bool] = None
+        self.logger = WatchdogLogger("backup", prefix=host)
+
+    @classmethod
+    def from_server(cls, server):
+        """Build from a server config entry (`ssh` block)."""
+        ssh_cfg = server["ssh"]
+        return cls(
+            host=server["ip"],
+            username=ssh_cfg["user"],
+            password=ssh_cfg.get("password"),
+            port=ssh_cfg.get("port", 22),
+            key_file=ssh_cfg.get("key_file"),
+        )
 
     def connect(self):
         self.client = paramiko.SSHClient()
@@ -17,12 +39,29 @@ class SSHHandler:
             hostname=self.host,
             port=self.port,
             username=self.username,
-            password=self.password
+            password=self.password,
+            key_filename=self.key_file,
+            # no password and no key_file: fall back to agent / ~/.ssh keys
+            look_for_keys=not (self.password or self.key_file),
+            allow_agent=not self.password,
+            timeout=30,
         )
-        self.logger.info(f"Connected to {self.host} as {self.username}")
+        self.client.get_transport().set_keepalive(30)
+        auth = "key" if self.key_file or not self.password else "password"
+        self.logger.info(f"Connected to {self.host} as {self.username} ({auth} auth)")
+
+    def is_active(self):
+        transport = self.client.get_transport() if self.client else None
+        return bool(transport and transport.is_active())
+
+    def _sudo(self, command, prompt=""):
+        """Wrap for sudo: pipe the password if we have one, else sudo -n (NOPASSWD)."""
+        if not self.password:
+            return f"sudo -n {command}"
+        return f'echo "{self.password}" | sudo -S{prompt} {command}'
 
     def exec_sudo(self, command):
-        full_cmd = f'echo "{self.password}" | sudo -S {command}'
+        full_cmd = self._sudo(command)
         stdin, stdout, stderr = self.client.exec_command(full_cmd)
         exit_code = stdout.channel.recv_exit_status()
         self.logger.info(f"Executed command: {command} with exit code {exit_code}")
@@ -34,6 +73,121 @@ class SSHHandler:
         self.logger.info(f"Executed command: {command} with exit code {exit_code}")
         return stdout.read().decode(), stderr.read().decode(), exit_code
 
+    def remote_sha256(self, path, sudo=False):
+        """SHA-256 of a remote file (computed on the remote host), or None."""
+        run = self.exec_sudo if sudo else self.exec
+        out, err, code = run(f"sha256sum {path}")
+        if code != 0 or not out.strip():
+            self.logger.warning(f"Remote sha256sum of {path} failed: {err.strip()}")
+            return None
+        return out.split()[0]
+
+    def remote_exists(self, path, sudo=False):
+        run = self.exec_sudo if sudo else self.exec
+        _, _, code = run(f"test -f {path}")
+        return code == 0
+
+    def exec_stream(
+        self, command, sink: Callable[[bytes], object], sudo=False,
+        pace: Optional[Callable[[int], object]] = None,
+    ) -> Tuple[str, int]:
+        """
+        Run `command` and hand its stdout to `sink` chunk by chunk.
+        stderr is drained alongside so a chatty command cannot stall the
+        channel window. `pace(nbytes)` may sleep after each chunk to cap
+        the rate (see BudgetGovernor). Returns (stderr, exit_code).
+        """
+        full_cmd = self._sudo(command, prompt=' -p ""') if sudo else command
+        chan = self.client.get_transport().open_session()
+        chan.settimeout(1.0)
+        chan.exec_command(full_cmd)
+
+        err = bytearray()
+        while True:
+            while chan.recv_stderr_ready():
+                err += chan.recv_stderr(_STREAM_CHUNK)
+            try:
+                data = chan.recv(_STREAM_CHUNK)
+            except socket.timeout:
+                continue
+            if not data:
+                break
+            sink(data)
+            if pace is not None:
+                pace(len(data))
+        exit_code = chan.recv_exit_status()
+        while chan.recv_stderr_ready():
+            err += chan.recv_stderr(_STREAM_CHUNK)
+        chan.close()
+        self.logger.info(f"Streamed command: {command} with exit code {exit_code}")
+        return err.decode(errors="replace"), exit_code
+
+    def open_upload(self, command, sudo=False) -> "UploadChannel":
+        """
+        Run `command` with a writable stdin (e.g. `tar -xzf - -C /dest`).
+        stdin carries only data: the command runs as `sudo -n`, after a
+        separate `sudo -S -v` in the same shell when the host wants a password.
+        """
+        full_cmd = command
+        if sudo:
+            full_cmd = f"sudo -n {command}"
+            if self.password and not self._sudo_nopasswd():
+                # the password goes to this sudo only; the command's sudo reuses the ticket
+                full_cmd = self._sudo("-v", prompt=' -p ""') + f" 2>/dev/null && {full_cmd}"
+        chan = self.client.get_transport().open_session()
+        chan.exec_command(full_cmd)
+        self.logger.info(f"Upload channel: {command}")
+        return UploadChannel(chan)
+
+    def _sudo_nopasswd(self) -> bool:
+        """Does sudo work without a password here (NOPASSWD or cached)? Probed once."""
+        if self._nopasswd is None:
+            _, _, code = self.exec("sudo -n true")
+            self._nopasswd = code == 0
+        return self._nopasswd
+
+    def stream_to_file(
+        self, command, dest: Path, sudo=False, ok_codes: Iterable[int] = (0,),
+        pace: Optional[Callable[[int], object]] = None,
+    ) -> Tuple[HashingWriter, str, int]:
+        """
+        Stream `command` stdout straight into `dest`, hashing on the fly.
+        Data lands in `<dest>.part` and is renamed only on an accepted exit
+        code, so a broken stream never looks like a finished artefact.
+        """
+        part = dest.with_name(dest.name + ".part")
+        with part.open("wb") as fh:
+            writer = HashingWriter(fh)
+            err, code = self.exec_stream(command, writer.write, sudo=sudo, pace=pace)
+        if code in ok_codes:
+            part.replace(dest)
+        else:
+            part.unlink(missing_ok=True)
+        return writer, err, code
+
     def close(self):
         if self.client:
-            self.client.close()
\ No newline at end of file
+            self.client.close()
+
+
+class UploadChannel:
+    """File-like writer into a remote command's stdin."""
+
+    def __init__(self, chan) -> None:
+        self.chan = chan
+        self._err = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self.chan.sendall(data)
+        while self.chan.recv_stderr_ready():  # keep stderr from filling the window
+            self._err += self.chan.recv_stderr(_STREAM_CHUNK)
+        return len(data)
+
+    def close(self) -> Tuple[str, int]:
+        """Signal EOF, wait for the command; returns (stderr, exit_code)."""
+        self.chan.shutdown_write()
+        code = self.chan.recv_exit_status()
+        while self.chan.recv_stderr_ready():
+            self._err += self.chan.recv_stderr(_STREAM_CHUNK)
+        self.chan.close()
+        return self._err.decode(errors="replace"), code
@@ -0,0 +1,121 @@
+"""
+SSHConnectionPool - one authenticated SSH transport per host.
+
+• `acquire(server)` hands out a shared, connected SSHHandler; every
+  exec/stream opens a cheap channel on the same transport instead of
+  a new handshake + auth. Paramiko transports are thread-safe, so
+  parallel dumps on one host share it too.
+• Released connections stay open for `idle_sec` and are reused by later
+  pulses in the same process (daemon); a reaper thread closes expired
+  ones and dead transports are replaced transparently.
+• rsync runs the system `ssh`, which shares an OpenSSH ControlMaster
+  socket instead (see RsyncHandler.ssh_command).
+"""
+
+from __future__ import annotations
+
+import atexit
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+
+from watchdog.core.backup.ssh_handler import SSHHandler
+from watchdog.utils.logger import WatchdogLogger
+
+Key = Tuple[str, int, str]
+
+
+@dataclass
+class _Entry:
+    handler: SSHHandler
+    users: int = 0
+    last_used: float = 0.0
+
+
+class SSHConnectionPool:
+    def __init__(self, idle_sec: float = 600) -> None:
+        self.idle_sec = idle_sec
+        self.logger = WatchdogLogger("backup", prefix="ssh-pool")
+        self._entries: Dict[Key, _Entry] = {}
+        self._locks: Dict[Key, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._reaper: threading.Thread | None = None
+
+    @staticmethod
+    def key(server: Dict[str, Any]) -> Key:
+        return (server["ip"], server["ssh"].get("port", 22), server["ssh"]["user"])
+
+    def acquire(self, server: Dict[str, Any]) -> SSHHandler:
+        key = self.key(server)
+        with self._lock:
+            host_lock = self._locks.setdefault(key, threading.Lock())
+        with host_lock:   # connect outside the global lock: hosts connect in parallel
+            with self._lock:
+                # pin it in the same step as the lookup - close_idle() skips entries in use
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.users += 1
+            if entry is not None and not entry.handler.is_active():
+                self.logger.warning(f"Transport to {key[0]} died, reconnecting")
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+                entry.handler.close()
+                entry = None
+            if entry is None:
+                handler = SSHHandler.from_server(server)
+                handler.connect()
+                entry = _Entry(handler, users=1)
+                with self._lock:
+                    self._entries[key] = entry
+            else:
+                self.logger.info(f"Reusing SSH transport to {key[0]}")
+        self._start_reaper()
+        return entry.handler
+
+    def release(self, handler: SSHHandler) -> None:
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.handler is handler:
+                    entry.users -= 1
+                    entry.last_used = time.monotonic()
+                    break
+        if self.idle_sec <= 0:
+            self.close_idle()
+
+    def close_idle(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                key for key, e in self._entries.items()
+                if e.users == 0 and now - e.last_used >= self.idle_sec
+            ]
+            handlers = [self._entries.pop(key).handler for key in expired]
+        for handler in handlers:
+            handler.close()
+            self.logger.info(f"Closed idle SSH transport to {handler.host}")
+
+    def close_all(self) -> None:
+        with self._lock:
+            handlers = [e.handler for e in self._entries.values()]
+            self._entries.clear()
+        for handler in handlers:
+            handler.close()
+
+    def _start_reaper(self) -> None:
+        with self._lock:
+            if self._reaper is not None or self.idle_sec <= 0:
+                return
+            self._reaper = threading.Thread(target=self._reap, name="ssh-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap(self) -> None:
+        while True:
+            time.sleep(min(30.0, max(1.0, self.idle_sec / 2)))
+            self.close_idle()
+
+
+# process-wide pool so the daemon reuses transports across pulses
+SSH_POOL = SSHConnectionPool()
+atexit.register(SSH_POOL.close_all)
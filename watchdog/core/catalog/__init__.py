@@ -0,0 +1 @@
+from .catalog import Catalog  # noqa: F401
@@ -0,0 +1,245 @@
+"""
+Catalog - SQLite index of pulses, manifests, artefacts and verifications.
+
+• Lives at `<backup_root>/.catalog.sqlite` (WAL, one short connection
+  per call, so concurrent server threads can write).
+• Fed by `Manifest.save` and `VerifierService.verify_pulse`; pruned
+  pulses are only flagged, so size history outlives retention.
+• `rebuild()` re-reads every manifest on disk; verification history is
+  kept (it cannot be recovered from disk).
+• Sizes per server are derived from manifest entries: snapshot lists
+  contribute their tree's `new_bytes` / `shared_bytes`.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from watchdog.utils.logger import WatchdogLogger
+
+CATALOG_NAME = ".catalog.sqlite"
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pulses (
+    name       TEXT PRIMARY KEY,
+    pruned_at  REAL
+);
+CREATE TABLE IF NOT EXISTS manifests (
+    pulse      TEXT NOT NULL,
+    server     TEXT NOT NULL,
+    saved_at   REAL NOT NULL,
+    files      INTEGER NOT NULL,
+    bytes      INTEGER NOT NULL,
+    new_bytes  INTEGER NOT NULL,
+    PRIMARY KEY (pulse, server)
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    pulse      TEXT NOT NULL,
+    server     TEXT NOT NULL,
+    path       TEXT NOT NULL,
+    type       TEXT NOT NULL,
+    size       INTEGER NOT NULL,
+    sha256     TEXT,
+    xxh3       TEXT,
+    codec      TEXT,
+    extra      TEXT,
+    PRIMARY KEY (pulse, server, path)
+);
+CREATE INDEX IF NOT EXISTS artifacts_by_path ON artifacts (server, path);
+CREATE TABLE IF NOT EXISTS verifications (
+    pulse       TEXT NOT NULL,
+    server      TEXT NOT NULL,
+    path        TEXT NOT NULL,
+    ok          INTEGER NOT NULL,
+    message     TEXT,
+    verified_at REAL NOT NULL,
+    PRIMARY KEY (pulse, server, path)
+);
+CREATE INDEX IF NOT EXISTS verifications_by_path ON verifications (server, path, ok);
+CREATE TABLE IF NOT EXISTS verify_runs (
+    pulse        TEXT PRIMARY KEY,
+    ok           INTEGER NOT NULL,
+    errors       INTEGER NOT NULL,
+    warnings     INTEGER NOT NULL,
+    wall_seconds REAL,
+    verified_at  REAL NOT NULL
+);
+"""
+
+_BASE_KEYS = {"path", "type", "size", "sha256", "xxh3", "codec"}
+
+
+class Catalog:
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.logger = WatchdogLogger("catalog")
+        with self._db() as db:
+            db.executescript(_SCHEMA)
+            db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @classmethod
+    def for_backup_root(cls, backup_root: Path) -> "Catalog":
+        return cls(Path(backup_root) / CATALOG_NAME)
+
+    @contextmanager
+    def _db(self) -> Iterator[sqlite3.Connection]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(sqlite3.connect(self.path, timeout=30)) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.row_factory = sqlite3.Row
+            with db:   # one transaction
+                yield db
+
+    # ------------------------------------------------------------------ #
+    # Writers
+
+    def record_manifest(self, pulse: str, server: str, artifacts: List[Dict[str, Any]]) -> None:
+        files = bytes_ = new_bytes = 0
+        rows = []
+        for art in artifacts:
+            extra = {k: v for k, v in art.items() if k not in _BASE_KEYS}
+            if art["type"] == "snapshot":
+                # the list file stands for a whole hard-linked tree
+                files += art.get("files", 0)
+                bytes_ += art.get("new_bytes", 0) + art.get("shared_bytes", 0)
+                new_bytes += art.get("new_bytes", 0)
+            files += 1
+            bytes_ += art["size"]
+            new_bytes += art["size"]
+            rows.append((
+                pulse, server, art["path"], art["type"], art["size"],
+                art.get("sha256"), art.get("xxh3"), art.get("codec"),
+                json.dumps(extra) if extra else None,
+            ))
+        with self._db() as db:
+            db.execute("INSERT OR IGNORE INTO pulses (name) VALUES (?)", (pulse,))
+            db.execute("DELETE FROM artifacts WHERE pulse = ? AND server = ?", (pulse, server))
+            db.executemany("INSERT INTO artifacts VALUES (?,?,?,?,?,?,?,?,?)", rows)
+            db.execute(
+                "INSERT OR REPLACE INTO manifests VALUES (?,?,?,?,?,?)",
+                (pulse, server, time.time(), files, bytes_, new_bytes),
+            )
+
+    def record_verification(
+        self, pulse: str, results: Iterable[tuple], summary: Dict[str, Any]
+    ) -> None:
+        """`results`: (server, path, ok, message) per artefact."""
+        now = time.time()
+        with self._db() as db:
+            db.executemany(
+                "INSERT OR REPLACE INTO verifications VALUES (?,?,?,?,?,?)",
+                [(pulse, server, path, int(ok), message, now) for server, path, ok, message in results],
+            )
+            db.execute(
+                "INSERT OR REPLACE INTO verify_runs VALUES (?,?,?,?,?,?)",
+                (
+                    pulse, int(summary["overall"] == "PASSED"), len(summary.get("errors", [])),
+                    len(summary.get("warnings", [])),
+                    summary.get("metrics", {}).get("wall_seconds"), now,
+                ),
+            )
+
+    def mark_pruned(self, pulses: Iterable[str]) -> None:
+        now = time.time()
+        with self._db() as db:
+            db.executemany(
+                "UPDATE pulses SET pruned_at = ? WHERE name = ?", [(now, p) for p in pulses]
+            )
+
+    def rebuild(self, backup_root: Path) -> int:
+        """Re-index every manifest under `backup_root`; returns manifests read."""
+        from watchdog.core.verify.manifest import Manifest  # manifest imports us
+
+        backup_root = Path(backup_root)
+        on_disk = set()
+        count = 0
+        for manifest_file in sorted(backup_root.glob("*/*.json")):
+            try:
+                man = Manifest.load(manifest_file)
+            except (OSError, ValueError, KeyError):
+                continue
+            on_disk.add(man.pulse)
+            self.record_manifest(man.pulse, man.server, man.artifacts)
+            count += 1
+        with self._db() as db:
+            known = [r["name"] for r in db.execute("SELECT name FROM pulses WHERE pruned_at IS NULL")]
+        self.mark_pruned(p for p in known if p not in on_disk)
+        return count
+
+    # ------------------------------------------------------------------ #
+    # Queries
+
+    def pulse_sizes(self, pulse: str) -> Optional[Dict[str, Any]]:
+        """Same shape as PulseService._collect_backup_sizes; None if unknown."""
+        with self._db() as db:
+            rows = db.execute(
+                "SELECT server, files, bytes, new_bytes FROM manifests "
+                "WHERE pulse = ? ORDER BY bytes DESC", (pulse,),
+            ).fetchall()
+        if not rows:
+            return None
+        data: Dict[str, Any] = {"servers": [], "total_bytes": 0, "new_bytes": 0, "shared_bytes": 0}
+        for r in rows:
+            data["servers"].append({
+                "name": r["server"].lower(),
+                "bytes": r["bytes"],
+                "files": r["files"],
+                "new_bytes": r["new_bytes"],
+                "shared_bytes": r["bytes"] - r["new_bytes"],
+            })
+            data["total_bytes"] += r["bytes"]
+            data["new_bytes"] += r["new_bytes"]
+            data["shared_bytes"] += r["bytes"] - r["new_bytes"]
+        return data
+
+    def server_history(self, server: str, days: int = 90) -> List[Dict[str, Any]]:
+        """Per-pulse size of `server` over the last `days` (pruned pulses included)."""
+        since = time.strftime("%Y-%m-%d", time.localtime(time.time() - days * 86400))
+        with self._db() as db:
+            rows = db.execute(
+                "SELECT pulse, files, bytes, new_bytes FROM manifests "
+                "WHERE lower(server) = lower(?) AND pulse >= ? ORDER BY pulse",
+                (server, since),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def last_passing(self, server: str, pattern: str) -> Optional[Dict[str, Any]]:
+        """Newest passing verification of an artefact (`pattern` is SQL LIKE)."""
+        with self._db() as db:
+            row = db.execute(
+                "SELECT pulse, path, verified_at FROM verifications "
+                "WHERE lower(server) = lower(?) AND path LIKE ? AND ok = 1 "
+                "ORDER BY pulse DESC LIMIT 1",
+                (server, pattern),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def passing_pulses(self) -> Set[str]:
+        """Pulses whose last verification run passed."""
+        with self._db() as db:
+            rows = db.execute("SELECT pulse FROM verify_runs WHERE ok = 1").fetchall()
+        return {r["pulse"] for r in rows}
+
+    def previous_total(self, pulse: str) -> Optional[int]:
+        """Total bytes of the pulse before `pulse` (for trend lines)."""
+        with self._db() as db:
+            row = db.execute(
+                "SELECT pulse, SUM(bytes) AS total FROM manifests WHERE pulse < ? "
+                "GROUP BY pulse ORDER BY pulse DESC LIMIT 1", (pulse,),
+            ).fetchone()
+        return row["total"] if row else None
+
+
+def safe_catalog(backup_root: Path) -> Optional[Catalog]:
+    """Catalog for hooks that must never fail a backup/verification."""
+    try:
+        return Catalog.for_backup_root(backup_root)
+    except (sqlite3.Error, OSError) as exc:
+        WatchdogLogger("catalog").warning(f"Catalog unavailable: {exc}")
+        return None
@@ -0,0 +1,2 @@
+from .chunk_store import ChunkStore  # noqa: F401
+from .chunker import TarChunker  # noqa: F401
@@ -0,0 +1,109 @@
+"""
+Content-addressed chunk store for dedup targets.
+
+• Chunks live under `<backup_root>/.chunks/<aa>/<sha256>` (zlib-compressed).
+• The name *is* the SHA-256 of the raw chunk, so a chunk is written once
+  and shared by every pulse that references it.
+• A pulse stores only a small JSON index per target (see `write_index`).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+CHUNK_DIR = ".chunks"
+INDEX_VERSION = 1
+_LEVEL = 3  # zlib level - cheap, chunks are mostly written once
+
+
+class ChunkStore:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.new_chunks = 0
+        self.new_bytes = 0      # raw bytes of chunks added by this instance
+        self.stored_bytes = 0   # their on-disk (compressed) size
+
+    @classmethod
+    def for_backup_root(cls, backup_root: Path) -> "ChunkStore":
+        return cls(backup_root / CHUNK_DIR)
+
+    @classmethod
+    def for_artifact(cls, artifact_path: Path) -> "ChunkStore":
+        """Store belonging to `<root>/<pulse>/<server>/<artifact>`."""
+        return cls(artifact_path.parents[2] / CHUNK_DIR)
+
+    # Public API
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def has(self, digest: str) -> bool:
+        return self.path_for(digest).exists()
+
+    def put(self, data: bytes) -> str:
+        """Store `data` unless already present; return its SHA-256."""
+        digest = hashlib.sha256(data).hexdigest()
+        target = self.path_for(digest)
+        try:
+            # reuse bumps the mtime: retention never collects chunks touched after its plan
+            os.utime(target)
+            return digest
+        except FileNotFoundError:
+            pass
+        packed = zlib.compress(data, _LEVEL)
+        target.parent.mkdir(exist_ok=True)
+        tmp = target.with_name(f"{digest}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(packed)
+        os.replace(tmp, target)  # atomic - concurrent writers are harmless
+        with self._lock:
+            self.new_chunks += 1
+            self.new_bytes += len(data)
+            self.stored_bytes += len(packed)
+        return digest
+
+    def read(self, digest: str) -> bytes:
+        return zlib.decompress(self.path_for(digest).read_bytes())
+
+    def verify(self, digest: str) -> Tuple[bool, str]:
+        """Check presence, decompression and content hash of one chunk."""
+        try:
+            data = self.read(digest)
+        except FileNotFoundError:
+            return False, "missing"
+        except (OSError, zlib.error) as exc:
+            return False, f"unreadable: {exc}"
+        if hashlib.sha256(data).hexdigest() != digest:
+            return False, "hash mismatch"
+        return True, ""
+
+    def iter_digests(self) -> Iterator[str]:
+        for sub in self.root.iterdir():
+            if sub.is_dir():
+                for f in sub.iterdir():
+                    if not f.name.endswith(".tmp"):
+                        yield f.name
+
+
+# ---------------------------------------------------------------------- #
+# Index files
+
+
+def write_index(path: Path, chunks: List[Tuple[str, int]], info: Dict[str, Any]) -> None:
+    """Write the per-pulse index: ordered (digest, raw size) list + stream info."""
+    data = {"version": INDEX_VERSION, **info, "chunks": [list(c) for c in chunks]}
+    path.write_text(json.dumps(data, separators=(",", ":")))
+
+
+def load_index(path: Path) -> Dict[str, Any]:
+    data = json.loads(path.read_text())
+    if data.get("version") != INDEX_VERSION:
+        raise ValueError(f"unsupported dedup index version {data.get('version')}")
+    return data
@@ -0,0 +1 @@
+from .spans import METRICS, MetricsRecorder  # noqa: F401
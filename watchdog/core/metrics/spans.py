@@ -0,0 +1,243 @@
+"""
+Per-stage timing spans for one pulse.
+
+• `METRICS.span(stage, server, artifact)` times a block; set `span.bytes`
+  inside it. `METRICS.add(...)` records a duration measured elsewhere
+  (e.g. a Digests record or a verifier worker's stats).
+• Spans are per artefact, never per chunk: one perf_counter pair and one
+  locked dict update each, so the recorder stays on permanently.
+• Stages: ssh_connect, remote_compress, transfer, stream (compress +
+  transfer fused over SSH), hash, verify, verify_hash, server_total and
+  pulse_* for the pulse phases.
+• `summary_lines()` feeds the Pulse embed; `write_prometheus()` writes a
+  node-exporter textfile (atomically); `to_dict()` is kept per pulse.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# stage order in summaries; unknown stages follow alphabetically
+STAGES = (
+    "ssh_connect", "remote_compress", "transfer", "stream", "hash",
+    "verify", "verify_hash", "server_total",
+)
+
+
+@dataclass
+class Span:
+    stage: str
+    server: str = ""
+    artifact: str = ""
+    bytes: int = 0
+
+
+@dataclass
+class _Totals:
+    count: int = 0
+    seconds: float = 0.0
+    bytes: int = 0
+    errors: int = 0
+
+    def add(self, seconds: float, nbytes: int, error: bool) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.bytes += nbytes
+        self.errors += error
+
+    @property
+    def mb_per_sec(self) -> float:
+        return self.bytes / self.seconds / (1 << 20) if self.seconds > 0 else 0.0
+
+
+class MetricsRecorder:
+    """Thread-safe span aggregation: per (stage, server) and per artefact."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, pulse: str = "") -> None:
+        with self._lock:
+            self.pulse = pulse
+            self.started = time.time()
+            self._stages: Dict[Tuple[str, str], _Totals] = {}
+            self._artifacts: Dict[Tuple[str, str], Dict[str, List[float]]] = {}
+
+    # ------------------------------------------------------------------ #
+    # Recording
+
+    @contextmanager
+    def span(self, stage: str, server: str = "", artifact: str = "") -> Iterator[Span]:
+        span = Span(stage, server, artifact)
+        start = time.perf_counter()
+        error = False
+        try:
+            yield span
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.add(stage, server, time.perf_counter() - start, span.bytes, artifact, error)
+
+    def add(
+        self,
+        stage: str,
+        server: str = "",
+        seconds: float = 0.0,
+        nbytes: int = 0,
+        artifact: str = "",
+        error: bool = False,
+    ) -> None:
+        with self._lock:
+            self._stages.setdefault((stage, server), _Totals()).add(seconds, nbytes, error)
+            if artifact:
+                per = self._artifacts.setdefault((server, artifact), {})
+                sec, byt = per.get(stage, (0.0, 0))
+                per[stage] = [sec + seconds, byt + nbytes]
+
+    def add_digests(self, stage: str, server: str, digests, artifact: str = "") -> None:
+        """Record a checksum.Digests pass (it carries its own timing)."""
+        self.add(stage, server, digests.seconds, digests.size, artifact)
+
+    # ------------------------------------------------------------------ #
+    # Aggregates
+
+    def stage_totals(self) -> Dict[str, _Totals]:
+        """Per stage, summed over servers."""
+        totals: Dict[str, _Totals] = {}
+        with self._lock:
+            for (stage, _), t in self._stages.items():
+                agg = totals.setdefault(stage, _Totals())
+                agg.count += t.count
+                agg.seconds += t.seconds
+                agg.bytes += t.bytes
+                agg.errors += t.errors
+        return dict(sorted(totals.items(), key=lambda kv: _stage_order(kv[0])))
+
+    def summary_lines(self, top: int = 3) -> List[str]:
+        """Short per-stage lines + the slowest servers, for the Discord embed."""
+        lines = []
+        for stage, t in self.stage_totals().items():
+            if stage.startswith("pulse_") or stage == "server_total":
+                continue
+            line = f"{stage}: {_duration(t.seconds)}"
+            if t.bytes:
+                line += f" · {_human(t.bytes)} · {t.mb_per_sec:.1f} MB/s"
+            if t.errors:
+                line += f" · {t.errors} failed"
+            lines.append(line)
+
+        with self._lock:
+            servers = sorted(
+                ((srv, t.seconds) for (stage, srv), t in self._stages.items() if stage == "server_total"),
+                key=lambda kv: kv[1], reverse=True,
+            )
+            phases = {s: t.seconds for (s, _), t in self._stages.items() if s.startswith("pulse_")}
+        if servers:
+            lines.append("Slowest: " + ", ".join(f"{s} {_duration(sec)}" for s, sec in servers[:top]))
+        if phases:
+            lines.append("Pulse: " + " → ".join(f"{s[6:]} {_duration(sec)}" for s, sec in phases.items()))
+        return lines
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pulse": self.pulse,
+                "started": self.started,
+                "stages": [
+                    {"stage": stage, "server": server, "count": t.count,
+                     "seconds": round(t.seconds, 3), "bytes": t.bytes, "errors": t.errors}
+                    for (stage, server), t in sorted(self._stages.items())
+                ],
+                "artifacts": {
+                    f"{server}/{artifact}": {s: [round(v[0], 3), v[1]] for s, v in stages.items()}
+                    for (server, artifact), stages in sorted(self._artifacts.items())
+                },
+            }
+
+    # ------------------------------------------------------------------ #
+    # Output
+
+    def write_json(self, path: Path) -> None:
+        _atomic_write(path, json.dumps(self.to_dict(), separators=(",", ":")))
+
+    def write_prometheus(self, path: Path, gauges: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Node-exporter textfile: per stage/server seconds, bytes, spans and
+        errors of the last pulse, plus `gauges` ({name: value} or
+        {name: {labels-tuple: value}}). Artefact names carry timestamps,
+        so they stay out of the labels (see .metrics instead).
+        """
+        out: List[str] = []
+        with self._lock:
+            stages = sorted(self._stages.items())
+        for metric, attr, help_text in (
+            ("stage_seconds", "seconds", "Seconds spent per stage and server in the last pulse"),
+            ("stage_bytes", "bytes", "Bytes processed per stage and server in the last pulse"),
+            ("stage_spans", "count", "Timed operations per stage and server in the last pulse"),
+            ("stage_errors", "errors", "Failed operations per stage and server in the last pulse"),
+        ):
+            out += [f"# HELP watchdog_{metric} {help_text}.", f"# TYPE watchdog_{metric} gauge"]
+            for (stage, server), t in stages:
+                value = getattr(t, attr)
+                out.append(
+                    f'watchdog_{metric}{{stage="{_esc(stage)}",server="{_esc(server)}"}} '
+                    f"{round(value, 3) if isinstance(value, float) else value}"
+                )
+        for name, value in (gauges or {}).items():
+            out += [f"# TYPE watchdog_{name} gauge"]
+            if isinstance(value, dict):
+                for labels, v in value.items():
+                    lbl = ",".join(f'{k}="{_esc(str(val))}"' for k, val in labels)
+                    out.append(f"watchdog_{name}{{{lbl}}} {v}")
+            else:
+                out.append(f"watchdog_{name} {value}")
+        _atomic_write(path, "\n".join(out) + "\n")
+
+
+METRICS = MetricsRecorder()
+
+
+# ---------------------------------------------------------------------- #
+# Helpers
+
+
+def _stage_order(stage: str) -> Tuple[int, str]:
+    return (STAGES.index(stage) if stage in STAGES else len(STAGES), stage)
+
+
+def _esc(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    # the textfile collector may read at any moment - never expose a half file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+def _human(num: float) -> str:
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if num < 1024:
+            return f"{num:.1f} {unit}"
+        num /= 1024
+    return f"{num:.1f} PB"
+
+
+def _duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    minutes, sec = divmod(int(seconds), 60)
+    if minutes < 60:
+        return f"{minutes}m{sec:02d}s"
+    return f"{minutes // 60}h{minutes % 60:02d}m"
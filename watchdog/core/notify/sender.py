@@ -0,0 +1,368 @@
+"""
+DiscordSender - background delivery queue for Discord webhooks.
+
+• `submit()` spools the payload to disk and returns immediately; one
+  daemon thread per webhook delivers over a pooled requests.Session.
+• Messages arriving within `window` seconds are coalesced: contents are
+  joined into ≤2000-char messages, embeds batched ≤10 per message.
+• Honors `X-RateLimit-Remaining`/`X-RateLimit-Reset-After` before
+  posting and `Retry-After` on 429; 5xx/network errors back off and retry.
+• Spooled files are removed only after delivery, so anything left
+  over (crash, outage) is re-sent by the next process. `flush()` is
+  registered with atexit so short CLI runs still deliver.
+• Every spool file is owned by one process (`<id>.inflight-<pid>`); a
+  new sender only claims files whose owner has exited, by an atomic
+  rename, so CLI runs beside the daemon never post its messages twice.
+• Coalesced messages are tracked one by one: after a failure only the
+  undelivered ones are re-spooled and retried `RETRY_DELAY` seconds
+  later; new messages keep flowing meanwhile, and the first clean batch
+  brings the retry forward.
+• `self_check()` (`watchdog notify --check`) posts to a local stub
+  server and checks coalescing, 429 handling and retries.
+"""
+
+from __future__ import annotations
+
+import atexit
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from watchdog.utils.logger import WatchdogLogger
+
+SPOOL_DIR = Path("/opt/watchdog/state/discord_spool")
+CONTENT_LIMIT = 2000
+EMBEDS_PER_MESSAGE = 10
+EMBED_CHARS = 6000
+CLAIM = ".inflight-"   # spool file suffix + owning pid
+RETRY_DELAY = 30.0     # seconds before undelivered messages are tried again
+
+Item = Tuple[Optional[Path], Dict[str, Any]]
+
+
+class DiscordSender:
+    _instances: Dict[Tuple[str, str], "DiscordSender"] = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_webhook(cls, webhook_url: str, spool_dir: Optional[Path] = None) -> "DiscordSender":
+        """One sender (thread, session, rate-limit state) per webhook."""
+        spool = Path(spool_dir) if spool_dir is not None else SPOOL_DIR
+        key = (webhook_url, str(spool))
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(webhook_url, spool)
+            return cls._instances[key]
+
+    def __init__(
+        self,
+        webhook_url: str,
+        spool_dir: Path = SPOOL_DIR,
+        window: float = 2.0,
+        max_retries: int = 5,
+        timeout: float = 10,
+    ) -> None:
+        self.webhook_url = webhook_url
+        self.window = window
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.logger = WatchdogLogger("discord")
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+        self._queue: "queue.Queue[Item]" = queue.Queue()
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._blocked_until = 0.0
+        self._seq = itertools.count()
+
+        self.spool_dir: Optional[Path] = Path(spool_dir)
+        try:
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+        except OSError as exc:
+            self.logger.warning(f"Spool disabled ({exc}); undelivered messages are lost on exit")
+            self.spool_dir = None
+        self._load_spool()
+
+        threading.Thread(target=self._run, name="discord-sender", daemon=True).start()
+        atexit.register(self.flush)
+
+    # Public API
+
+    def submit(self, payload: Dict[str, Any]) -> None:
+        path = self._spool(payload)
+        with self._idle:
+            self._pending += 1
+        self._queue.put((path, payload))
+
+    def flush(self, timeout: float = 15.0) -> bool:
+        """Wait until everything queued is delivered; False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.logger.warning(f"{self._pending} Discord message(s) left in spool")
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    # Spool
+
+    def _spool(self, payload: Dict[str, Any]) -> Optional[Path]:
+        if self.spool_dir is None:
+            return None
+        path = self.spool_dir / f"{time.time_ns()}-{os.getpid()}-{next(self._seq)}{CLAIM}{os.getpid()}"
+        try:
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_text(json.dumps(payload))
+            os.replace(tmp, path)
+        except OSError as exc:
+            self.logger.warning(f"Could not spool Discord message: {exc}")
+            return None
+        return path
+
+    def _load_spool(self) -> None:
+        """Claim messages left by processes that have exited, and queue them."""
+        if self.spool_dir is None:
+            return
+        for path in sorted(self.spool_dir.iterdir()):
+            if not (path.suffix == ".json" or _orphaned(path)):
+                continue
+            stem = path.name.split(CLAIM)[0].removesuffix(".json")
+            claimed = path.with_name(f"{stem}{CLAIM}{os.getpid()}")
+            try:
+                os.rename(path, claimed)   # atomic: exactly one process wins
+                payload = json.loads(claimed.read_text())
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError):
+                claimed.unlink(missing_ok=True)
+                continue
+            path = claimed
+            self._pending += 1
+            self._queue.put((path, payload))
+        if self._pending:
+            self.logger.info(f"Re-queued {self._pending} spooled Discord message(s)")
+
+    # Delivery thread
+
+    def _run(self) -> None:
+        retry: List[Item] = []
+        retry_at = 0.0
+        while True:
+            batch: List[Item] = []
+            if retry and time.monotonic() >= retry_at:
+                batch, retry = retry, []
+            else:
+                # never sleep on a retry: keep serving the queue until it is due
+                timeout = max(0.0, retry_at - time.monotonic()) if retry else None
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    continue
+            deadline = time.monotonic() + self.window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            undelivered: List[Dict[str, Any]] = []
+            for group in _group(batch):
+                messages = coalesce([payload for _, payload in group])
+                sent = 0
+                while sent < len(messages) and self._deliver(messages[sent]):
+                    sent += 1
+                undelivered.extend(messages[sent:])   # never re-send what already went out
+
+            # re-spool the leftovers before dropping the originals (crash-safe)
+            leftovers: List[Item] = [(self._spool(message), message) for message in undelivered]
+            for path, _ in batch:
+                if path is not None:
+                    path.unlink(missing_ok=True)
+            with self._idle:
+                self._pending += len(leftovers) - len(batch)
+                self._idle.notify_all()
+            if leftovers:
+                retry += leftovers     # endpoint unreachable - retry the rest later
+                retry_at = time.monotonic() + RETRY_DELAY
+            elif retry:
+                retry_at = 0.0         # endpoint is back: retry right away
+
+    def _deliver(self, payload: Dict[str, Any]) -> bool:
+        """POST one message. True when done (sent, or rejected for good)."""
+        delay = 1.0
+        for attempt in range(1, self.max_retries + 1):
+            wait = self._blocked_until - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                response = self.session.post(self.webhook_url, json=payload, timeout=self.timeout)
+            except requests.RequestException as exc:
+                self.logger.warning(f"Discord post failed (attempt {attempt}): {exc}")
+                time.sleep(delay)
+                delay = min(delay * 2, 60)
+                continue
+
+            self._note_rate_limit(response)
+            if response.status_code == 429:
+                retry_after = _retry_after(response)
+                self.logger.warning(f"Discord rate limited, retrying in {retry_after:.1f}s")
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+                continue
+            if response.status_code >= 500:
+                self.logger.warning(f"Discord error {response.status_code} (attempt {attempt})")
+                time.sleep(delay)
+                delay = min(delay * 2, 60)
+                continue
+            if response.status_code >= 400:
+                # malformed payload etc. - retrying will not help
+                self.logger.error(
+                    f"Failed to send message to Discord: {response.status_code} - {response.text[:300]}"
+                )
+                return True
+            self.logger.info("Message successfully sent to Discord.")
+            return True
+        return False
+
+    def _note_rate_limit(self, response: requests.Response) -> None:
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            try:
+                reset_after = float(response.headers.get("X-RateLimit-Reset-After", "1"))
+            except ValueError:
+                reset_after = 1.0
+            self._blocked_until = max(self._blocked_until, time.monotonic() + reset_after)
+
+
+def _orphaned(path: Path) -> bool:
+    """A claimed spool file whose owning process is gone."""
+    _, sep, pid = path.name.partition(CLAIM)
+    if not sep or not pid.isdigit() or int(pid) == os.getpid():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+def _retry_after(response: requests.Response) -> float:
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        pass
+    try:
+        return float(response.json().get("retry_after", 1.0))
+    except (ValueError, AttributeError):
+        return 1.0
+
+
+def _group(batch: List[Item]) -> List[List[Item]]:
+    """Split by sender identity (username/avatar), keeping order."""
+    groups: Dict[Tuple[Any, Any], List[Item]] = {}
+    for item in batch:
+        payload = item[1]
+        groups.setdefault((payload.get("username"), payload.get("avatar_url")), []).append(item)
+    return list(groups.values())
+
+
+def coalesce(payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge payloads sharing one identity into as few messages as Discord allows."""
+    if len(payloads) == 1:
+        return payloads
+    base = {k: v for k, v in payloads[0].items() if k in ("username", "avatar_url")}
+    messages: List[Dict[str, Any]] = []
+
+    text = ""
+    for p in payloads:
+        content = p.get("content") or ""
+        if not content:
+            continue
+        if text and len(text) + 1 + len(content) > CONTENT_LIMIT:
+            messages.append({**base, "content": text})
+            text = ""
+        text = f"{text}\n{content}" if text else content
+    if text:
+        messages.append({**base, "content": text})
+
+    embeds: List[Dict[str, Any]] = []
+    chars = 0
+    for p in payloads:
+        for embed in p.get("embeds") or []:
+            size = len(json.dumps(embed))
+            if embeds and (len(embeds) >= EMBEDS_PER_MESSAGE or chars + size > EMBED_CHARS):
+                messages.append({**base, "content": "", "embeds": embeds})
+                embeds, chars = [], 0
+            embeds.append(embed)
+            chars += size
+    if embeds:
+        messages.append({**base, "content": "", "embeds": embeds})
+    return messages
+
+
+# ---------------------------------------------------------------------- #
+# Self-check against a local stub webhook
+
+
+def self_check() -> None:
+    """Raise AssertionError unless delivery behaves against a stub webhook."""
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    received: List[Dict[str, Any]] = []
+    replies: List[Tuple[int, Dict[str, str], bytes]] = []   # scripted, then 204
+
+    class Stub(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:  # noqa: N802
+            received.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+            status, headers, body = replies.pop(0) if replies else (204, {}, b"")
+            self.send_response(status)
+            for key, value in {**headers, "Content-Length": str(len(body))}.items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/webhook"
+    with tempfile.TemporaryDirectory() as spool:
+        # 1. a burst is coalesced into one post; a 429 is waited out, not dropped
+        replies.append((429, {"Content-Type": "application/json"}, b'{"retry_after": 0.5}'))
+        sender = DiscordSender(url, Path(spool) / "a", window=0.3)
+        started = time.monotonic()
+        for i in range(5):
+            sender.submit({"content": f"line {i}"})
+        assert sender.flush(10), "burst not delivered"
+        assert len(received) == 2, f"expected 429 + 1 post, got {len(received)}"
+        assert received[1]["content"] == "\n".join(f"line {i}" for i in range(5))
+        assert time.monotonic() - started >= 0.5, "retry_after not honoured"
+        assert not list((Path(spool) / "a").iterdir()), "spool not cleaned up"
+
+        # 2. a failed message does not hold back later ones, and is retried
+        received.clear()
+        replies.append((500, {}, b""))
+        sender = DiscordSender(url, Path(spool) / "b", window=0.1, max_retries=1)
+        sender.submit({"content": "first"})
+        time.sleep(1.5)            # 500 + one backoff, now parked for retry
+        sender.submit({"content": "second"})
+        assert sender.flush(5), "retry stalled the queue"
+        assert [m["content"] for m in received] == ["first", "second", "first"]
+    server.shutdown()
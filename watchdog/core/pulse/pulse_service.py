@@ -1,18 +1,28 @@
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
 import json
+import sqlite3
+import stat
 
 from watchdog.core.backup.backup_service import BackupService
 from watchdog.core.backup.config_loader import BackupConfig
+from watchdog.core.backup.journal import latest_journal
+from watchdog.core.backup.retention import RetentionEngine, RetentionPolicy
+from watchdog.core.catalog.catalog import safe_catalog
+from watchdog.core.metrics import METRICS
 from watchdog.core.notify import DiscordNotifier
 from watchdog.utils.logger import WatchdogLogger
 
 from watchdog.core.verify.verifier_service import VerifierService
+from watchdog.core.verify.cache import VerificationCache
+from watchdog.core.status.latency_history import LatencyHistory, format_summary
 
 
 class PulseService:
     BACKUP_ROOT = Path("/mnt/ssd/backups")
+    VERIFY_CACHE = ".verify_cache.json"
+    METRICS_FILE = ".metrics"  # per pulse, next to the manifests (JSON, but not *.json)
 
     def __init__(self) -> None:
         self.logger = WatchdogLogger("pulse")
@@ -22,73 +32,214 @@ class PulseService:
 
     # Public API
 
-    def run(self) -> None:
-        """Entry-point for daemon/CLI."""
-        ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    def run(self, timestamp: str | None = None, resume: bool = False) -> None:
+        """Entry-point for daemon/CLI (`resume` continues pulse `timestamp`)."""
+        ts = timestamp or datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        METRICS.reset(ts)
         try:
-            self.logger.info("=== Pulse started ===")
-            backup_ok = self._run_backups(ts)
-            verify_ok, verify_data = self._run_verification(ts) if backup_ok else (False, {})
-            self._send_report(ts, backup_ok, verify_ok, verify_data)
+            self.logger.info("=== Pulse resumed ===" if resume else "=== Pulse started ===")
+            with METRICS.span("pulse_backup"):
+                backup_results = self._run_backups(ts, resume)
+            # verify whatever did make it to disk, even after partial failures
+            any_ok = any(r["ok"] for r in backup_results.values())
+            with METRICS.span("pulse_verify"):
+                verify_ok, verify_data = self._run_verification(ts) if any_ok else (False, {})
+            passed = bool(backup_results) and all(r["ok"] for r in backup_results.values()) and verify_ok
+            with METRICS.span("pulse_retention"):
+                # never prune on the back of a failed pulse
+                retention_text = self._run_retention(ts) if passed else "Skipped: pulse did not pass"
+            self._send_report(ts, backup_results, verify_ok, verify_data, retention_text)
+            self._write_metrics(ts, backup_results, verify_ok, verify_data)
         except Exception as exc:  # noqa: BLE001
             self.logger.error(f"Pulse failed: {exc}")
             self.notifier.send(content=f"❌ **Pulse {ts} failed:** ```{exc}```")
 
     # Internal helpers
 
-    def _run_backups(self, timestamp: str) -> bool:
-        """Run all backups serially; return True on success."""
+    def resume(self, timestamp: str | None = None) -> bool:
+        """Continue pulse `timestamp` (default: the newest journaled one)."""
+        if timestamp is None:
+            latest = latest_journal(self.BACKUP_ROOT)
+            if latest is None:
+                self.logger.error("No journaled pulse to resume")
+                return False
+            timestamp = latest.name
+        elif not (self.BACKUP_ROOT / timestamp).is_dir():
+            self.logger.error(f"Pulse {timestamp} not found under {self.BACKUP_ROOT}")
+            return False
+        self.run(timestamp, resume=True)
+        return True
+
+    def _run_backups(self, timestamp: str, resume: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Run all backups; return the per-server `{name: {ok, error, seconds}}` map."""
         self.logger.info("Starting backups…")
         service = BackupService(self.backup_cfg)
         try:
-            service.backup_all()  # existing logic is serial & blocking
-            self.logger.info("All backups finished successfully.")
-            return True
+            results = service.backup_all(timestamp, resume=resume)
         except Exception as exc:  # noqa: BLE001
             self.logger.error(f"Backup failure: {exc}")
-            return False
+            return {}
+        failed = [name for name, r in results.items() if not r["ok"]]
+        if failed:
+            self.logger.error(f"Backups failed for: {', '.join(failed)}")
+        else:
+            self.logger.info("All backups finished successfully.")
+        return results
+
+    def _run_retention(self, timestamp: str) -> str:
+        """Plan GFS pruning, start the niced deletion in the background; report line."""
+        settings = self.backup_cfg.get_retention_settings()
+        if not settings["enabled"]:
+            return ""
+        try:
+            engine = RetentionEngine(self.BACKUP_ROOT, RetentionPolicy.from_config(settings))
+            plan = engine.plan(protect=[timestamp])
+            for line in plan.lines():
+                self.logger.info(f"Retention: {line}")
+            if settings["dry_run"]:
+                return f"Dry-run: would prune {len(plan.delete)} pulse(s), ~{self._human_bytes(plan.total_bytes)}"
+            engine.apply(plan, background=True)
+            return f"Pruning {len(plan.delete)} pulse(s), ~{self._human_bytes(plan.total_bytes)} to free"
+        except Exception as exc:  # noqa: BLE001
+            self.logger.error(f"Retention failed: {exc}")
+            return f"⚠️ Retention failed: {exc}"
 
     def _run_verification(self, timestamp: str) -> tuple[bool, Dict[str, Any]]:
         """Run verification on the newest backup set."""
         self.logger.info("Running verification…")
         backup_dir = self.BACKUP_ROOT / timestamp
-        verifier = VerifierService()
+        settings = self.backup_cfg.get_verify_settings()
+        cache = None
+        if settings["cache"]:
+            cache = VerificationCache(
+                self.BACKUP_ROOT / self.VERIFY_CACHE, recheck_days=settings["recheck_days"]
+            )
+        verifier = VerifierService(
+            workers=settings["workers"],
+            executor=settings["executor"],
+            cache=cache,
+            sql_index=settings["sql_index"],
+        )
         result = verifier.verify_pulse(backup_dir)
         ok = result["overall"] == "PASSED"
         return ok, result
 
+    def _write_metrics(
+        self,
+        timestamp: str,
+        backup_results: Dict[str, Dict[str, Any]],
+        verify_ok: bool,
+        verify_data: Dict[str, Any],
+    ) -> None:
+        """Keep the spans with the pulse and export them for node-exporter."""
+        try:
+            METRICS.write_json(self.BACKUP_ROOT / timestamp / self.METRICS_FILE)
+        except OSError as exc:
+            self.logger.warning(f"Could not write pulse metrics: {exc}")
+
+        textfile = self.backup_cfg.get_metrics_settings()["textfile"]
+        if not textfile:
+            return
+        textfile = Path(textfile)
+        if not textfile.parent.is_dir():
+            self.logger.info(f"Metrics textfile directory {textfile.parent} missing, skipping export")
+            return
+        backup_ok = bool(backup_results) and all(r["ok"] for r in backup_results.values())
+        sizes = self._collect_backup_sizes(timestamp)
+        gauges = {
+            "pulse_start_timestamp_seconds": round(METRICS.started, 3),
+            "pulse_duration_seconds": round(datetime.now().timestamp() - METRICS.started, 3),
+            "pulse_success": int(backup_ok and verify_ok),
+            "pulse_verify_errors": len(verify_data.get("errors", [])),
+            "pulse_verify_warnings": len(verify_data.get("warnings", [])),
+            "pulse_bytes": sizes["total_bytes"],
+            "backup_ok": {(("server", n),): int(r["ok"]) for n, r in backup_results.items()},
+            "backup_server_bytes": {(("server", s["name"]),): s["bytes"] for s in sizes["servers"]},
+        }
+        try:
+            METRICS.write_prometheus(textfile, gauges)
+        except OSError as exc:
+            self.logger.warning(f"Could not write {textfile}: {exc}")
+
     def _collect_backup_sizes(self, timestamp: str) -> Dict[str, Any]:
+        """Per-server sizes from the catalog (milliseconds); disk scan as fallback."""
+        catalog = safe_catalog(self.BACKUP_ROOT)
+        if catalog is not None:
+            try:
+                sizes = catalog.pulse_sizes(timestamp)
+                if sizes is not None:
+                    # a failed server has files on disk but no manifest row
+                    known = {s["name"] for s in sizes["servers"]}
+                    for server_dir in self._server_dirs(timestamp):
+                        if server_dir.name not in known:
+                            self._add_server(sizes, self._scan_server(server_dir))
+                    sizes["servers"].sort(key=lambda x: x["bytes"], reverse=True)
+                    sizes["previous_total"] = catalog.previous_total(timestamp)
+                    return sizes
+            except sqlite3.Error as exc:
+                self.logger.warning(f"Catalog query failed, scanning disk: {exc}")
+        return self._scan_backup_sizes(timestamp)
+
+    def _scan_backup_sizes(self, timestamp: str) -> Dict[str, Any]:
         """
         Scan /mnt/ssd/backups/<timestamp>/<server>/ and compute
         per-server size and file count, plus a grand total.
         """
-        pulse_dir = self.BACKUP_ROOT / timestamp
-        data: Dict[str, Any] = {"servers": [], "total_bytes": 0}
-
-        if not pulse_dir.exists():
-            return data
-
-        for server_dir in sorted([p for p in pulse_dir.iterdir() if p.is_dir()]):
-            bytes_sum = 0
-            files = 0
-            for f in server_dir.rglob("*"):
-                if f.is_file():
-                    try:
-                        st = f.stat()
-                        bytes_sum += st.st_size
-                        files += 1
-                    except OSError:
-                        # skip unreadable entries
-                        continue
-            data["servers"].append(
-                {"name": server_dir.name, "bytes": bytes_sum, "files": files}
-            )
-            data["total_bytes"] += bytes_sum
+        data: Dict[str, Any] = {
+            "servers": [], "total_bytes": 0, "new_bytes": 0, "shared_bytes": 0
+        }
+        for server_dir in self._server_dirs(timestamp):
+            self._add_server(data, self._scan_server(server_dir))
 
         # sort servers by size desc
         data["servers"].sort(key=lambda x: x["bytes"], reverse=True)
         return data
 
+    def _server_dirs(self, timestamp: str) -> List[Path]:
+        pulse_dir = self.BACKUP_ROOT / timestamp
+        if not pulse_dir.exists():
+            return []
+        return sorted(p for p in pulse_dir.iterdir() if p.is_dir())
+
+    @staticmethod
+    def _scan_server(server_dir: Path) -> Dict[str, Any]:
+        """
+        Size and file count of one server dir. Hard-linked files (snapshot
+        targets) are counted once and split into `new_bytes` (only in this
+        pulse) and `shared_bytes`.
+        """
+        bytes_sum = 0
+        new_bytes = 0
+        files = 0
+        seen = set()
+        for f in server_dir.rglob("*"):
+            try:
+                st = f.lstat()
+            except OSError:
+                # skip unreadable entries
+                continue
+            if not stat.S_ISREG(st.st_mode) or (st.st_dev, st.st_ino) in seen:
+                continue
+            seen.add((st.st_dev, st.st_ino))
+            bytes_sum += st.st_size
+            files += 1
+            if st.st_nlink == 1:
+                new_bytes += st.st_size
+        return {
+            "name": server_dir.name,
+            "bytes": bytes_sum,
+            "files": files,
+            "new_bytes": new_bytes,
+            "shared_bytes": bytes_sum - new_bytes,
+        }
+
+    @staticmethod
+    def _add_server(data: Dict[str, Any], entry: Dict[str, Any]) -> None:
+        data["servers"].append(entry)
+        data["total_bytes"] += entry["bytes"]
+        data["new_bytes"] += entry["new_bytes"]
+        data["shared_bytes"] += entry["shared_bytes"]
+
     @staticmethod
     def _human_bytes(num: int) -> str:
         units = ["B", "KB", "MB", "GB", "TB", "PB", "EB"]
@@ -102,22 +253,41 @@ class PulseService:
     def _send_report(
         self,
         timestamp: str,
-        backup_ok: bool,
+        backup_results: Dict[str, Dict[str, Any]],
         verify_ok: bool,
         verify_data: Dict[str, Any],
+        retention_text: str = "",
     ) -> None:
         """Compose and push the Discord embed."""
+        backup_ok = bool(backup_results) and all(r["ok"] for r in backup_results.values())
         status_backup = "✅ **Back-ups Success**" if backup_ok else "❌ **Back-ups Failed**"
+        ok_count = sum(1 for r in backup_results.values() if r["ok"])
+        status_backup += f"\n{ok_count}/{len(backup_results)} servers OK"
+        for name, r in backup_results.items():
+            if not r["ok"]:
+                status_backup += f"\n- ❌ {name}: {r['error'][:150]}"
+        if len(status_backup) > 1024:
+            status_backup = status_backup[:1000] + "\n… (truncated)"
         status_verify = "✅ **Verification Success**" if verify_ok else "⚠️ **Verification Failed**"
 
         # Build sizes field (safe even if backup failed; shows what exists)
         sizes = self._collect_backup_sizes(timestamp)
         if sizes["servers"]:
             lines = [f"**Total**: {self._human_bytes(sizes['total_bytes'])}"]
-            for s in sizes["servers"]:
-                lines.append(
-                    f"- {s['name']}: {self._human_bytes(s['bytes'])} ({s['files']} files)"
+            if sizes["shared_bytes"]:
+                lines[0] += (
+                    f" ({self._human_bytes(sizes['new_bytes'])} new, "
+                    f"{self._human_bytes(sizes['shared_bytes'])} shared)"
                 )
+            if sizes.get("previous_total"):
+                delta = sizes["total_bytes"] - sizes["previous_total"]
+                sign = "+" if delta >= 0 else "-"
+                lines[0] += f" | {sign}{self._human_bytes(abs(delta))} vs previous pulse"
+            for s in sizes["servers"]:
+                line = f"- {s['name']}: {self._human_bytes(s['bytes'])} ({s['files']} files"
+                if s["shared_bytes"]:
+                    line += f", {self._human_bytes(s['new_bytes'])} new"
+                lines.append(line + ")")
             sizes_text = "\n".join(lines)
             # Discord field hard limit ~1024 chars
             if len(sizes_text) > 1024:
@@ -125,6 +295,15 @@ class PulseService:
         else:
             sizes_text = "_No backup files found for this pulse._"
 
+        timing_text = "\n".join(METRICS.summary_lines()) or "_No timings recorded._"
+        if len(timing_text) > 1024:
+            timing_text = timing_text[:1000] + "\n… (truncated)"
+
+        latency_lines = format_summary(LatencyHistory.load().summary())
+        latency_text = "\n".join(latency_lines) or "_No status history yet._"
+        if len(latency_text) > 1024:
+            latency_text = latency_text[:1000] + "\n… (truncated)"
+
         embed = {
             "title": f"📊  WatchDog Pulse — {timestamp}",
             "color": 0x00FF00 if backup_ok and verify_ok else 0xFF0000,
@@ -138,6 +317,10 @@ class PulseService:
                     "inline": False,
                 },
                 {"name": "Backup sizes", "value": sizes_text, "inline": False},
+                {"name": "Timings", "value": timing_text, "inline": False},
+                {"name": "Status latency (24h)", "value": latency_text, "inline": False},
+                *([{"name": "Retention", "value": retention_text, "inline": False}]
+                  if retention_text else []),
                 {
                     "name": "Details (JSON)",
                     "value": f"```json\n{json.dumps(verify_data, indent=2)[:900]}```",
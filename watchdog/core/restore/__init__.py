@@ -0,0 +1 @@
+from .restore_service import RestoreError, RestoreService  # noqa: F401
@@ -0,0 +1,584 @@
+"""
+RestoreService – bring artefacts of one pulse back, verified while streaming.
+
+• Artefacts of `<pulse>/<server>.json` are restored in parallel (largest
+  first); `target` narrows them by artefact name (substring or glob),
+  `paths` by member path inside each archive.
+• Each artefact file is read once: the same bytes feed the hasher and the
+  decoder/extractor, so the manifest digest is checked without a second
+  pass. Local restores land in `.<name>.partial` and are only renamed into
+  place once the digest matches - a damaged archive never half-restores.
+• `host` streams the bytes back over the pooled SSH transport into
+  `tar -x` (or a plain file for MySQL dumps) on that server, staged the
+  same way remotely.
+• Seekable tar archives restore single members via their member index
+  without inflating the whole archive (block CRCs vouch for the data).
+• Progress (bytes, MB/s, ETA) is reported through `on_progress`.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import io
+import shlex
+import shutil
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from watchdog.utils.logger import WatchdogLogger
+from watchdog.core.verify.checksum import HAS_XXH3, MultiHasher
+from watchdog.core.verify.decompress import StreamError, make_decoder
+from watchdog.core.verify.manifest import Manifest
+from watchdog.core.dedup.chunk_store import ChunkStore, load_index
+from watchdog.core.backup.snapshot import load_file_list
+from watchdog.core.backup import seekable
+from watchdog.core.backup.ssh_pool import SSH_POOL
+
+_CHUNK = 1 << 20  # 1 MiB
+_ARCHIVE_SUFFIXES = (".tar.gz", ".tar.zst", ".tar", ".sql.gz", ".sql.zst", ".sql", ".idx.json")
+_TAR_DECOMPRESS = {"gzip": "-z", "pigz": "-z", "zstd": "-I zstd", "none": ""}
+
+
+class RestoreError(Exception):
+    """Raised when an artefact cannot be restored (missing, damaged, refused)."""
+
+
+@dataclass
+class RestoreResult:
+    """Outcome of one artefact."""
+
+    artifact: str
+    ok: bool
+    message: str = ""
+    bytes: int = 0
+    seconds: float = 0.0
+    dest: str = ""
+
+
+@dataclass
+class RestoreReport:
+    results: List[RestoreResult] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.results) and all(r.ok for r in self.results)
+
+    @property
+    def bytes(self) -> int:
+        return sum(r.bytes for r in self.results)
+
+    @property
+    def mb_per_sec(self) -> float:
+        return self.bytes / self.seconds / (1 << 20) if self.seconds > 0 else 0.0
+
+
+class Progress:
+    """Thread-safe byte counter that reports MB/s + ETA every `interval` seconds."""
+
+    def __init__(self, total: int, on_progress: Optional[Callable[[str], None]], interval: float = 2.0) -> None:
+        self.total = total
+        self.done = 0
+        self.on_progress = on_progress
+        self.interval = interval
+        self._start = self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, n: int) -> None:
+        with self._lock:
+            self.done += n
+            now = time.monotonic()
+            if self.on_progress is None or now - self._last < self.interval:
+                return
+            self._last = now
+        self.on_progress(self.line())
+
+    def line(self) -> str:
+        elapsed = max(time.monotonic() - self._start, 1e-6)
+        rate = self.done / elapsed
+        eta = (self.total - self.done) / rate if rate > 0 else 0.0
+        pct = 100.0 * self.done / self.total if self.total else 100.0
+        return (
+            f"{self.done / (1 << 20):,.0f}/{self.total / (1 << 20):,.0f} MB ({pct:.0f}%) · "
+            f"{rate / (1 << 20):.1f} MB/s · ETA {_duration(eta)}"
+        )
+
+
+class RestoreService:
+    """Restore artefacts of one pulse/server to a local directory or back to a host."""
+
+    def __init__(
+        self,
+        backup_root: Path,
+        workers: int = 4,
+        on_progress: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.backup_root = Path(backup_root)
+        self.workers = max(1, workers)
+        self.on_progress = on_progress
+        self.logger = WatchdogLogger("restore")
+
+    # ------------------------------------------------------------------ #
+    # Public API
+
+    def latest_pulse(self) -> Optional[str]:
+        pulses = sorted(p.name for p in self.backup_root.iterdir() if p.is_dir() and p.name[:1].isdigit())
+        return pulses[-1] if pulses else None
+
+    def select(self, pulse: str, server: str, target: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Manifest entries of `server` in `pulse` whose name matches `target`."""
+        manifest_file = self.backup_root / pulse / f"{server}.json"
+        if not manifest_file.exists():
+            raise RestoreError(f"no manifest for {server} in pulse {pulse}")
+        artifacts = Manifest.load(manifest_file).artifacts
+        if target:
+            artifacts = [a for a in artifacts if _name_matches(a, target)]
+        return artifacts
+
+    def restore(
+        self,
+        pulse: str,
+        server: str,
+        dest: Path,
+        target: Optional[str] = None,
+        paths: Sequence[str] = (),
+        host: Optional[Dict[str, Any]] = None,
+    ) -> RestoreReport:
+        """
+        Restore the selected artefacts. With `host` (a server config entry)
+        `dest` is a directory on that host, otherwise a local directory.
+        """
+        started = time.monotonic()
+        artifacts = self.select(pulse, server, target)
+        if not artifacts:
+            raise RestoreError(f"no artefact of {server} in {pulse} matches {target!r}")
+        base = self.backup_root / pulse / server.lower()
+        jobs = [(a, base / a["path"]) for a in artifacts]
+        progress = Progress(sum(_stream_size(a, p) for a, p in jobs), self.on_progress)
+        self.logger.info(
+            f"Restoring {len(jobs)} artefact(s) of {server}@{pulse} → "
+            f"{host['name'] + ':' if host else ''}{dest} ({progress.total} bytes)"
+        )
+
+        ssh = SSH_POOL.acquire(host) if host else None
+        try:
+            # largest first, so the biggest archive never starts last
+            jobs.sort(key=lambda job: _stream_size(*job), reverse=True)
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="restore") as pool:
+                futures = [
+                    pool.submit(self._restore_one, spec, path, Path(dest), paths, ssh, progress)
+                    for spec, path in jobs
+                ]
+                results = [f.result() for f in futures]
+        finally:
+            if ssh is not None:
+                SSH_POOL.release(ssh)
+
+        report = RestoreReport(results, time.monotonic() - started)
+        self.logger.info(
+            f"Restore done: {sum(r.ok for r in results)}/{len(results)} ok, "
+            f"{report.bytes} bytes in {report.seconds:.1f}s ({report.mb_per_sec:.1f} MB/s)"
+        )
+        return report
+
+    # ------------------------------------------------------------------ #
+    # Internals
+
+    def _restore_one(
+        self,
+        spec: Dict[str, Any],
+        path: Path,
+        dest: Path,
+        paths: Sequence[str],
+        ssh,
+        progress: Progress,
+    ) -> RestoreResult:
+        started = time.monotonic()
+        result = RestoreResult(spec["path"], ok=False)
+        try:
+            if not path.exists():
+                raise RestoreError("artefact missing on disk")
+            job = _Job(spec, path, dest, list(paths), ssh, progress)
+            result.dest, result.bytes, result.message = job.run()
+            result.ok = True
+        except (RestoreError, StreamError, tarfile.TarError) as exc:
+            result.message = str(exc)
+            self.logger.error(f"Restore of {spec['path']} failed: {exc}")
+        except Exception as exc:  # noqa: BLE001 - zlib.error, SSHException, … fail this artefact only
+            result.message = f"{type(exc).__name__}: {exc}"
+            self.logger.error(f"Restore of {spec['path']} failed: {result.message}")
+        result.seconds = round(time.monotonic() - started, 2)
+        if result.ok:
+            self.logger.info(f"Restored {spec['path']} → {result.dest} in {result.seconds}s")
+        return result
+
+
+# ---------------------------------------------------------------------- #
+# One artefact
+
+
+class _Job:
+    """Restore a single artefact; `run()` returns (dest, bytes, note)."""
+
+    def __init__(self, spec, path: Path, dest: Path, paths: List[str], ssh, progress: Progress) -> None:
+        self.spec = spec
+        self.path = path
+        self.dest = dest
+        self.paths = [_normalize(p) for p in paths]
+        self.ssh = ssh
+        self.progress = progress
+        self.name = artifact_stem(spec["path"])
+
+    def run(self):
+        kind = self.spec["type"]
+        if kind == "tar":
+            if self.spec.get("index") and self.paths and self.ssh is None and not _has_glob(self.paths):
+                return self._seekable_members()
+            return self._tar()
+        if kind == "mysql":
+            return self._mysql()
+        if kind == "dedup":
+            return self._dedup()
+        if kind == "snapshot":
+            return self._snapshot()
+        raise RestoreError(f"unknown artefact type {kind!r}")
+
+    # tar / dedup ------------------------------------------------------- #
+
+    def _tar(self):
+        reader = _VerifyingReader(
+            _file_chunks(self.path), self.progress, _algorithms(self.spec),
+            make_decoder(self.spec.get("codec", "gzip")) if self.ssh is None else None,
+        )
+        return self._extract(reader, self.spec.get("codec", "gzip"), self._check_file_digest)
+
+    def _dedup(self):
+        index = load_index(self.path)
+        store = ChunkStore.for_artifact(self.path)
+        reader = _VerifyingReader(_dedup_chunks(store, index["chunks"]), self.progress, ("sha256",))
+
+        def check(digests) -> None:
+            if digests.sha256 != self.spec.get("stream_sha256", index.get("stream_sha256")):
+                raise RestoreError("reassembled stream does not match its SHA-256")
+
+        return self._extract(reader, "none", check)
+
+    def _extract(self, reader: "_VerifyingReader", codec: str, check: Callable[[Any], None]):
+        if self.ssh is not None:
+            # the remote tar decompresses; we only hash the bytes on the way out
+            command = ["tar -x", _TAR_DECOMPRESS.get(codec, "-z"), "-f - -C {staging}"]
+            if self.paths:  # directories match recursively, like local extraction
+                command += ["--wildcards"] + [shlex.quote(p) for p in self.paths]
+            return self._upload(reader, " ".join(c for c in command if c), check, directory=True)
+
+        final, staging = self._local_dirs()
+        try:
+            with tarfile.open(fileobj=io.BufferedReader(reader, _CHUNK), mode="r|") as tar:
+                tar.extractall(staging, members=self._members(tar), filter="tar")
+            check(reader.finish())  # also hashes the padding after the end-of-archive blocks
+        except BaseException:
+            _remove_tree(staging)
+            raise
+        staging.rename(final)
+        return str(final), reader.size, ""
+
+    def _members(self, tar: tarfile.TarFile) -> Iterable[tarfile.TarInfo]:
+        for member in tar:
+            if _wanted(member.name, self.paths):
+                yield member
+
+    def _seekable_members(self):
+        """Single members via the member index - only the covering blocks are inflated."""
+        archive = seekable.SeekableArchive(self.path, seekable.load_index(self.path.with_name(self.spec["index"])))
+        names = [n for n in archive.names() if _wanted(n, self.paths)]
+        regular = [n for n in names if archive.lookup(n)["type"] in ("0", "7", "\x00")]
+        if not regular:
+            raise RestoreError(f"no regular file matches {', '.join(self.paths)}")
+        final, staging = self._local_dirs()
+        size = 0
+        try:
+            for name in regular:
+                size += archive.extract(name, staging).stat().st_size
+        except BaseException:
+            _remove_tree(staging)
+            raise
+        staging.rename(final)
+        return str(final), size, f"{len(regular)} member(s) via index"
+
+    # mysql ------------------------------------------------------------- #
+
+    def _mysql(self):
+        if self.ssh is not None:
+            # keep the dump compressed on the wire; the host imports it itself
+            reader = _VerifyingReader(_file_chunks(self.path), self.progress, _algorithms(self.spec))
+            return self._upload(reader, "cat > {staging}", self._check_file_digest, directory=False)
+
+        reader = _VerifyingReader(
+            _file_chunks(self.path), self.progress, _algorithms(self.spec),
+            make_decoder(self.spec.get("codec", "gzip")),
+        )
+        self.dest.mkdir(parents=True, exist_ok=True)
+        final = self.dest / f"{self.name}.sql"
+        if final.exists():
+            raise RestoreError(f"{final} already exists")
+        staging = self.dest / f".{final.name}.partial"
+        try:
+            with staging.open("wb") as fh:
+                for piece in iter(lambda: reader.read(_CHUNK), b""):
+                    fh.write(piece)
+            self._check_file_digest(reader.finish())
+        except BaseException:
+            staging.unlink(missing_ok=True)
+            raise
+        staging.rename(final)
+        return str(final), reader.size, ""
+
+    # snapshot ---------------------------------------------------------- #
+
+    def _snapshot(self):
+        listing = load_file_list(self.path)
+        root = self.path.parent / self.spec.get("tree", listing["tree"])
+        files = {rel: e for rel, e in listing["files"].items() if _wanted(rel, self.paths)}
+        if not files:
+            raise RestoreError("no snapshot file matches the path filter")
+
+        if self.ssh is not None:
+            # pack the tree as an uncompressed tar stream straight into the channel
+            upload = self._open_upload("tar -x -f - -C {staging}", directory=True)
+            try:
+                with tarfile.open(fileobj=upload.sink, mode="w|") as tar:
+                    for rel, entry in files.items():
+                        src = _VerifyingReader(_file_chunks(root / rel), self.progress, _entry_algorithms(entry))
+                        tar.addfile(tar.gettarinfo(str(root / rel), arcname=rel), src)
+                        _check_entry(rel, entry, src.finish())
+            except BaseException:
+                upload.abort()
+                raise
+            upload.finish()
+            return upload.final, sum(e["size"] for e in files.values()), f"{len(files)} file(s)"
+
+        final, staging = self._local_dirs()
+        total = 0
+        try:
+            for rel, entry in files.items():
+                src = _VerifyingReader(_file_chunks(root / rel), self.progress, _entry_algorithms(entry))
+                target = staging / rel
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with target.open("wb") as fh:
+                    for piece in iter(lambda: src.read(_CHUNK), b""):
+                        fh.write(piece)
+                _check_entry(rel, entry, src.finish())
+                total += entry["size"]
+        except BaseException:
+            _remove_tree(staging)
+            raise
+        staging.rename(final)
+        return str(final), total, f"{len(files)} file(s)"
+
+    # helpers ----------------------------------------------------------- #
+
+    def _check_file_digest(self, digests) -> None:
+        if digests.size != self.spec["size"]:
+            raise RestoreError("size mismatch - archive damaged, nothing restored")
+        if digests.xxh3 and digests.xxh3 == self.spec.get("xxh3"):
+            return
+        if digests.sha256 != self.spec["sha256"]:
+            raise RestoreError("digest mismatch - archive damaged, nothing restored")
+
+    def _local_dirs(self):
+        final = self.dest / self.name
+        if final.exists():
+            raise RestoreError(f"{final} already exists")
+        staging = self.dest / f".{self.name}.partial"
+        _remove_tree(staging)  # leftover of an interrupted restore
+        staging.mkdir(parents=True)
+        return final, staging
+
+    def _open_upload(self, command: str, directory: bool) -> "_RemoteUpload":
+        return _RemoteUpload(self.ssh, self.dest, self.name if directory else self.spec["path"], command, directory)
+
+    def _upload(self, reader: "_VerifyingReader", command: str, check, directory: bool):
+        upload = self._open_upload(command, directory)
+        try:
+            for piece in iter(lambda: reader.read(_CHUNK), b""):
+                upload.sink.write(piece)
+            check(reader.finish())
+        except BaseException:
+            upload.abort()
+            raise
+        upload.finish()
+        return upload.final, reader.size, ""
+
+
+# ---------------------------------------------------------------------- #
+# Streaming plumbing
+
+
+class _VerifyingReader(io.RawIOBase):
+    """
+    Raw reader over a chunk source: every source chunk is counted and hashed,
+    then (optionally) decoded. `finish()` reads the source to its end and
+    returns its Digests.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], progress: Progress, algorithms: Sequence[str], decoder=None) -> None:
+        self._chunks = iter(chunks)
+        self._progress = progress
+        self._hasher = MultiHasher(algorithms)
+        self._decoder = decoder
+        self._pieces: Iterator[bytes] = iter(())   # decoded output of the current chunk
+        self._buf = bytearray()
+        self._eof = False
+        self._digests = None
+        self.size = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buf and not self._eof:
+            piece = next(self._pieces, None)   # bounded pieces, never a whole inflated chunk
+            if piece is not None:
+                self._buf += piece
+                continue
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._eof = True
+                if self._decoder is not None:
+                    self._buf += self._decoder.finish()
+                break
+            self._hasher.update(chunk)
+            self.size += len(chunk)
+            self._progress.add(len(chunk))
+            if self._decoder is not None:
+                self._pieces = self._decoder.stream(chunk)
+            else:
+                self._buf += chunk
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        del self._buf[:n]
+        return n
+
+    def finish(self):
+        if self._digests is None:
+            while self.read(_CHUNK):
+                pass
+            self._digests = self._hasher.close()
+        return self._digests
+
+
+class _RemoteUpload:
+    """`<command>` on the restore host, staged in `<dest>/.<name>.partial`."""
+
+    def __init__(self, ssh, dest: Path, name: str, command: str, directory: bool) -> None:
+        self.ssh = ssh
+        self.final = f"{dest}/{name}"
+        self.staging = f"{dest}/.{name}.partial"
+        q_final, q_staging = shlex.quote(self.final), shlex.quote(self.staging)
+        prepare = f"mkdir -p {shlex.quote(str(dest))} && test ! -e {q_final} && rm -rf {q_staging}"
+        if directory:
+            prepare += f" && mkdir {q_staging}"
+        script = f"{prepare} && {command.format(staging=q_staging)}"
+        self.sink = ssh.open_upload(f"sh -c {shlex.quote(script)}", sudo=True)
+
+    def finish(self) -> None:
+        err, code = self.sink.close()
+        if code != 0:
+            raise RestoreError(f"remote restore failed ({code}): {err.strip() or 'target exists?'}")
+        out, err, code = self.ssh.exec_sudo(f"mv {shlex.quote(self.staging)} {shlex.quote(self.final)}")
+        if code != 0:
+            raise RestoreError(f"remote rename failed: {err.strip()}")
+
+    def abort(self) -> None:
+        try:
+            self.sink.chan.close()
+        finally:
+            self.ssh.exec_sudo(f"rm -rf {shlex.quote(self.staging)}")
+
+
+def _file_chunks(path: Path) -> Iterable[bytes]:
+    with path.open("rb") as fh:
+        yield from iter(lambda: fh.read(_CHUNK), b"")
+
+
+def _dedup_chunks(store: ChunkStore, chunks: List[List[Any]]) -> Iterable[bytes]:
+    for digest, size in chunks:
+        data = store.read(digest)
+        if len(data) != size:
+            raise RestoreError(f"chunk {digest[:12]} has {len(data)} bytes, index says {size}")
+        yield data
+
+
+# ---------------------------------------------------------------------- #
+# Helpers
+
+
+def artifact_stem(name: str) -> str:
+    """`backup_www.tar.gz` → `backup_www`, `snapshot_etc.files.json` → `etc`."""
+    if name.startswith("snapshot_") and name.endswith(".files.json"):
+        return name[len("snapshot_"):-len(".files.json")]
+    for suffix in _ARCHIVE_SUFFIXES:
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+def _name_matches(spec: Dict[str, Any], pattern: str) -> bool:
+    names = [spec["path"], artifact_stem(spec["path"])] + ([spec["tree"]] if spec.get("tree") else [])
+    return any(pattern in n or fnmatch.fnmatch(n, pattern) for n in names)
+
+
+def _wanted(name: str, patterns: Sequence[str]) -> bool:
+    if not patterns:
+        return True
+    name = _normalize(name)
+    return any(name == p or name.startswith(p + "/") or fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def _normalize(name: str) -> str:
+    return name.lstrip("/").removeprefix("./").rstrip("/")
+
+
+def _has_glob(patterns: Sequence[str]) -> bool:
+    return any(ch in p for p in patterns for ch in "*?[")
+
+
+def _algorithms(spec: Dict[str, Any]):
+    return ("xxh3",) if spec.get("xxh3") and HAS_XXH3 else ("sha256",)
+
+
+def _entry_algorithms(entry: Dict[str, Any]):
+    return ("xxh3",) if entry.get("xxh3") and HAS_XXH3 else ("sha256",)
+
+
+def _check_entry(rel: str, entry: Dict[str, Any], digests) -> None:
+    algo = "xxh3" if digests.xxh3 else "sha256"
+    if digests.size != entry["size"] or getattr(digests, algo) != entry[algo]:
+        raise RestoreError(f"{rel}: digest mismatch in snapshot")
+
+
+def _stream_size(spec: Dict[str, Any], path: Path) -> int:
+    """Bytes the progress counter will see for this artefact."""
+    if spec["type"] == "dedup":
+        return spec.get("stream_size", 0)
+    if spec["type"] == "snapshot":
+        return spec.get("new_bytes", 0) + spec.get("shared_bytes", 0)
+    return spec["size"]
+
+
+def _remove_tree(path: Path) -> None:
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
@@ -0,0 +1,216 @@
+"""
+LatencyHistory - bounded per-target probe history for StatusChecker.
+
+• One LatencyRing per target: two parallel `array` buffers
+  (uint32 epoch seconds + float32 latency in ms, NaN = failed probe),
+  8 bytes per sample, fixed capacity (oldest samples overwritten).
+• Capacity covers `history_days` at the target's interval, capped at
+  `max_samples`, so memory is bounded regardless of target count.
+• Rolling-window stats: p50/p95/p99 over successful probes + error rate,
+  plus `span_sec`, the part of the window the ring still covers: a
+  capped ring (fast targets) or a new target reports less than the
+  window, and the summary labels it.
+• Persisted as JSON (base64 of the raw arrays) so history survives
+  daemon restarts and the `status` CLI can read it from disk.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import math
+import os
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+STATE_DIR = Path("/opt/watchdog/state")
+HISTORY_FILE = STATE_DIR / "latency_history.json"
+HISTORY_VERSION = 1
+WINDOWS = {"1h": 3600, "24h": 86400, "7d": 7 * 86400}
+MAX_SAMPLES = 20160  # one week at 30 s; faster targets keep a shorter span
+
+
+class LatencyRing:
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(1, capacity)
+        self.ts = array("I", bytes(4 * self.capacity))
+        self.ms = array("f", bytes(4 * self.capacity))
+        self.head = 0      # next write position
+        self.count = 0
+
+    def record(self, latency_ms: Optional[float], ts: Optional[float] = None) -> None:
+        """Append a sample; `latency_ms=None` records a failed probe."""
+        self.ts[self.head] = int(ts if ts is not None else time.time())
+        self.ms[self.head] = math.nan if latency_ms is None else latency_ms
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def _ordered(self) -> Iterable[int]:
+        """Indices from newest to oldest."""
+        for i in range(1, self.count + 1):
+            yield (self.head - i) % self.capacity
+
+    def stats(self, window_sec: int, now: Optional[float] = None) -> Dict[str, Any]:
+        now = now if now is not None else time.time()
+        since = now - window_sec
+        ok: List[float] = []
+        errors = 0
+        oldest = now
+        span = None      # stays None only if the ring runs out inside the window
+        for i in self._ordered():
+            if self.ts[i] < since:
+                span = window_sec
+                break
+            oldest = self.ts[i]
+            value = self.ms[i]
+            if math.isnan(value):
+                errors += 1
+            else:
+                ok.append(value)
+        samples = len(ok) + errors
+        ok.sort()
+        return {
+            "samples": samples,
+            "errors": errors,
+            "error_rate": round(errors / samples, 4) if samples else 0.0,
+            "p50_ms": _percentile(ok, 0.50),
+            "p95_ms": _percentile(ok, 0.95),
+            "p99_ms": _percentile(ok, 0.99),
+            "span_sec": span if span is not None else max(0, int(now - oldest)),
+        }
+
+    # Persistence (chronological order, oldest first)
+
+    def dump(self) -> Dict[str, str]:
+        idx = list(self._ordered())[::-1]
+        ts = array("I", (self.ts[i] for i in idx))
+        ms = array("f", (self.ms[i] for i in idx))
+        return {
+            "ts": base64.b64encode(ts.tobytes()).decode(),
+            "ms": base64.b64encode(ms.tobytes()).decode(),
+        }
+
+    def load(self, data: Dict[str, str]) -> None:
+        ts, ms = array("I"), array("f")
+        ts.frombytes(base64.b64decode(data["ts"]))
+        ms.frombytes(base64.b64decode(data["ms"]))
+        for t, m in zip(ts[-self.capacity:], ms[-self.capacity:]):
+            self.record(None if math.isnan(m) else m, t)
+
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))], 1)
+
+
+class LatencyHistory:
+    def __init__(
+        self,
+        path: Path = HISTORY_FILE,
+        history_days: float = 7,
+        max_samples: int = MAX_SAMPLES,
+    ) -> None:
+        self.path = Path(path)
+        self.history_days = history_days
+        self.max_samples = max_samples
+        self.rings: Dict[str, LatencyRing] = {}
+
+    def ring(self, name: str, interval: float) -> LatencyRing:
+        ring = self.rings.get(name)
+        if ring is None:
+            wanted = math.ceil(self.history_days * 86400 / max(1.0, interval))
+            ring = self.rings[name] = LatencyRing(min(wanted, self.max_samples))
+        return ring
+
+    def record(self, name: str, interval: float, latency_ms: Optional[float]) -> None:
+        self.ring(name, interval).record(latency_ms)
+
+    def prune(self, names: Iterable[str]) -> None:
+        """Drop rings for targets that left the config."""
+        keep = set(names)
+        for name in list(self.rings):
+            if name not in keep:
+                del self.rings[name]
+
+    def summary(self, windows: Dict[str, int] = WINDOWS) -> Dict[str, Dict[str, Any]]:
+        now = time.time()
+        return {
+            name: {label: ring.stats(sec, now) for label, sec in windows.items()}
+            for name, ring in sorted(self.rings.items())
+        }
+
+    # Persistence
+
+    def save(self) -> None:
+        payload = {
+            "version": HISTORY_VERSION,
+            "saved": int(time.time()),
+            "targets": {name: ring.dump() for name, ring in self.rings.items()},
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(payload))
+        os.replace(tmp, self.path)
+
+    @classmethod
+    def load(
+        cls,
+        path: Path = HISTORY_FILE,
+        history_days: float = 7,
+        max_samples: int = MAX_SAMPLES,
+        intervals: Optional[Dict[str, float]] = None,
+    ) -> "LatencyHistory":
+        """Read a saved history; missing or corrupt files give an empty one."""
+        history = cls(path, history_days, max_samples)
+        try:
+            payload = json.loads(Path(path).read_text())
+        except (OSError, ValueError):
+            return history
+        if payload.get("version") != HISTORY_VERSION:
+            return history
+        for name, data in payload.get("targets", {}).items():
+            try:
+                if intervals and name in intervals:
+                    ring = history.ring(name, intervals[name])
+                else:  # read-only use (CLI/report): size to what was stored
+                    stored = len(base64.b64decode(data["ts"])) // 4
+                    ring = history.rings[name] = LatencyRing(min(stored, max_samples))
+                ring.load(data)
+            except (KeyError, ValueError):
+                history.rings.pop(name, None)
+        return history
+
+
+def format_summary(summary: Dict[str, Dict[str, Any]], window: str = "24h") -> List[str]:
+    """
+    One line per target, e.g. `Blog: p50 42 ms · p95 80 ms · p99 120 ms · 0.3% err`;
+    `· last 3.5d` is appended when the history covers less than `window`.
+    """
+    lines = []
+    for name, windows in summary.items():
+        s = windows.get(window)
+        if not s or not s["samples"]:
+            continue
+        if s["p50_ms"] is None:
+            line = f"{name}: no successful probes · {s['error_rate']:.1%} err"
+        else:
+            line = (
+                f"{name}: p50 {s['p50_ms']:.0f} ms · p95 {s['p95_ms']:.0f} ms · "
+                f"p99 {s['p99_ms']:.0f} ms · {s['error_rate']:.1%} err"
+            )
+        span = s.get("span_sec")
+        if span is not None and window in WINDOWS and span < WINDOWS[window]:
+            line += f" · last {_human_span(span)}"
+        lines.append(line)
+    return lines
+
+
+def _human_span(seconds: int) -> str:
+    if seconds < 2 * 3600:
+        return f"{max(1, seconds // 60)}m"
+    if seconds < 2 * 86400:
+        return f"{seconds / 3600:.0f}h"
+    return f"{seconds / 86400:.1f}d"
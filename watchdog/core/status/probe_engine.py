@@ -0,0 +1,361 @@
+"""
+ProbeEngine - asyncio scheduler for StatusChecker.
+
+• Every target runs on its own cadence (`interval_sec`, `timeout_sec`
+  per target, falling back to the global values); a slow or dead host
+  never delays the others.
+• At most `concurrency` probes are in flight at once (hot-reloadable).
+• HTTP(S) probes reuse keep-alive connections per (scheme, host, port)
+  and never download whole bodies: only a bounded prefix is read
+  (`expect` matches against it); larger bodies drop the connection.
+• Each result carries phase timings in ms - dns, connect, tls, ttfb -
+  (a reused connection only has ttfb).
+• `lag` records how late each probe started versus its due time, so
+  the checker can report per-cycle scheduling lag.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import socket
+import ssl
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+_DRAIN_LIMIT = 64 * 1024  # bodies up to this are read so the connection can be reused
+PHASES = ("dns", "connect", "tls", "ttfb")
+
+
+@dataclass
+class ProbeResult:
+    ok: bool
+    latency: float           # seconds, whole probe
+    status: Optional[int] = None
+    error: str = ""
+    phases: Dict[str, float] = field(default_factory=dict)  # ms per phase
+
+    def breakdown(self) -> str:
+        """e.g. `dns 2 · connect 11 · tls 35 · ttfb 120 ms`."""
+        parts = [f"{p} {self.phases[p]:.0f}" for p in PHASES if p in self.phases]
+        return " · ".join(parts) + " ms" if parts else ""
+
+
+def _ms_since(start: float) -> float:
+    return round((time.monotonic() - start) * 1000, 1)
+
+
+async def open_timed(
+    host: str,
+    port: int,
+    phases: Dict[str, float],
+    tls: Optional[ssl.SSLContext] = None,
+) -> "Conn":
+    """Resolve, connect and (optionally) TLS-wrap, timing each phase."""
+    loop = asyncio.get_running_loop()
+    start = time.monotonic()
+    infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    phases["dns"] = _ms_since(start)
+
+    sock, error = None, None
+    for family, type_, proto, _, addr in infos:
+        candidate = socket.socket(family, type_, proto)
+        candidate.setblocking(False)
+        start = time.monotonic()
+        try:
+            await loop.sock_connect(candidate, addr)
+        except OSError as exc:
+            candidate.close()
+            error = exc
+            continue
+        except BaseException:
+            candidate.close()
+            raise
+        phases["connect"] = _ms_since(start)
+        sock = candidate
+        break
+    if sock is None:
+        raise error or OSError(f"no address for {host}")
+
+    start = time.monotonic()
+    try:
+        conn = await asyncio.open_connection(
+            sock=sock, ssl=tls, server_hostname=host if tls else None
+        )
+    except BaseException:
+        sock.close()
+        raise
+    if tls:
+        phases["tls"] = _ms_since(start)
+    return conn
+
+
+# ---------------------------------------------------------------------- #
+# HTTP keep-alive pool
+
+ConnKey = Tuple[str, str, int]
+Conn = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class HttpConnectionPool:
+    """Idle keep-alive connections, at most `per_host` kept per key."""
+
+    def __init__(self, per_host: int = 2) -> None:
+        self.per_host = per_host
+        self._idle: Dict[ConnKey, List[Conn]] = {}
+        self._ssl = ssl.create_default_context()
+
+    async def acquire(self, key: ConnKey, phases: Dict[str, float]) -> Tuple[Conn, bool]:
+        """Return (connection, reused)."""
+        idle = self._idle.get(key)
+        while idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return (reader, writer), True
+        scheme, host, port = key
+        conn = await open_timed(host, port, phases, self._ssl if scheme == "https" else None)
+        return conn, False
+
+    def release(self, key: ConnKey, conn: Conn) -> None:
+        idle = self._idle.setdefault(key, [])
+        if len(idle) < self.per_host:
+            idle.append(conn)
+        else:
+            conn[1].close()
+
+    def close(self) -> None:
+        for idle in self._idle.values():
+            for _, writer in idle:
+                writer.close()
+        self._idle.clear()
+
+
+async def http_probe(
+    url: str,
+    pool: HttpConnectionPool,
+    phases: Dict[str, float],
+    expect: Optional[str] = None,
+    expect_bytes: int = _DRAIN_LIMIT,
+) -> Tuple[int, bool]:
+    """GET `url` over a pooled connection; return (status, expect matched)."""
+    parts = urlsplit(url)
+    scheme = parts.scheme or "http"
+    port = parts.port or (443 if scheme == "https" else 80)
+    key = (scheme, parts.hostname or "", port)
+    target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    request = (
+        f"GET {target} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+        "User-Agent: WatchDog\r\nAccept: */*\r\nConnection: keep-alive\r\n\r\n"
+    ).encode()
+    limit = max(expect_bytes, len(expect or "")) if expect else _DRAIN_LIMIT
+
+    for attempt in range(2):
+        conn, reused = await pool.acquire(key, phases)
+        try:
+            status, keep, body = await _exchange(conn, request, phases, limit)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            conn[1].close()
+            if reused and attempt == 0:
+                continue  # server dropped the idle connection - retry fresh
+            raise
+        except BaseException:
+            conn[1].close()
+            raise
+        if keep:
+            pool.release(key, conn)
+        else:
+            conn[1].close()
+        return status, (expect is None or expect.encode() in body)
+    raise ConnectionError("unreachable")
+
+
+async def _exchange(
+    conn: Conn, request: bytes, phases: Dict[str, float], limit: int
+) -> Tuple[int, bool, bytes]:
+    """Send `request`; return (status, connection reusable, body prefix)."""
+    reader, writer = conn
+    start = time.monotonic()
+    writer.write(request)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed before response")
+    phases["ttfb"] = _ms_since(start)
+    version, status = status_line.split(None, 2)[:2]
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    keep = version == b"HTTP/1.1" and headers.get("connection", "").lower() != "close"
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        body, complete = await _read_chunked(reader, limit)
+        keep = keep and complete
+    elif "content-length" in headers:
+        length = int(headers["content-length"])
+        body = await reader.readexactly(min(length, limit))
+        keep = keep and length <= limit
+    else:
+        body = b""
+        while len(body) < limit:   # body runs until close
+            data = await reader.read(limit - len(body))
+            if not data:
+                break
+            body += data
+        keep = False
+    return int(status), keep, body
+
+
+async def _read_chunked(reader: asyncio.StreamReader, limit: int) -> Tuple[bytes, bool]:
+    """Read up to `limit` body bytes; True if the whole body was consumed."""
+    body = b""
+    while True:
+        size = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+        if size == 0:
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass  # trailers
+            return body, True
+        if len(body) + size > limit:
+            body += await reader.readexactly(limit - len(body))
+            return body, False
+        body += (await reader.readexactly(size + 2))[:-2]
+
+
+async def tcp_probe(host: str, port: int, phases: Dict[str, float]) -> None:
+    _, writer = await open_timed(host, port, phases)
+    writer.close()
+
+
+# ---------------------------------------------------------------------- #
+# Scheduler
+
+ResultCallback = Callable[[Dict[str, Any], ProbeResult], Awaitable[None]]
+
+
+class ProbeEngine:
+    def __init__(
+        self,
+        on_result: ResultCallback,
+        interval: float = 30,
+        timeout: float = 5,
+        concurrency: int = 100,
+    ) -> None:
+        self.on_result = on_result
+        self.interval = interval
+        self.timeout = timeout
+        self.pool = HttpConnectionPool()
+        self.lag: List[float] = []     # start lag (s) since last `take_lag()`
+        self._targets: Dict[str, Dict[str, Any]] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._scheduled: Set[str] = set()  # names with exactly one entry in `_heap`
+        self._seq = itertools.count()
+        self._running: Dict[str, asyncio.Task] = {}
+        self.concurrency = concurrency
+        self._sem = asyncio.Semaphore(concurrency)
+        self._wake = asyncio.Event()
+
+    # Public API
+
+    def set_targets(
+        self,
+        targets: List[Dict[str, Any]],
+        interval: float,
+        timeout: float,
+        concurrency: Optional[int] = None,
+    ) -> None:
+        """(Re)load targets; unchanged targets keep their schedule."""
+        self.interval, self.timeout = interval, timeout
+        if concurrency is not None and concurrency != self.concurrency:
+            # probes in flight finish on the old semaphore; new ones use the new limit
+            self.concurrency = concurrency
+            self._sem = asyncio.Semaphore(concurrency)
+        now = time.monotonic()
+        self._targets = {t["name"]: t for t in targets}
+        # a name removed and re-added before its heap entry popped is still
+        # scheduled: pushing again would probe it twice per interval
+        for name in self._targets.keys() - self._scheduled:
+            self._scheduled.add(name)
+            heapq.heappush(self._heap, (now, next(self._seq), name))
+        self._wake.set()
+
+    def take_lag(self) -> List[float]:
+        lag, self.lag = self.lag, []
+        return lag
+
+    async def run(self) -> None:
+        try:
+            while True:
+                if not self._heap:
+                    await self._wait(None)
+                    continue
+                due, _, name = self._heap[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    await self._wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                target = self._targets.get(name)
+                if target is None:
+                    self._scheduled.discard(name)
+                    continue  # removed by a config reload
+                # next slot is fixed to the cadence, not to probe duration
+                interval = max(1.0, float(target.get("interval_sec", self.interval)))
+                next_due = due + interval
+                if next_due < time.monotonic():
+                    next_due = time.monotonic() + interval  # fell behind: don't burst
+                heapq.heappush(self._heap, (next_due, next(self._seq), name))
+                if name in self._running and not self._running[name].done():
+                    continue  # previous probe still in flight (bounded by its timeout)
+                self._running[name] = asyncio.create_task(self._probe(target, due))
+        finally:
+            self.pool.close()
+
+    # Internals
+
+    async def _wait(self, delay: Optional[float]) -> None:
+        self._wake.clear()
+        try:
+            await asyncio.wait_for(self._wake.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _probe(self, target: Dict[str, Any], due: float) -> None:
+        timeout = max(1.0, float(target.get("timeout_sec", self.timeout)))
+        phases: Dict[str, float] = {}   # filled as phases complete, kept on failure
+        async with self._sem:
+            start = time.monotonic()
+            self.lag.append(start - due)
+            try:
+                result = await asyncio.wait_for(self._check(target, phases), timeout)
+            except asyncio.TimeoutError:
+                result = ProbeResult(False, time.monotonic() - start,
+                                     error=f"timeout after {timeout:.0f}s", phases=phases)
+            except Exception as exc:  # noqa: BLE001
+                result = ProbeResult(False, time.monotonic() - start,
+                                     error=str(exc) or type(exc).__name__, phases=phases)
+        await self.on_result(target, result)
+
+    async def _check(self, target: Dict[str, Any], phases: Dict[str, float]) -> ProbeResult:
+        start = time.monotonic()
+        if target["method"] in ("http", "https"):
+            status, matched = await http_probe(
+                target["url"], self.pool, phases,
+                expect=target.get("expect"),
+                expect_bytes=int(target.get("expect_bytes", _DRAIN_LIMIT)),
+            )
+            return ProbeResult(
+                status < 500 and matched, time.monotonic() - start, status=status,
+                error="" if matched else f"expected text {target['expect']!r} not found",
+                phases=phases,
+            )
+        if target["method"] == "tcp":
+            await tcp_probe(target["host"], target["port"], phases)
+            return ProbeResult(True, time.monotonic() - start, phases=phases)
+        return ProbeResult(False, 0.0, error=f"unknown method {target['method']}")
@@ -1,16 +1,23 @@
 """
 StatusChecker
-- Polls targets on a fixed interval.
-- Only notifies Discord on state-changes (UP ➜ DOWN  or  DOWN ➜ UP).
+- Probes every target on its own interval via the asyncio ProbeEngine
+  (thousands of targets, bounded concurrency, keep-alive HTTP).
+- Only notifies Discord on state-changes between UP, DOWN and SLOW
+  (SLOW = `slow_after` consecutive probes over the target's `slo_ms`).
+- Config is hot-reloaded every global interval; scheduling lag is logged.
+- Keeps a bounded latency history per target (LatencyHistory), saved to
+  /opt/watchdog/state every `history_save_sec` for the CLI / Pulse report.
 """
 
 from __future__ import annotations
-import socket, time, requests, threading
+import asyncio, threading, time
 from pathlib import Path
 from typing import Dict, Any, List
 
 from watchdog.utils.logger import WatchdogLogger
 from watchdog.core.notify import DiscordNotifier
+from watchdog.core.status.probe_engine import ProbeEngine, ProbeResult
+from watchdog.core.status.latency_history import LatencyHistory
 import json
 
 class StatusChecker:
@@ -20,48 +27,111 @@ class StatusChecker:
         self.logger   = WatchdogLogger("status")
         self.notifier = DiscordNotifier()
         # remember previous state to avoid spam
-        self.state: Dict[str, bool] = {t["name"]: True for t in self.targets}
+        self.state: Dict[str, str] = {t["name"]: "UP" for t in self.targets}
+        self.slow_runs: Dict[str, int] = {}
+        self.lag_stats: Dict[str, float] = {}
+        self.history = LatencyHistory.load(
+            history_days=self.history_days,
+            max_samples=self.history_max_samples,
+            intervals={t["name"]: self._interval_of(t) for t in self.targets},
+        )
 
     def load_cfg(self) -> None:
         data = json.loads(Path(self.cfg_path).read_text())
-        self.interval = max(5, data.get("interval_sec", 30))
-        self.timeout  = max(1, data.get("timeout_sec", 5))
-        self.targets  = data["targets"]
+        self.interval    = max(5, data.get("interval_sec", 30))
+        self.timeout     = max(1, data.get("timeout_sec", 5))
+        self.concurrency = max(1, data.get("concurrency", 100))
+        self.slo_ms      = data.get("slo_ms")
+        self.slow_after  = max(1, data.get("slow_after", 3))
+        self.targets: List[Dict[str, Any]] = data["targets"]
+        self.history_days        = data.get("history_days", 7)
+        self.history_max_samples = data.get("history_max_samples", 20160)
+        self.history_save_sec    = max(30, data.get("history_save_sec", 300))
+
+    def _interval_of(self, t: Dict[str, Any]) -> float:
+        return t.get("interval_sec", self.interval)
 
     def start(self) -> None:
         """Kick-off in its own thread (non-blocking)."""
-        th = threading.Thread(target=self._loop, daemon=True)
+        th = threading.Thread(target=lambda: asyncio.run(self._run()), daemon=True)
         th.start()
 
-    def _loop(self) -> None:
+    async def _run(self) -> None:
+        engine = ProbeEngine(self._on_result, self.interval, self.timeout, self.concurrency)
+        engine.set_targets(self.targets, self.interval, self.timeout)
+        runner = asyncio.create_task(engine.run())
+        last_save = time.monotonic()
         while True:
-            self.load_cfg()                      # hot-reload config
-            for t in self.targets:
-                ok = self._check_target(t)
-                prev = self.state.get(t["name"], True)
-                if ok != prev:                   # state change? → notify
-                    self._notify(t, ok)
-                    self.state[t["name"]] = ok
-            time.sleep(self.interval)
+            await asyncio.sleep(self.interval)
+            self._log_lag(engine.take_lag())
+            if time.monotonic() - last_save >= self.history_save_sec:
+                last_save = time.monotonic()
+                try:
+                    self.history.save()
+                except OSError as exc:
+                    self.logger.warning(f"Could not save latency history: {exc}")
+            try:
+                self.load_cfg()                  # hot-reload config
+            except (OSError, ValueError, KeyError) as exc:
+                self.logger.warning(f"Config reload failed, keeping old targets: {exc}")
+                continue
+            engine.set_targets(self.targets, self.interval, self.timeout, self.concurrency)
+            self.history.prune(t["name"] for t in self.targets)
+            if runner.done():
+                self.logger.error(f"Probe engine stopped: {runner.exception()}")
+                runner = asyncio.create_task(engine.run())
+
+    async def _on_result(self, t: Dict[str, Any], result: ProbeResult) -> None:
+        if result.error:
+            self.logger.warning(f"{t['name']} check error: {result.error}")
+        self.history.record(
+            t["name"], self._interval_of(t), result.latency * 1000 if result.ok else None
+        )
+        prev = self.state.get(t["name"], "UP")
+        state = self._classify(t, result, prev)
+        if state != prev:                        # state change? → notify
+            self.state[t["name"]] = state
+            # webhook is blocking I/O - keep it off the event loop
+            asyncio.get_running_loop().run_in_executor(None, self._notify, t, state, result)
+
+    def _classify(self, t: Dict[str, Any], result: ProbeResult, prev: str) -> str:
+        if not result.ok:
+            self.slow_runs[t["name"]] = 0
+            return "DOWN"
+        slo = t.get("slo_ms", self.slo_ms)
+        if slo and result.latency * 1000 > slo:
+            runs = self.slow_runs[t["name"]] = self.slow_runs.get(t["name"], 0) + 1
+            return "SLOW" if runs >= self.slow_after or prev == "SLOW" else "UP"
+        self.slow_runs[t["name"]] = 0
+        return "UP"
 
-    # single checks
-    def _check_target(self, t: Dict[str, Any]) -> bool:
-        try:
-            if t["method"] in ("http", "https"):
-                r = requests.get(t["url"], timeout=self.timeout)
-                return r.status_code < 500
-            if t["method"] == "tcp":
-                with socket.create_connection(
-                    (t["host"], t["port"]), timeout=self.timeout
-                ):
-                    return True
-        except Exception as exc:
-            self.logger.warning(f"{t['name']} check error: {exc}")
-        return False
+    def _log_lag(self, lag: List[float]) -> None:
+        if not lag:
+            return
+        lag.sort()
+        self.lag_stats = {
+            "probes": len(lag),
+            "lag_avg_ms": 1000 * sum(lag) / len(lag),
+            "lag_p95_ms": 1000 * lag[int(0.95 * (len(lag) - 1))],
+            "lag_max_ms": 1000 * lag[-1],
+        }
+        s = self.lag_stats
+        msg = (f"Cycle: {s['probes']} probes, scheduling lag avg {s['lag_avg_ms']:.1f} ms, "
+               f"p95 {s['lag_p95_ms']:.1f} ms, max {s['lag_max_ms']:.1f} ms")
+        if s["lag_max_ms"] > 1000:
+            self.logger.warning(msg + " (raise `concurrency` or lower timeouts)")
+        else:
+            self.logger.info(msg)
 
     # Discord push
-    def _notify(self, t: Dict[str, Any], ok: bool) -> None:
-        status = "🟢 UP again" if ok else "🔴 DOWN"
+    def _notify(self, t: Dict[str, Any], state: str, result: ProbeResult) -> None:
+        status = {"UP": "🟢 UP again", "DOWN": "🔴 DOWN", "SLOW": "🟡 SLOW"}[state]
         msg = f"**{t['name']}** {status}"
+        if state == "SLOW":
+            msg += f" — {result.latency * 1000:.0f} ms > SLO {t.get('slo_ms', self.slo_ms)} ms"
+        elif state == "DOWN" and result.error:
+            msg += f" — {result.error}"
+        if result.breakdown():
+            msg += f" ({result.breakdown()})"
         self.notifier.send(content=msg)
         self.logger.info(f"Notified: {msg}")
@@ -0,0 +1,123 @@
+"""
+Verification cache.
+
+• One JSON file (next to the pulse directories) remembering which
+  artefacts already passed verification.
+• An entry only counts while the file identity (device, inode, size,
+  mtime) and the manifest SHA-256 are unchanged, and while it is
+  younger than `recheck_days` (periodic deep re-check for bit-rot;
+  default 30, `None` = never).
+• dedup and snapshot artefacts are never cached: their file is only an
+  index, the data lives in the chunk store / hard-linked tree, which
+  can change (or be pruned) underneath an unchanged index.
+• Only passing results are served from the cache; failures are always
+  re-checked. Entries of deleted files are evicted on load/save.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+UNCACHED_TYPES = ("dedup", "snapshot")
+
+
+class VerificationCache:
+    VERSION = 1
+
+    def __init__(self, path: Path, recheck_days: Optional[float] = 30) -> None:
+        self.path = path
+        self.max_age = recheck_days * 86400 if recheck_days else None
+        self.hits = 0
+        self.misses = 0
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    # Public API
+
+    def identity(self, file_path: Path) -> Optional[Dict[str, int]]:
+        """Current identity of `file_path`, or None if it is gone."""
+        try:
+            st = file_path.stat()
+        except OSError:
+            return None
+        return {
+            "dev": st.st_dev,
+            "ino": st.st_ino,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+        }
+
+    def lookup(self, file_path: Path, spec: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the cached passing entry for an unchanged file, else None."""
+        if spec.get("type") in UNCACHED_TYPES:
+            self.misses += 1
+            return None
+        entry = self.entries.get(str(file_path))
+        ident = self.identity(file_path)
+        fresh = (
+            entry is not None
+            and ident is not None
+            and entry["ok"]
+            and entry["sha256"] == spec.get("sha256")
+            and all(entry[k] == v for k, v in ident.items())
+            and (self.max_age is None or time.time() - entry["checked_at"] < self.max_age)
+        )
+        if fresh:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(
+        self,
+        file_path: Path,
+        spec: Dict[str, Any],
+        ok: bool,
+        msg: str,
+        ident: Optional[Dict[str, int]],
+    ) -> None:
+        """Record an outcome; `ident` must be taken *before* verifying."""
+        if ident is None or spec.get("type") in UNCACHED_TYPES:
+            self.entries.pop(str(file_path), None)
+            return
+        self.entries[str(file_path)] = {
+            **ident,
+            "sha256": spec.get("sha256"),
+            "ok": ok,
+            "msg": msg,
+            "checked_at": time.time(),
+        }
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return round(self.hits / total, 3) if total else 0.0
+
+    def save(self) -> None:
+        """Evict entries of deleted files and write atomically."""
+        self.evict_missing()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"version": self.VERSION, "entries": self.entries}))
+        os.replace(tmp, self.path)
+
+    def evict_missing(self) -> int:
+        gone = [p for p in self.entries if not os.path.exists(p)]
+        for p in gone:
+            del self.entries[p]
+        return len(gone)
+
+    # Internals
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return  # no cache yet (or unreadable) - start empty
+        if data.get("version") == self.VERSION:
+            self.entries = data.get("entries", {})
+            self.evict_missing()
@@ -1,40 +1,156 @@
 """
 Checksum helpers
 
+• multi_digest(path)  - read once, feed SHA-256 + xxh3 together → Digests
+• MultiHasher        - the same, fed incrementally by callers that stream
 • sha256_stream(path) - cryptographic baseline
 • xxh3_stream(path)  - 10x faster pre-screen (uses xxhash if installed)
+• HashingWriter      - file sink that hashes bytes as they are written
 """
 
 from __future__ import annotations
 
 import hashlib
+import queue
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional, Sequence
 
 try:
     import xxhash  # type: ignore
 except ModuleNotFoundError:  # noqa: PERF203
     xxhash = None  # graceful fallback
 
+HAS_XXH3 = xxhash is not None
 
-_CHUNK = 4 << 20  # 4 MiB
+
+CHUNK_SIZE = 4 << 20  # 4 MiB read size, shared by the streaming inspectors
+_QUEUE_DEPTH = 4  # chunks buffered for the SHA-256 helper thread
+
+
+@dataclass
+class Digests:
+    """Result of one hashing pass; digests are None when not requested/available."""
+
+    sha256: Optional[str]
+    xxh3: Optional[str]
+    size: int
+    seconds: float
+
+    @property
+    def bytes_per_sec(self) -> float:
+        return self.size / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def mb_per_sec(self) -> float:
+        return self.bytes_per_sec / (1 << 20)
+
+
+class MultiHasher:
+    """
+    Incremental SHA-256 + xxh3 over one byte stream.
+
+    With both hashers active, SHA-256 runs in a helper thread (hashlib
+    releases the GIL), so it overlaps with I/O and xxh3 on the caller.
+    Call `close()` exactly once to collect the Digests record.
+    """
+
+    def __init__(self, algorithms: Sequence[str] = ("sha256", "xxh3")) -> None:
+        self._sha = hashlib.sha256() if "sha256" in algorithms else None
+        self._xxh = xxhash.xxh3_128() if "xxh3" in algorithms and xxhash is not None else None
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=_QUEUE_DEPTH)
+        self._worker: Optional[threading.Thread] = None
+        if self._sha is not None and self._xxh is not None:
+            # a lone hasher runs inline - the thread would only add hand-off cost
+            self._worker = threading.Thread(target=self._drain, name="sha256", daemon=True)
+            self._worker.start()
+        self._start = time.monotonic()
+        self.size = 0
+
+    def _drain(self) -> None:
+        for item in iter(self._queue.get, None):
+            self._sha.update(item)  # type: ignore[union-attr]
+
+    def update(self, chunk: bytes) -> None:
+        if self._worker is not None:
+            self._queue.put(chunk)
+        elif self._sha is not None:
+            self._sha.update(chunk)
+        if self._xxh is not None:
+            self._xxh.update(chunk)
+        self.size += len(chunk)
+
+    def close(self) -> Digests:
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+        return Digests(
+            sha256=self._sha.hexdigest() if self._sha is not None else None,
+            xxh3=self._xxh.hexdigest() if self._xxh is not None else None,
+            size=self.size,
+            seconds=time.monotonic() - self._start,
+        )
+
+
+def multi_digest(path: Path, algorithms: Sequence[str] = ("sha256", "xxh3")) -> Digests:
+    """Read `path` once and feed every chunk to all requested hashers."""
+    hasher = MultiHasher(algorithms)
+    try:
+        with path.open("rb") as fh:
+            for chunk in iter(lambda: fh.read(CHUNK_SIZE), b""):
+                hasher.update(chunk)
+    finally:
+        digests = hasher.close()
+    return digests
 
 
 def sha256_stream(path: Path) -> str:
     """Return hex-digest while reading file once."""
-    hasher = hashlib.sha256()
-    with path.open("rb") as fh:
-        for chunk in iter(lambda: fh.read(_CHUNK), b""):
-            hasher.update(chunk)
-    return hasher.hexdigest()
+    return multi_digest(path, ("sha256",)).sha256  # type: ignore[return-value]
 
 
 def xxh3_stream(path: Path) -> Optional[str]:
     """Return 128-bit xxh3 hex or None if library missing."""
     if xxhash is None:
         return None
-    hasher = xxhash.xxh3_128()
-    with path.open("rb") as fh:
-        for chunk in iter(lambda: fh.read(_CHUNK), b""):
-            hasher.update(chunk)
-    return hasher.hexdigest()
+    return multi_digest(path, ("xxh3",)).xxh3
+
+
+class HashingWriter:
+    """
+    Wrap a binary file handle and feed every written chunk to SHA-256
+    (and xxh3 when available), so streamed artefacts need no re-read.
+    """
+
+    def __init__(self, fh: BinaryIO) -> None:
+        self._fh = fh
+        self._sha = hashlib.sha256()
+        self._xxh = xxhash.xxh3_128() if xxhash is not None else None
+        self._start = time.monotonic()
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self._fh.write(data)
+        self._sha.update(data)
+        if self._xxh is not None:
+            self._xxh.update(data)
+        self.size += len(data)
+        return len(data)
+
+    def sha256(self) -> str:
+        return self._sha.hexdigest()
+
+    def xxh3(self) -> Optional[str]:
+        return self._xxh.hexdigest() if self._xxh is not None else None
+
+    def digests(self) -> Digests:
+        """Snapshot of everything written so far."""
+        return Digests(
+            sha256=self.sha256(),
+            xxh3=self.xxh3(),
+            size=self.size,
+            seconds=time.monotonic() - self._start,
+        )
@@ -0,0 +1,138 @@
+"""
+Streaming decoders used by the inspectors.
+
+• make_decoder(codec) → object with stream(bytes) / finish()
+• `stream()` yields the output in pieces of at most OUT_CHUNK bytes, so a
+  highly compressible input (a sparse GiB of zeros) never materialises
+  as one huge bytes object - memory stays flat whatever the ratio.
+• gzip + pigz share the zlib decoder (multi-member aware, CRC checked)
+• zstd needs the optional `zstandard` package
+"""
+
+from __future__ import annotations
+
+import zlib
+from typing import Iterator
+
+try:
+    import zstandard  # type: ignore
+except ModuleNotFoundError:  # noqa: PERF203
+    zstandard = None  # graceful fallback
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+OUT_CHUNK = 1 << 20  # 1 MiB - largest piece a decoder yields
+# zstandard's decompressobj has no output limit; a zstd block inflates to at
+# most 128 KiB from >= 4 input bytes, so 512-byte input slices cap one call
+# at 16 MiB (and are no slower than whole chunks)
+_ZSTD_SLICE = 512
+
+
+class StreamError(Exception):
+    """Raised when a compressed or tar stream is malformed."""
+
+
+class CodecUnavailable(StreamError):
+    """The codec is valid but cannot be decoded on this machine."""
+
+
+class GzipStreamDecoder:
+    """Incremental gzip inflater (multi-member aware, CRC checked by zlib)."""
+
+    def __init__(self) -> None:
+        self._obj = zlib.decompressobj(wbits=31)
+        self.members = 1
+
+    def stream(self, data: bytes) -> Iterator[bytes]:
+        while True:
+            try:
+                piece = self._obj.decompress(data, OUT_CHUNK)
+            except zlib.error as exc:
+                raise StreamError(str(exc)) from exc
+            if piece:
+                yield piece
+            data = self._obj.unconsumed_tail
+            if data or (len(piece) == OUT_CHUNK and not self._obj.eof):
+                continue  # output limit hit - more from the same input
+            if not self._obj.eof:
+                return
+            data = self._obj.unused_data
+            if not data:
+                return
+            if data.startswith(_GZIP_MAGIC):
+                self._obj = zlib.decompressobj(wbits=31)
+                self.members += 1
+            elif data.strip(b"\x00"):
+                raise StreamError("trailing garbage after gzip stream")
+            else:
+                return  # zero padding - tolerated like gzip(1)
+
+    def finish(self) -> bytes:
+        if not self._obj.eof:
+            raise StreamError("compressed file ended before the end-of-stream marker was reached")
+        return b""
+
+
+class ZstdStreamDecoder:
+    """Incremental zstd decoder (multi-frame aware, content checksum checked)."""
+
+    def __init__(self) -> None:
+        if zstandard is None:
+            raise CodecUnavailable("zstd support not installed (pip install zstandard)")
+        self._dctx = zstandard.ZstdDecompressor()
+        self._obj = self._dctx.decompressobj()
+        self._eof = False
+
+    def stream(self, data: bytes) -> Iterator[bytes]:
+        view = memoryview(data)
+        buf = bytearray()
+        for pos in range(0, len(view), _ZSTD_SLICE):
+            buf += self._decompress(view[pos:pos + _ZSTD_SLICE])
+            while len(buf) >= OUT_CHUNK:
+                yield bytes(buf[:OUT_CHUNK])
+                del buf[:OUT_CHUNK]
+        if buf:
+            yield bytes(buf)
+
+    def _decompress(self, data) -> bytes:
+        out = []
+        while data:
+            try:
+                out.append(self._obj.decompress(data))
+            except zstandard.ZstdError as exc:
+                raise StreamError(str(exc)) from exc
+            self._eof = bool(getattr(self._obj, "eof", False))
+            data = getattr(self._obj, "unused_data", b"") if self._eof else b""
+            if data:
+                if not data.startswith(_ZSTD_MAGIC):
+                    raise StreamError("trailing garbage after zstd stream")
+                self._obj = self._dctx.decompressobj()
+                self._eof = False
+        return b"".join(out)
+
+    def finish(self) -> bytes:
+        if hasattr(self._obj, "eof") and not self._eof:
+            raise StreamError("compressed file ended before the end-of-stream marker was reached")
+        return b""
+
+
+class PlainDecoder:
+    """codec 'none' - bytes pass through unchanged."""
+
+    def stream(self, data: bytes) -> Iterator[bytes]:
+        view = memoryview(data)
+        for pos in range(0, len(view), OUT_CHUNK):
+            yield bytes(view[pos:pos + OUT_CHUNK])
+
+    def finish(self) -> bytes:
+        return b""
+
+
+def make_decoder(codec: str = "gzip"):
+    if codec in ("gzip", "pigz"):
+        return GzipStreamDecoder()
+    if codec == "zstd":
+        return ZstdStreamDecoder()
+    if codec == "none":
+        return PlainDecoder()
+    raise StreamError(f"unknown codec {codec!r}")
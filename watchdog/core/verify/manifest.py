@@ -5,6 +5,8 @@ Manifest helper.
 • Describes every artefact (tarball, SQL dump, …) so the Verifier
   can recreate exactly what “should” be on disk - without scanning
   directories.
+• `save()` also indexes the manifest in the SQLite catalog
+  (watchdog.core.catalog).
 
 Example JSON:
 {
@@ -15,18 +17,33 @@ Example JSON:
       "path": "sites.tar.gz",
       "sha256": "abc123…",
       "size": 1843509231,
-      "type": "tar"
+      "type": "tar",
+      "codec": "zstd"
+    },
+    {
+      "path": "backup_sites.idx.json",
+      "sha256": "def456…",
+      "size": 48211,
+      "type": "dedup",
+      "stream_size": 1843509231,
+      "stream_sha256": "789abc…"
     }
   ]
 }
+
+`dedup` artefacts are chunk indexes - the data itself lives in the
+shared chunk store (see watchdog.core.dedup).
 """
 
 from __future__ import annotations
 
 import json
+import sqlite3
 from pathlib import Path
 from typing import List, Dict, Any
 
+from watchdog.core.catalog.catalog import safe_catalog
+
 
 class Manifest:
     SCHEMA_VERSION = 1
@@ -38,17 +55,26 @@ class Manifest:
 
     # Public API
 
-    def add_artifact(self, path: Path, sha256: str, size: int, art_type: str, xxh3: str | None = None) -> None:
-        """Register one file in the manifest."""
-        self.artifacts.append(
-            {
-                "path": path.name,
-                "sha256": sha256,
-                "size": size,
-                "type": art_type,
-                "xxh3": xxh3,
-            }
-        )
+    def add_artifact(
+        self,
+        path: Path,
+        sha256: str,
+        size: int,
+        art_type: str,
+        xxh3: str | None = None,
+        **extra: Any,
+    ) -> Dict[str, Any]:
+        """Register one file in the manifest (`extra` = type-specific keys)."""
+        entry = {
+            "path": path.name,
+            "sha256": sha256,
+            "size": size,
+            "type": art_type,
+            "xxh3": xxh3,
+            **extra,
+        }
+        self.artifacts.append(entry)
+        return entry
 
     def save(self, dest_dir: Path) -> Path:
         """Write manifest JSON to `<dest_dir>/<server>.json`."""
@@ -61,14 +87,28 @@ class Manifest:
             "artifacts": self.artifacts,
         }
         file_path.write_text(json.dumps(data, indent=2))
+        # the catalog is an index - never fail a backup over it
+        catalog = safe_catalog(dest_dir.parent)
+        if catalog is not None:
+            try:
+                catalog.record_manifest(self.pulse, self.server, self.artifacts)
+            except sqlite3.Error as exc:
+                catalog.logger.warning(f"Could not catalog {file_path}: {exc}")
         return file_path
 
     # Helpers
 
+    @staticmethod
+    def is_manifest(data: Any) -> bool:
+        """True for the JSON `save()` writes (not other files in a pulse dir)."""
+        return isinstance(data, dict) and "schema" in data and "server" in data
+
     @classmethod
     def load(cls, file_path: Path) -> "Manifest":
-        """Load an existing manifest from disk."""
+        """Load an existing manifest from disk (ValueError for other JSON)."""
         data = json.loads(file_path.read_text())
+        if not cls.is_manifest(data):
+            raise ValueError(f"{file_path} is not a manifest")
         man = cls(server=data["server"], pulse=data["pulse"])
         man.artifacts = data["artifacts"]
         return man
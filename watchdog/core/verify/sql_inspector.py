@@ -1,32 +1,236 @@
 """
-Sanity checks for gzipped MySQL dumps.
+Sanity checks for compressed MySQL dumps (gzip/pigz, zstd or plain).
 We don't parse SQL – just verify header/footer strings.
+
+• scan_dump(path, codec) - one streaming pass: hash the raw bytes, decode,
+  check the header, keep a rolling tail for the footer and optionally
+  index `CREATE TABLE` / `INSERT` sections (uncompressed offsets).
+• dump_header_footer_ok(path) - header/footer check only.
+
+Section index, cached outside the pulse dirs under the dump's SHA-256
+(`<backup root>/.sql_index/<sha256>.sections.json`), so it never shows
+up as an unlisted file or in pulse sizes:
+{
+  "version": 1,
+  "uncompressed_size": 123456789,
+  "databases": {
+    "shop": {
+      "offset": 1042,
+      "tables": {
+        "orders": {"offset": 1100, "create_offset": 1180,
+                   "first_insert_offset": 1530, "inserts": 212}
+      }
+    }
+  }
+}
 """
 
 from __future__ import annotations
 
-import gzip
+import json
+import os
+import re
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Tuple
+from typing import Any, Dict, Optional, Sequence, Tuple
 
+from .checksum import CHUNK_SIZE, Digests, MultiHasher
+from .decompress import CodecUnavailable, StreamError, make_decoder
 
 HEADER_TOKEN = b"-- MySQL dump"
 FOOTER_TOKEN = b"-- Dump completed"
+INDEX_VERSION = 1
+INDEX_DIR = ".sql_index"
+INDEX_SUFFIX = ".sections.json"
+_HEAD = 1024
+_TAIL = 8192
+_LINE_HEAD = 512  # longest line prefix we ever need to look at
 
+_SECTION = (
+    rb"(?:-- Current Database: `(?P<curdb>[^`]+)`"
+    rb"|USE `(?P<use>[^`]+)`;"
+    rb"|-- Table structure for table `(?P<struct>[^`]+)`"
+    rb"|CREATE TABLE (?:IF NOT EXISTS )?`(?P<create>[^`]+)`"
+    rb"|INSERT INTO `(?P<insert>[^`]+)`)"
+)
+_SECTION_RE = re.compile(_SECTION)          # .match() at a known line start
+_NL_SECTION_RE = re.compile(rb"\n" + _SECTION)  # literal prefix → fast scan
+
+
+class DumpScanner:
+    """Consume decoded dump bytes: head, rolling tail and section index."""
+
+    def __init__(self, build_index: bool = False) -> None:
+        self.build_index = build_index
+        self.head = b""
+        self.tail = b""
+        self.offset = 0
+        self.databases: Dict[str, Any] = {}
+        self._db = ""              # current database ("" = single-db dump)
+        self._carry = b""          # incomplete last line (< _LINE_HEAD bytes)
+        self._skip_line = False    # inside a long line whose head was scanned
+
+    def feed(self, data: bytes) -> None:
+        if len(self.head) < _HEAD:
+            self.head += data[: _HEAD - len(self.head)]
+        self.tail = (self.tail + data[-_TAIL:])[-_TAIL:]
+        if self.build_index:
+            self._scan(data)
+        self.offset += len(data)
+
+    def index(self) -> Dict[str, Any]:
+        return {
+            "version": INDEX_VERSION,
+            "uncompressed_size": self.offset,
+            "databases": self.databases,
+        }
+
+    # Internals
+
+    def _scan(self, data: bytes) -> None:
+        start = self.offset  # stream offset of data[0]
+        if self._skip_line:
+            nl = data.find(b"\n")
+            if nl == -1:
+                return
+            data, start = data[nl + 1:], start + nl + 1
+            self._skip_line = False
+            self._carry = b""
+
+        buf = self._carry + data
+        base = start - len(self._carry)
+        cut = buf.rfind(b"\n") + 1
+        if cut and (m := _SECTION_RE.match(buf, 0, cut)):
+            self._on_match(m, base)
+        for m in _NL_SECTION_RE.finditer(buf, 0, cut):
+            self._on_match(m, base + m.start() + 1)
+
+        rest = buf[cut:]
+        if len(rest) >= _LINE_HEAD:
+            # long line (extended INSERT): look at its head once, skip the body
+            if m := _SECTION_RE.match(rest[:_LINE_HEAD]):
+                self._on_match(m, base + cut)
+            self._skip_line = True
+            self._carry = b""
+        else:
+            self._carry = rest
+
+    def _on_match(self, m: "re.Match[bytes]", offset: int) -> None:
+        name = m.group(m.lastgroup).decode("utf-8", "replace")
+        kind = m.lastgroup
+        if kind in ("curdb", "use"):
+            self._db = name
+            self.databases.setdefault(name, {"offset": offset, "tables": {}})
+            return
+        db = self.databases.setdefault(self._db, {"offset": offset, "tables": {}})
+        table = db["tables"].setdefault(
+            name,
+            {"offset": offset, "create_offset": None, "first_insert_offset": None, "inserts": 0},
+        )
+        if kind == "create":
+            table["create_offset"] = offset
+        elif kind == "insert":
+            if table["first_insert_offset"] is None:
+                table["first_insert_offset"] = offset
+            table["inserts"] += 1
+
+
+@dataclass
+class DumpReport:
+    ok: bool
+    message: str
+    digests: Optional[Digests] = None
+    uncompressed_size: int = 0
+    index: Optional[Dict[str, Any]] = None
+    skipped: str = ""  # content checks skipped (codec not decodable here)
+
+
+def scan_dump(
+    path: Path,
+    codec: str = "gzip",
+    algorithms: Sequence[str] = (),
+    build_index: bool = False,
+) -> DumpReport:
+    """
+    Read `path` once: hash the raw bytes (if `algorithms`), decode them and
+    check header/footer; optionally build the section index on the way.
+    """
+    hasher = MultiHasher(algorithms) if algorithms else None
+    scanner = DumpScanner(build_index=build_index)
+    failure = skipped = ""
+    try:
+        decoder = make_decoder(codec)
+    except CodecUnavailable as exc:
+        decoder, skipped = None, str(exc)
+    except StreamError as exc:
+        decoder, failure = None, str(exc)
 
-def dump_header_footer_ok(path: Path) -> Tuple[bool, str]:
-    """Return True if header and footer look normal."""
     try:
-        with gzip.open(path, "rb") as fh:
-            head = fh.readline(1024)
-        with gzip.open(path, "rb") as fh:
-            fh.seek(0, 2)
-            size = fh.tell()
-            fh.seek(-min(8192, size), 2)
-            tail = fh.read()
+        with path.open("rb") as fh:
+            for chunk in iter(lambda: fh.read(CHUNK_SIZE), b""):
+                if hasher is not None:
+                    hasher.update(chunk)
+                if decoder is None or failure:
+                    if hasher is None:
+                        break  # nothing left to do with the bytes
+                    continue
+                try:
+                    for piece in decoder.stream(chunk):
+                        scanner.feed(piece)
+                except StreamError as exc:
+                    failure = f"{codec} error: {exc}"
+        if decoder is not None and not failure:
+            try:
+                decoder.finish()
+            except StreamError as exc:
+                failure = f"{codec} error: {exc}"
     except OSError as exc:
-        return False, f"gzip error: {exc}"
+        failure = f"{codec} error: {exc}"
+    finally:
+        digests = hasher.close() if hasher is not None else None
+
+    if not failure and decoder is not None:
+        ok, failure = _tokens_ok(scanner.head.split(b"\n", 1)[0], scanner.tail)
+    return DumpReport(
+        ok=not failure,
+        message=failure,
+        digests=digests,
+        uncompressed_size=scanner.offset,
+        index=scanner.index() if build_index and decoder is not None and not failure else None,
+        skipped=skipped,
+    )
+
+
+def dump_header_footer_ok(path: Path, codec: str = "gzip") -> Tuple[bool, str]:
+    """Return True if header and footer look normal."""
+    report = scan_dump(path, codec)
+    if report.skipped:
+        return True, f"not checked: {report.skipped}"
+    return report.ok, report.message
+
+
+def index_path_for(backup_root: Path, sha256: str) -> Path:
+    return backup_root / INDEX_DIR / f"{sha256}{INDEX_SUFFIX}"
+
+
+def write_dump_index(backup_root: Path, sha256: str, index: Dict[str, Any]) -> Path:
+    target = index_path_for(backup_root, sha256)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(index, indent=1))
+    os.replace(tmp, target)   # parallel workers may index identical dumps
+    return target
+
+
+def load_dump_index(backup_root: Path, sha256: str) -> Optional[Dict[str, Any]]:
+    try:
+        data = json.loads(index_path_for(backup_root, sha256).read_text())
+    except (OSError, ValueError):
+        return None
+    return data if data.get("version") == INDEX_VERSION else None
+
 
+def _tokens_ok(head: bytes, tail: bytes) -> Tuple[bool, str]:
     if HEADER_TOKEN not in head:
         return False, "header token missing"
     if FOOTER_TOKEN not in tail:
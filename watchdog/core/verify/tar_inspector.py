@@ -1,14 +1,212 @@
 """
-Integrity checks for gzip-compressed tarballs.
+Integrity checks for compressed tarballs (gzip/pigz, zstd or plain).
 All checks are streaming - no extraction to disk.
+
+• verify_tar_stream(path, codec) - fused pass: hash + inflate + header walk
+  (+ cross-check of a seekable archive's member index, see backup/seekable.py)
+• gzip_valid / tar_structure_valid - standalone single checks
 """
 
 from __future__ import annotations
 
 import gzip
 import tarfile
+import zlib
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Tuple
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from .checksum import CHUNK_SIZE, Digests, MultiHasher
+from .decompress import CodecUnavailable, StreamError, make_decoder
+
+BLOCK = 512
+# header types whose payload follows the header (tarfile semantics; GNU
+# dumpdir/multivolume/old-longname/volume payloads are skipped like data)
+_DATA_TYPES = {b"0", b"\x00", b"7", b"S", b"D", b"M", b"N", b"V"}
+# meta headers describing the *next* member
+_META_TYPES = {b"L", b"K", b"x", b"g", b"X"}
+_KNOWN_TYPES = _DATA_TYPES | _META_TYPES | {b"1", b"2", b"3", b"4", b"5", b"6"}
+
+
+class TarHeaderWalker:
+    """
+    Consume a decompressed tar stream and validate every header block,
+    skipping member payloads without buffering them.
+    """
+
+    def __init__(
+        self,
+        on_header: Optional[Callable[[int, bytes, int], None]] = None,
+        on_member: Optional[Callable[[str, bytes, int, int], None]] = None,
+    ) -> None:
+        # on_header(offset, block, size) fires at the first header of each entry
+        self.on_header = on_header
+        # on_member(name, typeflag, data_offset, size) fires at each real member
+        # header, with the name resolved from pax `path` / GNU long names
+        self.on_member = on_member
+        self.members = 0
+        self.offset = 0          # uncompressed bytes consumed
+        self.done = False        # end-of-archive marker seen
+        self._skip = 0           # payload bytes still to skip
+        self._header = bytearray()
+        self._pax = bytearray()  # collected pax payload (size overrides)
+        self._pax_left = 0
+        self._pax_size: Optional[int] = None
+        self._pax_path: Optional[str] = None
+        self._long_name: Optional[str] = None
+        self._meta_type = b""
+        self._after_meta = False
+
+    def feed(self, data: bytes) -> None:
+        base = self.offset
+        view = memoryview(data)
+        pos = 0
+        while pos < len(view):
+            if self._skip:
+                step = min(self._skip, len(view) - pos)
+                if self._pax_left:
+                    take = min(step, self._pax_left)
+                    self._pax += view[pos:pos + take]
+                    self._pax_left -= take
+                    if not self._pax_left:
+                        self._parse_meta()
+                self._skip -= step
+                pos += step
+                continue
+            if self.done:
+                pos = len(view)  # trailing zero blocks / padding
+                break
+            need = BLOCK - len(self._header)
+            self._header += view[pos:pos + need]
+            pos += min(need, len(view) - pos)
+            if len(self._header) == BLOCK:
+                self._on_header(bytes(self._header), base + pos - BLOCK)
+                self._header.clear()
+        self.offset += len(data)
+
+    def finish(self) -> None:
+        if self._skip or self._header:
+            raise StreamError("unexpected end of data")
+        if not self.done and self.members == 0 and self.offset == 0:
+            raise StreamError("empty file")
+
+    # -------------------------------------------------------------- #
+    # Internals
+
+    def _on_header(self, block: bytes, offset: int) -> None:
+        if block.count(0) == BLOCK:
+            self.done = True
+            return
+        _check_header(block)
+        typeflag = block[156:157]
+        size = _parse_size(block[124:136])
+        if self._pax_size is not None and typeflag not in _META_TYPES:
+            size, self._pax_size = self._pax_size, None
+        if self.on_header is not None and not self._after_meta:
+            self.on_header(offset, block, size)
+        self._after_meta = typeflag in _META_TYPES
+
+        if typeflag in _META_TYPES:
+            if typeflag in (b"x", b"L") and size <= 1 << 20:
+                self._pax.clear()
+                self._pax_left = size
+                self._meta_type = typeflag
+            self._skip = _round_block(size)
+        else:
+            self.members += 1
+            if self.on_member is not None:
+                name = self._pax_path or self._long_name or _ustar_name(block)
+                self.on_member(name, typeflag, offset + BLOCK, size)
+            self._pax_path = self._long_name = None
+            if typeflag in _DATA_TYPES or typeflag not in _KNOWN_TYPES:
+                self._skip = _round_block(size)
+
+    def _parse_meta(self) -> None:
+        if self._meta_type == b"L":
+            self._long_name = bytes(self._pax).rstrip(b"\x00").decode("utf-8", "surrogateescape")
+        else:
+            self._parse_pax()
+
+    def _parse_pax(self) -> None:
+        buf = bytes(self._pax)
+        pos = 0
+        while pos < len(buf):
+            space = buf.find(b" ", pos)
+            if space == -1:
+                break
+            try:
+                length = int(buf[pos:space])
+            except ValueError:
+                raise StreamError("invalid pax header") from None
+            if length <= 0:
+                raise StreamError("invalid pax header")
+            key, _, value = buf[space + 1:pos + length - 1].partition(b"=")
+            if key == b"size":
+                self._pax_size = int(value)
+            elif key == b"path":
+                self._pax_path = value.decode("utf-8", "surrogateescape")
+            pos += length
+
+
+@dataclass
+class TarStreamReport:
+    """Everything learned from one fused pass over a tar artefact."""
+
+    ok: bool
+    message: str
+    digests: Optional[Digests] = None
+    members: int = 0
+    uncompressed_size: int = 0
+    skipped: str = ""  # structure checks skipped (codec not decodable here)
+
+
+def verify_tar_stream(
+    path: Path,
+    algorithms: Sequence[str] = ("sha256", "xxh3"),
+    codec: str = "gzip",
+    index: Optional[Dict[str, Any]] = None,
+) -> TarStreamReport:
+    """
+    Read `path` once: hash the compressed bytes, inflate them with a
+    streaming decoder and walk tar headers from the inflated stream.
+    Hashing always runs to EOF so digests are valid even when the
+    archive itself is broken.
+
+    With a seekable member `index` every member seen in the walk must
+    match the index entry for entry, and the block table must cover the
+    file with independently inflatable blocks.
+    """
+    hasher = MultiHasher(algorithms)
+    index_check = _IndexCheck(index) if index is not None else None
+    walker = TarHeaderWalker(on_member=index_check.member if index_check else None)
+    failure = skipped = ""
+    try:
+        decoder = make_decoder(codec)
+    except CodecUnavailable as exc:
+        decoder, skipped = None, str(exc)
+    except StreamError as exc:
+        decoder, failure = None, f"{codec} invalid: {exc}"
+    try:
+        with path.open("rb") as fh:
+            for chunk in iter(lambda: fh.read(CHUNK_SIZE), b""):
+                hasher.update(chunk)
+                if decoder is not None and not failure:
+                    failure = _feed(decoder, walker, chunk, codec)
+        if decoder is not None and not failure:
+            failure = _feed(decoder, walker, None, codec)
+        if index_check is not None and decoder is not None and not failure:
+            failure = index_check.finish(path, walker)
+    finally:
+        digests = hasher.close()
+
+    return TarStreamReport(
+        ok=not failure,
+        message=failure,
+        digests=digests,
+        members=walker.members,
+        uncompressed_size=walker.offset,
+        skipped=skipped,
+    )
 
 
 def gzip_valid(path: Path) -> Tuple[bool, str]:
@@ -31,3 +229,113 @@ def tar_structure_valid(path: Path) -> Tuple[bool, str]:
         return True, ""
     except tarfile.TarError as exc:
         return False, str(exc)
+
+
+# ---------------------------------------------------------------------- #
+# Helpers
+
+
+class _IndexCheck:
+    """Compares a seekable archive's member index against the real walk."""
+
+    def __init__(self, index: Dict[str, Any]) -> None:
+        self.members = index.get("members", [])
+        self.index = index
+        self.seen = 0
+        self.error = ""
+
+    def member(self, name: str, typeflag: bytes, data_offset: int, size: int) -> None:
+        if self.error:
+            return
+        if self.seen >= len(self.members):
+            self.error = f"member index missing {name}"
+        else:
+            want = self.members[self.seen]
+            if want[0] != name or want[2] != data_offset or want[3] != size:
+                self.error = f"member index mismatch at {name} (index: {want[0]} @ {want[2]})"
+        self.seen += 1
+
+    def finish(self, path: Path, walker: "TarHeaderWalker") -> str:
+        if self.error:
+            return self.error
+        if self.seen != len(self.members):
+            return f"member index lists {len(self.members)} members, archive has {self.seen}"
+        if self.index.get("raw_size") != walker.offset:
+            return "member index raw size does not match the archive"
+        blocks = self.index.get("blocks", [])
+        comp = raw = 0
+        for comp_off, comp_len, raw_off, raw_len in blocks:
+            if comp_off != comp or raw_off != raw:
+                return "member index block table has gaps"
+            comp += comp_len
+            raw += raw_len
+        if comp != path.stat().st_size or raw != walker.offset:
+            return "member index blocks do not cover the archive"
+        # restart points: first, middle and last block must inflate on their own
+        with path.open("rb") as fh:
+            for i in sorted({0, len(blocks) // 2, len(blocks) - 1} if blocks else ()):
+                comp_off, comp_len, _, raw_len = blocks[i]
+                fh.seek(comp_off)
+                try:
+                    if len(zlib.decompress(fh.read(comp_len), 31)) != raw_len:
+                        return f"member index block {i} has the wrong size"
+                except zlib.error as exc:
+                    return f"member index block {i} is not a restart point: {exc}"
+        return ""
+
+
+
+def _feed(decoder, walker: TarHeaderWalker, chunk: Optional[bytes], codec: str) -> str:
+    """Push one raw chunk (None = EOF) through inflate → header walk, piece by piece."""
+    pieces = decoder.stream(chunk) if chunk is not None else None
+    while True:
+        try:
+            inflated = next(pieces, None) if pieces is not None else decoder.finish()
+        except StreamError as exc:
+            return f"{'gzip' if codec == 'pigz' else codec} invalid: {exc}"
+        try:
+            if inflated:
+                walker.feed(inflated)
+            if pieces is None:
+                walker.finish()
+        except StreamError as exc:
+            return f"tar header error: {exc}"
+        if inflated is None or pieces is None:
+            return ""
+
+
+def _ustar_name(block: bytes) -> str:
+    name = block[:100].split(b"\x00", 1)[0]
+    if block[257:262] == b"ustar":
+        prefix = block[345:500].split(b"\x00", 1)[0]
+        if prefix:
+            name = prefix + b"/" + name
+    return name.decode("utf-8", "surrogateescape")
+
+
+def _round_block(size: int) -> int:
+    return (size + BLOCK - 1) // BLOCK * BLOCK
+
+
+def _parse_size(field_: bytes) -> int:
+    if field_[0] & 0x80:  # GNU base-256 for sizes >= 8 GiB
+        value = int.from_bytes(field_[1:], "big")
+        return value if field_[0] == 0x80 else -value
+    digits = field_.rstrip(b"\x00 ").strip()
+    try:
+        return int(digits or b"0", 8)
+    except ValueError:
+        raise StreamError("invalid size field") from None
+
+
+def _check_header(block: bytes) -> None:
+    stored = block[148:156].rstrip(b"\x00 ").strip()
+    try:
+        expected = int(stored or b"0", 8)
+    except ValueError:
+        raise StreamError("invalid header checksum field") from None
+    rest = block[:148] + block[156:]
+    unsigned = sum(rest) + 8 * 0x20  # checksum field counts as spaces
+    signed = unsigned - 256 * sum(1 for b in rest if b > 127)
+    if expected not in (unsigned, signed):
+        raise StreamError("bad checksum")
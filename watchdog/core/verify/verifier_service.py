@@ -1,26 +1,51 @@
 """
 VerifierService – orchestrates all integrity checks for one Pulse.
 Returns dict with `overall`, `errors`, `warnings`, `metrics`.
+
+Artifacts can be spread over a process (or thread) pool; results are
+always reported in manifest order, whatever order they finish in.
+Unchanged artifacts that already passed are skipped via VerificationCache.
+Per-artifact outcomes are recorded in the SQLite catalog.
 """
 
 from __future__ import annotations
 
 import json
+import sqlite3
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 
 from watchdog.utils.logger import WatchdogLogger
-from .checksum import sha256_stream, xxh3_stream
-from .tar_inspector import gzip_valid, tar_structure_valid
-from .sql_inspector import dump_header_footer_ok
+from .checksum import HAS_XXH3, Digests, multi_digest
+from .tar_inspector import verify_tar_stream
+from .sql_inspector import load_dump_index, scan_dump, write_dump_index
 from .manifest import Manifest
+from .cache import VerificationCache
+from watchdog.core.dedup.chunk_store import ChunkStore, load_index
+from watchdog.core.backup.snapshot import load_file_list
+from watchdog.core.backup import seekable
+from watchdog.core.catalog.catalog import safe_catalog
+from watchdog.core.metrics import METRICS
 
 
 class VerifierService:
     """High-level façade used by PulseService."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        workers: int = 1,
+        executor: str = "process",
+        cache: Optional[VerificationCache] = None,
+        sql_index: bool = True,
+    ) -> None:
         self.logger = WatchdogLogger("verify")
+        self.workers = max(1, workers)
+        self.executor = executor  # "process" | "thread"
+        self.cache = cache
+        # options handed to every worker
+        self.options: Dict[str, Any] = {"sql_index": sql_index}
 
     # ------------------------------------------------------------------ #
     # Public API
@@ -30,72 +55,316 @@ class VerifierService:
         Verify every server manifest inside `pulse_dir`.
         Returns aggregated dict that PulseService will embed to Discord.
         """
+        started = time.monotonic()
         errors: List[str] = []
         warnings: List[str] = []
-        metrics: Dict[str, Any] = {"servers": 0, "files_checked": 0}
+        metrics: Dict[str, Any] = {
+            "servers": 0,
+            "files_checked": 0,
+            "bytes_hashed": 0,
+            "hash_seconds": 0.0,
+            "tar_members": 0,
+            "uncompressed_bytes": 0,
+            "workers": self.workers,
+            "artifacts": {},
+        }
 
-        manifest_files = list(pulse_dir.glob("*.json"))
-        if not manifest_files:
+        manifests: List[Manifest] = []
+        for mf in sorted(pulse_dir.glob("*.json")):
+            # other pulse-level JSON (metrics, caches) is not ours to verify
+            if not Manifest.is_manifest(json.loads(mf.read_text())):
+                self.logger.info(f"Skipping {mf.name} (not a manifest)")
+                continue
+            self.logger.info(f"Loading manifest {mf}")
+            manifests.append(Manifest.load(mf))
+        if not manifests:
             errors.append("No manifest files found!")
             return _result(errors, warnings, metrics)
 
-        for mf in manifest_files:
-            self.logger.info(f"Loading manifest {mf}")
-            man = Manifest.load(mf)
+        # (key, spec, path) in manifest order
+        jobs: List[Tuple[str, Dict[str, Any], Path]] = []
+        for man in manifests:
             metrics["servers"] += 1
             for art in man.artifacts:
                 art_path = pulse_dir / man.server.lower() / art["path"]
-                ok, w = self._verify_artifact(art, art_path)
-                metrics["files_checked"] += 1
-                if not ok:
-                    errors.append(f"{man.server}/{art['path']}: {w}")
-                elif w:  # soft warning
-                    warnings.append(f"{man.server}/{art['path']}: {w}")
+                jobs.append((f"{man.server}/{art['path']}", art, art_path))
+
+        outcomes: List[Tuple[str, str, bool, str]] = []
+        for (key, spec, _), (ok, w, stats) in zip(jobs, self._run_cached(jobs)):
+            server, _, art_path = key.partition("/")
+            outcomes.append((server, art_path, ok, w))
+            if not stats.get("cached"):
+                METRICS.add("verify", server, stats.get("seconds", 0.0), spec.get("size", 0), art_path, not ok)
+                METRICS.add(
+                    "verify_hash", server, stats.get("hash_seconds", 0.0), stats.get("bytes_hashed", 0), art_path
+                )
+            metrics["files_checked"] += 1
+            metrics["bytes_hashed"] += stats.pop("bytes_hashed", 0)
+            metrics["hash_seconds"] += stats.pop("hash_seconds", 0.0)
+            metrics["tar_members"] += stats.get("members", 0)
+            metrics["uncompressed_bytes"] += stats.get("uncompressed_bytes", 0)
+            metrics["artifacts"][key] = stats
+            if not ok:
+                errors.append(f"{key}: {w}")
+            elif w:  # soft warning
+                warnings.append(f"{key}: {w}")
 
-        return _result(errors, warnings, metrics)
+        if metrics["hash_seconds"]:
+            metrics["hash_mb_s"] = round(
+                metrics["bytes_hashed"] / metrics["hash_seconds"] / (1 << 20), 1
+            )
+        metrics["hash_seconds"] = round(metrics["hash_seconds"], 2)
+        metrics["wall_seconds"] = round(time.monotonic() - started, 2)
+        if self.cache is not None:
+            metrics["cache_hits"] = self.cache.hits
+            metrics["cache_misses"] = self.cache.misses
+            metrics["cache_hit_rate"] = self.cache.hit_rate()
+        result = _result(errors, warnings, metrics)
+        self._catalog(pulse_dir, outcomes, result)
+        return result
+
+    def _catalog(self, pulse_dir: Path, outcomes: List[Tuple[str, str, bool, str]], result: Dict[str, Any]) -> None:
+        catalog = safe_catalog(pulse_dir.parent)
+        if catalog is None:
+            return
+        try:
+            catalog.record_verification(pulse_dir.name, outcomes, result)
+        except sqlite3.Error as exc:
+            self.logger.warning(f"Could not catalog verification: {exc}")
 
     # ------------------------------------------------------------------ #
     # Internals
 
-    def _verify_artifact(
-        self, spec: Dict[str, Any], path: Path
-    ) -> Tuple[bool, str]:
-        if not path.exists():
-            return False, "file missing on disk"
-
-        # 1 · Size
-        if path.stat().st_size != spec["size"]:
-            return False, "size mismatch"
-
-        # 2 · Hash
-        # fast pre-screen (optional)
-        if (fast := xxh3_stream(path)) and fast == spec.get("xxh3"):
-            pass  # cheap success!
-        else:
-            sha = sha256_stream(path)
-            if sha != spec["sha256"]:
-                return False, "SHA-256 mismatch"
-
-        # 3 · Type-specific checks
-        if spec["type"] == "tar":
-            ok, msg = gzip_valid(path)
-            if not ok:
-                return False, f"gzip invalid: {msg}"
-            ok, msg = tar_structure_valid(path)
-            if not ok:
-                return False, f"tar header error: {msg}"
-        elif spec["type"] == "mysql":
-            ok, msg = dump_header_footer_ok(path)
-            if not ok:
-                return False, f"mysql dump error: {msg}"
+    def _run_cached(
+        self, jobs: List[Tuple[str, Dict[str, Any], Path]]
+    ) -> List[Tuple[bool, str, Dict[str, Any]]]:
+        """Serve unchanged, already-passed artifacts from the cache; run the rest."""
+        if self.cache is None:
+            return self._run_jobs(jobs)
 
-        return True, ""  # success
+        results: List[Any] = [None] * len(jobs)
+        pending: List[int] = []
+        idents: Dict[int, Any] = {}
+        for i, (_, spec, path) in enumerate(jobs):
+            entry = self.cache.lookup(path, spec)
+            if entry is not None:
+                results[i] = (True, "", {"cached": True, "checked_at": entry["checked_at"]})
+            else:
+                idents[i] = self.cache.identity(path)
+                pending.append(i)
+
+        for i, res in zip(pending, self._run_jobs([jobs[i] for i in pending])):
+            results[i] = res
+            _, spec, path = jobs[i]
+            self.cache.store(path, spec, res[0], res[1], idents[i])
+        try:
+            self.cache.save()
+        except OSError as exc:
+            self.logger.warning(f"Could not save verification cache: {exc}")
+        return results
+
+    def _run_jobs(
+        self, jobs: List[Tuple[str, Dict[str, Any], Path]]
+    ) -> List[Tuple[bool, str, Dict[str, Any]]]:
+        """Verify all jobs; the returned list lines up with `jobs`."""
+        if self.workers == 1 or len(jobs) < 2:
+            return [verify_artifact(spec, path, self.options) for _, spec, path in jobs]
+
+        # largest first, so the biggest archive never starts last
+        order = sorted(range(len(jobs)), key=lambda i: jobs[i][1].get("size", 0), reverse=True)
+        results: List[Any] = [None] * len(jobs)
+        with self._pool() as pool:
+            futures = {
+                i: pool.submit(verify_artifact, jobs[i][1], jobs[i][2], self.options)
+                for i in order
+            }
+            for i, fut in futures.items():
+                try:
+                    results[i] = fut.result()
+                except Exception as exc:  # noqa: BLE001 - e.g. a crashed worker
+                    self.logger.error(f"Verification of {jobs[i][0]} crashed: {exc}")
+                    results[i] = (False, f"verifier crashed: {exc}", {})
+        return results
+
+    def _pool(self) -> Executor:
+        if self.executor == "thread":
+            return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="verify")
+        return ProcessPoolExecutor(max_workers=self.workers)
+
+
+# ---------------------------------------------------------------------- #
+# Worker (module level so it pickles into a process pool)
+
+
+def verify_artifact(
+    spec: Dict[str, Any], path: Path, options: Optional[Dict[str, Any]] = None
+) -> Tuple[bool, str, Dict[str, Any]]:
+    """Run all checks for one artifact; returns (ok, message, stats)."""
+    started = time.monotonic()
+    stats: Dict[str, Any] = {}
+    ok, msg = _verify_artifact(spec, path, stats, options or {})
+    stats["seconds"] = round(time.monotonic() - started, 3)
+    return ok, msg, stats
+
+
+def _verify_artifact(
+    spec: Dict[str, Any], path: Path, stats: Dict[str, Any], options: Dict[str, Any]
+) -> Tuple[bool, str]:
+    if not path.exists():
+        return False, "file missing on disk"
+
+    # 1 · Size
+    if path.stat().st_size != spec["size"]:
+        return False, "size mismatch"
+
+    # 2 · Hash
+    # fast pre-screen (optional) - one pass; SHA-256 only if xxh3 can't vouch
+    algorithms = ("xxh3",) if spec.get("xxh3") and HAS_XXH3 else ("sha256",)
+    if spec["type"] == "tar":
+        index = None
+        if spec.get("index"):   # seekable archive - its member index is checked too
+            try:
+                index = seekable.load_index(path.with_name(spec["index"]))
+            except (OSError, ValueError) as exc:
+                return False, f"member index unreadable: {exc}"
+        # hash + inflate + header walk share one read of the file
+        report = verify_tar_stream(path, algorithms, codec=spec.get("codec", "gzip"), index=index)
+        digests = report.digests
+        stats["members"] = report.members
+        stats["uncompressed_bytes"] = report.uncompressed_size
+    elif spec["type"] == "mysql":
+        # hash + decode + header/footer (+ section index) in one read
+        # <root>/<pulse>/<server>/<dump>: the section index lives in <root>/.sql_index
+        backup_root = path.parents[2]
+        existing_index = load_dump_index(backup_root, spec["sha256"])
+        build_index = options.get("sql_index", False) and existing_index is None
+        report = scan_dump(
+            path, spec.get("codec", "gzip"), algorithms, build_index=build_index
+        )
+        digests = report.digests
+        stats["uncompressed_bytes"] = report.uncompressed_size
+    else:
+        digests = multi_digest(path, algorithms)
+    _add_hash_stats(stats, digests)
+    if digests.xxh3 and digests.xxh3 == spec.get("xxh3"):
+        pass  # cheap success!
+    else:
+        if digests.sha256 is None:
+            digests = multi_digest(path, ("sha256",))
+            _add_hash_stats(stats, digests)
+        if digests.sha256 != spec["sha256"]:
+            return False, "SHA-256 mismatch"
+
+    # 3 · Type-specific checks
+    if spec["type"] == "tar":
+        if not report.ok:
+            return False, report.message
+        if report.skipped:
+            return True, f"tar structure not checked: {report.skipped}"
+    elif spec["type"] == "mysql":
+        if not report.ok:
+            return False, f"mysql dump error: {report.message}"
+        if report.skipped:
+            return True, f"mysql dump not checked: {report.skipped}"
+        if report.index is not None:
+            write_dump_index(backup_root, spec["sha256"], report.index)
+        _add_sql_coverage(stats, report.index or existing_index)
+    elif spec["type"] == "dedup":
+        return _verify_dedup(spec, path, stats)
+    elif spec["type"] == "snapshot":
+        return _verify_snapshot(spec, path, stats)
+
+    return True, ""  # success
+
+
+def _verify_dedup(
+    spec: Dict[str, Any], path: Path, stats: Dict[str, Any]
+) -> Tuple[bool, str]:
+    """Every indexed chunk must be present and hash to its name."""
+    try:
+        index = load_index(path)
+    except ValueError as exc:
+        return False, f"dedup index unreadable: {exc}"
+    chunks = index["chunks"]
+    if sum(size for _, size in chunks) != spec.get("stream_size", index["stream_size"]):
+        return False, "dedup index size mismatch"
+
+    store = ChunkStore.for_artifact(path)
+    missing = corrupt = 0
+    for digest in dict.fromkeys(d for d, _ in chunks):  # unique, in order
+        ok, why = store.verify(digest)
+        if not ok:
+            missing += why == "missing"
+            corrupt += why != "missing"
+    stats["chunks"] = len(chunks)
+    stats["uncompressed_bytes"] = index["stream_size"]
+    stats["members"] = index.get("members", 0)
+    if missing or corrupt:
+        return False, f"dedup chunks missing: {missing}, corrupt: {corrupt}"
+    return True, ""
+
+
+def _verify_snapshot(
+    spec: Dict[str, Any], path: Path, stats: Dict[str, Any]
+) -> Tuple[bool, str]:
+    """
+    Every listed file must exist with the listed size; files new in this
+    pulse are hashed too. Shared files are hard links whose content was
+    hashed when it first arrived.
+    """
+    try:
+        listing = load_file_list(path)
+    except ValueError as exc:
+        return False, f"snapshot list unreadable: {exc}"
+    root = path.parent / spec.get("tree", listing["tree"])
+    problems: List[str] = []
+    hashed = 0
+    for rel, entry in listing["files"].items():
+        file_path = root / rel
+        try:
+            size = file_path.stat().st_size
+        except OSError:
+            problems.append(f"{rel}: missing")
+            continue
+        if size != entry["size"]:
+            problems.append(f"{rel}: size mismatch")
+            continue
+        if entry["shared"]:
+            continue
+        algo = "xxh3" if HAS_XXH3 and entry.get("xxh3") else "sha256"
+        digests = multi_digest(file_path, (algo,))
+        _add_hash_stats(stats, digests)
+        hashed += 1
+        if getattr(digests, algo) != entry[algo]:
+            problems.append(f"{rel}: hash mismatch")
+    stats["files"] = len(listing["files"])
+    stats["files_hashed"] = hashed
+    if problems:
+        more = f" (+{len(problems) - 5} more)" if len(problems) > 5 else ""
+        return False, "snapshot damaged: " + "; ".join(problems[:5]) + more
+    return True, ""
 
 
 # ---------------------------------------------------------------------- #
 # Helper
 
 
+def _add_sql_coverage(stats: Dict[str, Any], index: Optional[Dict[str, Any]]) -> None:
+    """Per-dump coverage summary from the section index (details stay in the file)."""
+    if not index:
+        return
+    tables = [t for db in index["databases"].values() for t in db["tables"].values()]
+    stats["databases"] = len(index["databases"])
+    stats["tables"] = len(tables)
+    stats["tables_with_rows"] = sum(1 for t in tables if t["inserts"])
+    stats["insert_statements"] = sum(t["inserts"] for t in tables)
+
+
+def _add_hash_stats(stats: Dict[str, Any], digests: Digests) -> None:
+    stats["bytes_hashed"] = stats.get("bytes_hashed", 0) + digests.size
+    stats["hash_seconds"] = stats.get("hash_seconds", 0.0) + digests.seconds
+
+
 def _result(
     errors: List[str], warnings: List[str], metrics: Dict[str, Any]
 ) -> Dict[str, Any]:
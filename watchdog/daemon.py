@@ -4,7 +4,7 @@ Persistent WatchDog daemon.
 
 • Starts at system boot.
 • Runs the Pulse workflow every day at 21:00:
-      - all backups (serial)
+      - all backups (concurrent, see `concurrency.workers`)
       - (dummy) verification
       - Discord report
 
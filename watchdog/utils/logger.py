@@ -2,22 +2,24 @@ import logging
 from pathlib import Path
 
 class WatchdogLogger:
-    def __init__(self, name: str):
+    def __init__(self, name: str, prefix: str = ""):
         log_dir = Path(f"/opt/watchdog/logs/")
         log_dir.mkdir(parents=True, exist_ok=True)
         self.logger = logging.getLogger(name)
         self.logger.setLevel(logging.INFO)
-        handler = logging.FileHandler(log_dir / f"{name}.log")
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
+        # optional tag (e.g. server name) so concurrent workers stay readable
+        self.prefix = f"[{prefix}] " if prefix else ""
         if not self.logger.hasHandlers():
+            handler = logging.FileHandler(log_dir / f"{name}.log")
+            formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+            handler.setFormatter(formatter)
             self.logger.addHandler(handler)
 
     def info(self, message: str):
-        self.logger.info(message)
+        self.logger.info(self.prefix + message)
 
     def error(self, message: str):
-        self.logger.error(message)
+        self.logger.error(self.prefix + message)
 
     def warning(self, message: str):
-        self.logger.warning(message)
+        self.logger.warning(self.prefix + message)